@@ -0,0 +1,127 @@
+# crhCache.py -- on-disk cache of generated output, keyed on input content & processing parameters
+# v1.00 crh 19-oct-26 -- initial release
+# v1.01 crh 19-oct-26 -- sections returned as the byte strings cached (non-ascii output)
+# v1.02 crh 19-oct-26 -- entries written to a unique temporary file (concurrent writers of one key)
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# each cache entry is a file in the cache directory named by the key (sha1 hex digest),
+# the key combines the sha1 of the input file content with the processing parameters
+# entry modification times record last use, so the least recently used entries
+# are deleted once the total size of the cache exceeds its limit
+# sections are byte strings (whatever the encoding of the gpx file), held in the json entry as
+# latin-1 text so every byte value round trips unchanged; entryFormat is part of every key,
+# so entries written in an earlier format are not read
+# an entry is written to a temporary file of its own in the cache directory, then renamed into place,
+# so processes or threads putting the same key at once never write to (or rename) each other's file
+
+import os
+import json
+import hashlib
+import tempfile
+
+## essential variables
+entryExt = '.cache'
+entryFormat = 2     # entry format version
+readSize = 65536    # bytes read at a time when hashing input file
+
+## define functions
+def fileDigest(fileName):
+    '''
+    return sha1 hex digest of file content
+    '''
+    sha = hashlib.sha1()
+    with open(fileName, 'rb') as f:
+        for data in iter(lambda: f.read(readSize), b''):
+            sha.update(data)
+    return sha.hexdigest()
+
+class cache(object):
+    '''
+    size limited, least recently used on-disk cache of output sections
+    '''
+    def __init__(self, directory, maxBytes = 100 * 1024 * 1024):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.hits = self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, inputFile, **params):
+        '''
+        return cache key for input file content & processing parameters
+        '''
+        sha = hashlib.sha1(fileDigest(inputFile).encode('ascii'))
+        sha.update(json.dumps([entryFormat] + sorted(params.items())).encode('ascii'))
+        return sha.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + entryExt)
+
+    def get(self, key):
+        '''
+        return list of output section (byte) strings cached for key, None if not cached
+        '''
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                sections = [section.encode('latin-1') for section in json.loads(f.read().decode('ascii'))]
+        except (IOError, OSError, ValueError, AttributeError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path, None)    # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return sections
+
+    def put(self, key, sections):
+        '''
+        cache list of output section (byte) strings for key, then evict entries if over size
+        '''
+        path = self._path(key)
+        fd, tmpPath = tempfile.mkstemp(suffix = '.tmp', prefix = key + '.', dir = self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json.dumps(sections, encoding = 'latin-1'))
+            try:
+                os.rename(tmpPath, path)
+            except OSError:     # windows: target must not exist
+                if os.path.exists(path):
+                    os.remove(path)
+                os.rename(tmpPath, path)
+        except:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+        self.evict()
+
+    def evict(self):
+        '''
+        delete least recently used entries until the cache is within its size limit
+        '''
+        entries = list()
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(entryExt):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+            total += info.st_size
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,102 @@
+# crhClip.py -- clip way-points & coordinates to an NGR square or lat/lon box
+# v1.00 crh 19-oct-26 -- initial release
+# v1.01 crh 19-oct-26 -- points without easting & northing (outside the national grid) outside ngr squares
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# a clip area is either a national grid square given by its ngr (eg: SK 100km, SK27 10km, SK2070 1km)
+# or a lat/lon box (min lat, min lon, max lat, max lon)
+# points are first tested against a lat/lon box (preTest), which needs no projection, so points well
+# outside the area are rejected before wgs2osgb & osgb2ngr are called; for an ngr square the box
+# encloses the square (its edges projected to lat/lon, plus a margin) & points passing the pre-test
+# are then tested exactly against the square once projected (contains)
+# the square includes its south & west edges, not its north & east edges (as ngr values)
+
+import crhMapFast       # fast mapping utilities
+
+## essential variables
+edgeSteps = 8       # points projected along each edge of an ngr square for its lat/lon box
+boxMargin = 0.001   # margin (deg) added around an ngr square's lat/lon box (projection differences)
+squareIndex = dict((letters, index) for index, letters in crhMapFast.ngrLetters.items())  # 'SK' -> (4, 3)
+
+## define classes
+class clip(object):
+    '''
+    clip area, create with fromNgr() or fromBox()
+    '''
+    def __init__(self, spec, minLat, minLon, maxLat, maxLon, square = None):
+        self.spec = spec    # ngr or lat/lon box as given, eg: for cache keys & messages
+        self.minLat, self.minLon, self.maxLat, self.maxLon = minLat, minLon, maxLat, maxLon
+        self.square = square    # (min easting, min northing, max easting, max northing), None for lat/lon box
+
+    def preTest(self, lat, lon):
+        '''
+        return True unless (lat, lon) is certainly outside the clip area (no projection)
+        '''
+        return self.minLat <= lat <= self.maxLat and self.minLon <= lon <= self.maxLon
+
+    def contains(self, east, north):
+        '''
+        return True if projected (easting, northing) of a point passing preTest() is inside the clip area
+        (easting & northing None if the point could not be projected)
+        '''
+        if self.square is None:
+            return True
+        if east is None or north is None:
+            return False
+        return self.square[0] <= east < self.square[2] and self.square[1] <= north < self.square[3]
+
+## define functions
+def ngrSquare(ngr):
+    '''
+    return (min easting, min northing, max easting, max northing) of national grid square given by ngr
+    eg: SK2070 gives (420000, 370000, 421000, 371000), raises ValueError for an invalid ngr
+    '''
+    ngr = ngr.replace(' ', '').upper()
+    digits = ngr[2:]
+    index = squareIndex.get(ngr[:2])
+    if index is None or len(digits) % 2 or len(digits) > 10 or (digits and not digits.isdigit()):
+        raise ValueError('invalid ngr square: {}'.format(ngr))
+    half = len(digits) // 2
+    size = 10 ** (5 - half)
+    east = index[0] * 100000 + (int(digits[:half]) * size if half else 0)
+    north = index[1] * 100000 + (int(digits[half:]) * size if half else 0)
+    return east, north, east + size, north + size
+
+def fromNgr(ngr):
+    '''
+    return clip object for national grid square given by ngr (eg: SK2070)
+    raises ValueError for an invalid ngr
+    '''
+    square = ngrSquare(ngr)
+    minE, minN, maxE, maxN = square
+    edges = list()
+    for step in range(edgeSteps + 1):
+        east = minE + (maxE - minE) * step // edgeSteps
+        north = minN + (maxN - minN) * step // edgeSteps
+        edges.extend([(east, minN), (east, maxN), (minE, north), (maxE, north)])
+    latLons = list()
+    for eastNorth in edges:
+        eastNorth = (min(eastNorth[0], crhMapFast.gridMaxE - 1), min(eastNorth[1], crhMapFast.gridMaxN - 1))
+        latLons.append(crhMapFast.osgb2wgs(eastNorth))
+    lats = [latLon[0] for latLon in latLons]
+    lons = [latLon[1] for latLon in latLons]
+    return clip(ngr.replace(' ', '').upper(), min(lats) - boxMargin, min(lons) - boxMargin,
+        max(lats) + boxMargin, max(lons) + boxMargin, square)
+
+def fromBox(box):
+    '''
+    return clip object for lat/lon box given as 'min lat,min lon,max lat,max lon' text (or sequence)
+    raises ValueError for an invalid box
+    '''
+    values = box.split(',') if isinstance(box, basestring) else box
+    try:
+        minLat, minLon, maxLat, maxLon = [float(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValueError('lat/lon box must be min lat,min lon,max lat,max lon: {}'.format(box))
+    if minLat > maxLat or minLon > maxLon:
+        raise ValueError('lat/lon box minimum exceeds maximum: {}'.format(box))
+    return clip('{},{},{},{}'.format(minLat, minLon, maxLat, maxLon), minLat, minLon, maxLat, maxLon)
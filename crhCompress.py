@@ -0,0 +1,191 @@
+# crhCompress.py -- transparent reading & writing of compressed (.gz, .bz2, .xz, .zip) data files
+# v1.00 crh 19-oct-26 -- initial release
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# the compression is set by the last file name extension, so route.gpx.gz is gzip compressed gpx data
+# compressed files are read & written as streams, without temporary decompressed copies
+# a .zip archive is read from its first member file, & written with a single member file
+# named after the archive (route.bsv.zip holds route.bsv), held in memory until closed
+# .xz files need the lzma module (python 3, or backports.lzma for python 2)
+# uncompressed files are handled as before, by plain file objects & crhFile
+
+import os
+import gzip
+import bz2
+import zipfile
+from StringIO import StringIO
+
+from crhFile import *   # file handling
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+## essential variables
+compressExts = ('.gz', '.bz2', '.xz', '.zip')
+
+## define functions
+def splitExt(fileName):
+    '''
+    return (name, data extension, compression extension) of file name,
+    eg: ('d:/gpx/route', '.gpx', '.gz') for d:/gpx/route.gpx.gz, compression extension '' if none
+    '''
+    name, ext = os.path.splitext(fileName)
+    if ext.lower() not in compressExts:
+        return name, ext, ''
+    name, dataExt = os.path.splitext(name)
+    return name, dataExt, ext
+
+def compressed(fileName):
+    '''
+    return True if file name has a compression extension
+    '''
+    return splitExt(fileName)[2] != ''
+
+def autoName(fileName, ext, compress = ''):
+    '''
+    return file name with its data & compression extensions replaced by ext & compress
+    eg: autoName('route.gpx.gz', '.txt') gives 'route.txt'
+    '''
+    return splitExt(fileName)[0] + ext + compress
+
+class _zipWriter(object):
+    '''
+    write-only file object holding data until closed, then stored as the single member of a zip archive
+    '''
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.buffer = StringIO()
+
+    def write(self, data):
+        self.buffer.write(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.buffer is None:
+            return
+        name, dataExt, ext = splitExt(os.path.basename(self.fileName))
+        with zipfile.ZipFile(self.fileName, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(name + dataExt, self.buffer.getvalue())
+        self.buffer.close()
+        self.buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+class _zipReader(object):
+    '''
+    read-only file object for the first member of a zip archive, closing the archive when closed
+    '''
+    def __init__(self, fileName):
+        self.archive = zipfile.ZipFile(fileName, 'r')
+        members = [info for info in self.archive.infolist() if not info.filename.endswith('/')]
+        if not members:
+            self.archive.close()
+            raise IOError('zip archive has no member files: {}'.format(fileName))
+        self.member = self.archive.open(members[0])
+
+    def read(self, size = -1):
+        return self.member.read(size)
+
+    def __iter__(self):
+        return iter(self.member)
+
+    def close(self):
+        self.member.close()
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+def _lzma(fileName):
+    if lzma is None:
+        raise IOError('lzma module not available, unable to open .xz file: {}'.format(fileName))
+    return lzma
+
+def openInput(fileName):
+    '''
+    return file object reading (decompressed) data from file, in binary mode
+    raises IOError if the file cannot be opened
+    '''
+    ext = splitExt(fileName)[2].lower()
+    if ext == '.gz':
+        return gzip.open(fileName, 'rb')
+    elif ext == '.bz2':
+        return bz2.BZ2File(fileName, 'rb')
+    elif ext == '.xz':
+        return _lzma(fileName).LZMAFile(fileName, 'rb')
+    elif ext == '.zip':
+        try:
+            return _zipReader(fileName)
+        except zipfile.BadZipfile as e:
+            raise IOError('{}: {}'.format(e, fileName))
+    return open(fileName, 'rb')
+
+def openOutput(fileName, mode = 'w'):
+    '''
+    return file object writing to file, compressed as its extension says, None if it cannot be opened
+    (as crhFile.openFile)
+    '''
+    ext = splitExt(fileName)[2].lower()
+    if not ext:
+        return openFile(fileName, mode)
+    try:
+        if ext == '.gz':
+            return gzip.open(fileName, 'wb')
+        elif ext == '.bz2':
+            return bz2.BZ2File(fileName, 'wb')
+        elif ext == '.xz':
+            return _lzma(fileName).LZMAFile(fileName, 'wb')
+        else:
+            open(fileName, 'wb').close()    # check writeable now, archive written on close
+            return _zipWriter(fileName)
+    except IOError:
+        return None
+
+def fileIter(fileglob, directory):
+    '''
+    yield files in directory matching fileglob (as crhFile.getFileIter),
+    followed by compressed files matching it, unless fileglob has a compression extension itself
+    eg: *.gpx matches route.gpx, route.gpx.gz, route.gpx.zip...
+    '''
+    fileglobs = [fileglob]
+    if not compressed(fileglob):
+        fileglobs.extend([fileglob + ext for ext in compressExts])
+    seen = set()
+    for pattern in fileglobs:
+        for fileName in getFileIter(pattern, directory):
+            if fileName not in seen:
+                seen.add(fileName)
+                yield fileName
+
+def lineGen(fileName):
+    '''
+    yield lines of (decompressed) file without line endings, as crhFile.fileLineGen
+    '''
+    if not compressed(fileName):
+        for line in fileLineGen(fileName):
+            yield line
+        return
+    f = openInput(fileName)
+    try:
+        for line in f:
+            yield line.rstrip('\r\n')
+    finally:
+        f.close()
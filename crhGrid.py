@@ -0,0 +1,281 @@
+# crhGrid.py -- memory-mapped binary grids (eg: OSTN15-style shift grids) sampled in batches
+# v1.00 crh 19-oct-26 -- initial release
+# v1.10 crh 19-oct-26 -- thread-safe first sample
+# v1.20 crh 19-oct-26 -- elevation rasters (ESRI ASCII grid conversion)
+# v1.30 crh 19-oct-26 -- grids pickle as their file name (eg: passed to worker processes)
+# v1.31 crh 19-oct-26 -- grid values held & written as float32 arrays a row at a time, empty grid files refused
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# binary grid file layout (little-endian):
+#   header: magic 'CRHG', version (uint16), bands (uint16),
+#           origin easting, origin northing, cell size (float64, m), nodata value (float64),
+#           columns, rows (uint32)
+#   data:   float32 values, row by row from the south west corner, bands values per node
+# a shift grid has 2 bands (easting & northing shifts, m), an elevation raster has 1 band
+#
+# the file is only opened & memory-mapped when first sampled, so creating a grid costs nothing
+# (a lock ensures threads sampling the same grid object at once map it only once);
+# a grid pickles as its file name, so a copy passed to another process maps the file itself
+# sample() interpolates bilinearly at a batch of points, using numpy (no python level loop)
+# when it is installed & falling back to one struct lookup per node otherwise
+#
+# elevation rasters (DEMs) in OSGB coordinates are often supplied as ESRI ASCII grids (.asc),
+# which are converted once to a binary grid file alongside them (reconverted if the .asc file is newer),
+# their cell centres becoming the grid nodes; the values are read into a float32 array (4 bytes each)
+# & written a row at a time, so large rasters are converted without a python float per cell
+
+import os
+import sys
+import math
+import mmap
+import struct
+import threading
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+## essential variables
+magic = b'CRHG'
+version = 1
+headerFmt = '<4sHHddddII'
+headerSize = struct.calcsize(headerFmt)
+gridExt = '.grd'
+asciiExt = '.asc'
+swapBytes = sys.byteorder != 'little'   # array values are native byte order, the file's little-endian
+
+## define functions
+def writeGrid(fileName, originE, originN, cellSize, columns, rows, values, bands = 1, nodata = -9999.0):
+    '''
+    write binary grid file, values is a flat sequence of rows * columns * bands floats
+    (row by row from the south west corner), written a row at a time
+    '''
+    if len(values) != rows * columns * bands:
+        raise ValueError('grid needs {} values, {} given'.format(rows * columns * bands, len(values)))
+    rowSize = columns * bands
+    with open(fileName, 'wb') as f:
+        f.write(struct.pack(headerFmt, magic, version, bands, originE, originN, cellSize, nodata, columns, rows))
+        for start in range(0, len(values), rowSize):
+            row = array('f', values[start:start + rowSize])
+            if swapBytes:
+                row.byteswap()
+            row.tofile(f)
+
+def synthShiftGrid(fileName, cellSize = 50000.0):
+    '''
+    write synthetic shift grid covering the national grid, for testing only
+    shifts vary smoothly over roughly the range of the real OSTN15 easting & northing shifts
+    '''
+    columns = int(700000 / cellSize) + 1
+    rows = int(1300000 / cellSize) + 1
+    values = list()
+    for row in range(rows):
+        for col in range(columns):
+            x = col * cellSize / 700000.0
+            y = row * cellSize / 1300000.0
+            values.append(88.0 + 12.0 * math.sin(2 * math.pi * x) * math.cos(math.pi * y))
+            values.append(-64.0 + 16.0 * math.cos(math.pi * x) * math.sin(2 * math.pi * y))
+    writeGrid(fileName, 0.0, 0.0, cellSize, columns, rows, values, bands = 2)
+
+def readAsciiGrid(fileName):
+    '''
+    return (origin easting, origin northing, cell size, columns, rows, values, nodata) of ESRI ASCII grid file,
+    values (float32 array) row by row from the south west cell centre (as writeGrid())
+    raises RuntimeError if the file is not a valid ESRI ASCII grid
+    '''
+    header = dict()
+    values = array('f')     # north to south, as in the file
+    with open(fileName, 'r') as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            try:
+                if fields[0][0].isalpha():
+                    if len(fields) != 2:
+                        raise RuntimeError('invalid ESRI ASCII grid header line: {}'.format(line.strip()))
+                    header[fields[0].lower()] = float(fields[1])
+                else:
+                    values.fromlist([float(value) for value in fields])
+            except ValueError:
+                raise RuntimeError('invalid ESRI ASCII grid line: {} ({})'.format(line.strip()[:40], fileName))
+    try:
+        columns, rows, cellSize = int(header['ncols']), int(header['nrows']), header['cellsize']
+        if 'xllcenter' in header:
+            originE, originN = header['xllcenter'], header['yllcenter']
+        else:
+            originE, originN = header['xllcorner'] + cellSize / 2, header['yllcorner'] + cellSize / 2
+    except KeyError as e:
+        raise RuntimeError('ESRI ASCII grid header value missing: {} ({})'.format(e, fileName))
+    if len(values) != rows * columns:
+        raise RuntimeError('ESRI ASCII grid needs {} values, {} found: {}'.format(rows * columns, len(values),
+            fileName))
+    flat = array('f')
+    for row in reversed(range(rows)):
+        flat.extend(values[row * columns:(row + 1) * columns])
+    return originE, originN, cellSize, columns, rows, flat, header.get('nodata_value', -9999.0)
+
+def asciiToGrid(asciiFile, gridFile = None):
+    '''
+    convert ESRI ASCII grid file to (1 band) binary grid file, by default named after it with .grd extension
+    returns binary grid file name
+    '''
+    if gridFile is None:
+        gridFile = os.path.splitext(asciiFile)[0] + gridExt
+    originE, originN, cellSize, columns, rows, values, nodata = readAsciiGrid(asciiFile)
+    writeGrid(gridFile, originE, originN, cellSize, columns, rows, values, nodata = nodata)
+    return gridFile
+
+def elevationGrid(fileName):
+    '''
+    return grid object for elevation raster file: binary grid file, or ESRI ASCII grid file
+    (converted to binary grid file first, unless already done since the .asc file last changed)
+    raises RuntimeError if the grid has more than 1 band, IOError if a file cannot be read or written
+    '''
+    if os.path.splitext(fileName)[1].lower() == asciiExt:
+        gridFile = os.path.splitext(fileName)[0] + gridExt
+        if not os.path.exists(gridFile) or os.path.getmtime(gridFile) < os.path.getmtime(fileName):
+            asciiToGrid(fileName, gridFile)
+        fileName = gridFile
+    elevation = grid(fileName)
+    elevation.extent()  # map now, checking header
+    if elevation.bands != 1:
+        raise RuntimeError('elevation grid must have 1 band, {} found: {}'.format(elevation.bands, fileName))
+    return elevation
+
+class grid(object):
+    '''
+    memory-mapped binary grid, sampled by bilinear interpolation at batches of eastings & northings
+    '''
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self._map = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'fileName': self.fileName}
+
+    def __setstate__(self, state):
+        self.__init__(state['fileName'])
+
+    def _open(self):
+        '''
+        open & memory-map grid file, read header (first sample only)
+        '''
+        with self._lock:
+            if self._map is None:
+                self._mapFile()
+
+    def _mapFile(self):
+        '''
+        memory-map grid file & read header
+        the map is only published once the header is read, as sample() tests it without the lock
+        raises RuntimeError if the file is too short to hold a header (an empty file cannot be mapped)
+        '''
+        with open(self.fileName, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < headerSize:
+                raise RuntimeError('binary grid file truncated (no header): {}'.format(self.fileName))
+            gridMap = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        (fileMagic, fileVersion, self.bands, self.originE, self.originN, self.cellSize, self.nodata,
+            self.columns, self.rows) = struct.unpack_from(headerFmt, gridMap, 0)
+        if fileMagic != magic or fileVersion != version:
+            gridMap.close()
+            raise RuntimeError('not a version {} binary grid file: {}'.format(version, self.fileName))
+        if len(gridMap) < headerSize + self.rows * self.columns * self.bands * 4:
+            gridMap.close()
+            raise RuntimeError('binary grid file truncated: {}'.format(self.fileName))
+        if numpy is not None:
+            self._array = numpy.frombuffer(gridMap, dtype = '<f4', offset = headerSize,
+                count = self.rows * self.columns * self.bands).reshape(self.rows, self.columns, self.bands)
+        self._map = gridMap
+
+    def close(self):
+        '''
+        release memory map
+        '''
+        if self._map is not None:
+            self._array = None
+            self._map.close()
+            self._map = None
+
+    def extent(self):
+        '''
+        return (min easting, min northing, max easting, max northing) covered by the grid
+        '''
+        if self._map is None:
+            self._open()
+        return (self.originE, self.originN, self.originE + (self.columns - 1) * self.cellSize,
+            self.originN + (self.rows - 1) * self.cellSize)
+
+    def sample(self, eastings, northings):
+        '''
+        return list of bands sequences of values interpolated at each (easting, northing)
+        points outside the grid, or next to nodata nodes, give None (nan with numpy)
+        '''
+        if self._map is None:
+            self._open()
+        if numpy is not None:
+            return self._sampleArray(numpy.asarray(eastings, dtype = float), numpy.asarray(northings, dtype = float))
+        return self._sampleList(eastings, northings)
+
+    def _sampleArray(self, eastings, northings):
+        '''
+        vectorised bilinear interpolation (numpy)
+        '''
+        x = (eastings - self.originE) / self.cellSize
+        y = (northings - self.originN) / self.cellSize
+        with numpy.errstate(invalid = 'ignore'):    # nan eastings/northings fall outside
+            inside = (x >= 0) & (y >= 0) & (x <= self.columns - 1) & (y <= self.rows - 1)
+        x = numpy.where(inside, x, 0.0)
+        y = numpy.where(inside, y, 0.0)
+        col = numpy.clip(numpy.floor(x).astype(int), 0, max(self.columns - 2, 0))
+        row = numpy.clip(numpy.floor(y).astype(int), 0, max(self.rows - 2, 0))
+        fx = (x - col)[:, None]
+        fy = (y - row)[:, None]
+        col1 = numpy.minimum(col + 1, self.columns - 1)
+        row1 = numpy.minimum(row + 1, self.rows - 1)
+        v00 = self._array[row, col]
+        v10 = self._array[row, col1]
+        v01 = self._array[row1, col]
+        v11 = self._array[row1, col1]
+        values = (v00 * (1 - fx) * (1 - fy) + v10 * fx * (1 - fy) + v01 * (1 - fx) * fy + v11 * fx * fy)
+        corners = (v00 == self.nodata) | (v10 == self.nodata) | (v01 == self.nodata) | (v11 == self.nodata)
+        values[corners | ~inside[:, None]] = numpy.nan
+        return [values[:, band] for band in range(self.bands)]
+
+    def _node(self, row, col):
+        '''
+        return tuple of band values at grid node
+        '''
+        offset = headerSize + ((row * self.columns + col) * self.bands) * 4
+        return struct.unpack_from('<{}f'.format(self.bands), self._map, offset)
+
+    def _sampleList(self, eastings, northings):
+        '''
+        bilinear interpolation without numpy
+        '''
+        results = [list() for band in range(self.bands)]
+        for east, north in zip(eastings, northings):
+            x = (east - self.originE) / self.cellSize
+            y = (north - self.originN) / self.cellSize
+            if x < 0 or y < 0 or x > self.columns - 1 or y > self.rows - 1:
+                for band in results: band.append(None)
+                continue
+            col = min(int(x), max(self.columns - 2, 0))
+            row = min(int(y), max(self.rows - 2, 0))
+            fx, fy = x - col, y - row
+            col1, row1 = min(col + 1, self.columns - 1), min(row + 1, self.rows - 1)
+            corners = (self._node(row, col), self._node(row, col1), self._node(row1, col), self._node(row1, col1))
+            for band, values in enumerate(results):
+                v00, v10, v01, v11 = [corner[band] for corner in corners]
+                if self.nodata in (v00, v10, v01, v11):
+                    values.append(None)
+                else:
+                    values.append(v00 * (1 - fx) * (1 - fy) + v10 * fx * (1 - fy) + v01 * (1 - fx) * fy + v11 * fx * fy)
+        return results
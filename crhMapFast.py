@@ -0,0 +1,346 @@
+# crhMapFast.py -- faster variants of crhMap conversions (batching, caching, lookup tables)
+# v1.00 crh 19-oct-26 -- initial release
+# v1.10 crh 19-oct-26 -- grid (OSTN15-style shift grid) mode added
+# v1.20 crh 19-oct-26 -- multi-precision ngr formatting (osgb2ngrMulti)
+# v1.30 crh 19-oct-26 -- crhGrid (& numpy) only imported by grid mode, for fast start-up
+# v1.31 crh 19-oct-26 -- notes on when wgs2osgbCached & wgs2osgbList are faster
+# v1.32 crh 19-oct-26 -- grid mode array variants (wgs2osgbArray, osgb2wgsArray), osgb2wgs rounding noted
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# every function here must give the same answer as its scalar crhMap counterpart,
+# use mapCheck.py to confirm this (and to measure the speed-up) after any change
+#
+# national grid extent: eastings 0-700000m, northings 0-1300000m
+# ngr letters are looked up from a table built once at import time
+# osgb2ngrMulti formats several precisions (eg: 100m, 10m & 1m) from one easting/northing,
+# so scripts can output a column per precision from a single projection
+#
+# grid mode: instead of crhMap's helmert transform, lat/lon (ETRS89, taken as WGS84) is
+# projected onto the national grid using the GRS80 ellipsoid & the easting/northing shifts
+# interpolated from a crhGrid shift grid are added (& removed iteratively for the reverse),
+# with numpy installed the projection & interpolation work on whole arrays of points
+# crhGrid (& so numpy) is only imported when grid mode is first used, so importing this module
+# costs next to nothing (eg: for single conversions by the command line scripts)
+# wgs2osgbArray & osgb2wgsArray return the grid mode results as numpy arrays (nan outside the grid),
+# for callers working on arrays, the list variants only building their tuples from these
+#
+# osgb2wgs outside grid mode passes the easting & northing to crhMap.osgb2wgs as a 10 digit (1m) ngr,
+# so they are truncated to the south west corner of their 1m square (up to 1.4m out), as crhMap itself
+
+import math
+
+import crhMap   # mapping utilities (reference implementation)
+
+## essential variables
+gridMaxE = 700000   # national grid extent (m)
+gridMaxN = 1300000
+cacheSize = 100000  # maximum entries held by cached conversions
+precisionCodes = {'l': 6, 'm': 8, 'h': 10}  # -p argument codes (100m, 10m & 1m ngr)
+
+# transverse mercator projection of the national grid on the GRS80 ellipsoid
+grsA, grsB = 6378137.0, 6356752.3141
+tmF0 = 0.9996012717
+tmLat0, tmLon0 = math.radians(49.0), math.radians(-2.0)
+tmE0, tmN0 = 400000.0, -100000.0
+
+ngrLetters = {}     # (100km east index, 100km north index) -> two letter square code
+_wgs2osgbCache = {}
+
+## define functions
+def _buildLetterTable():
+    '''
+    populate ngrLetters for every 100km square in the national grid
+    '''
+    for e100k in range(gridMaxE // 100000):
+        for n100k in range(gridMaxN // 100000):
+            l1 = (19 - n100k) - (19 - n100k) % 5 + (e100k + 10) // 5
+            l2 = (19 - n100k) * 5 % 25 + e100k % 5
+            if l1 > 7: l1 += 1  # no letter I
+            if l2 > 7: l2 += 1
+            ngrLetters[(e100k, n100k)] = chr(l1 + ord('A')) + chr(l2 + ord('A'))
+
+def osgb2ngr(eastNorth, precision = 8):
+    '''
+    return ngr string of given digits precision (even number, 2-10) for (easting, northing)
+    table driven equivalent of crhMap.osgb2ngr(), raises RuntimeError outside the national grid
+    '''
+    east = int(eastNorth[0])
+    north = int(eastNorth[1])
+    if east < 0 or east >= gridMaxE or north < 0 or north >= gridMaxN:
+        raise RuntimeError('easting/northing outside national grid: {}, {}'.format(east, north))
+    digits = precision // 2
+    scale = 10 ** (5 - digits)
+    return '{}{:0{w}d}{:0{w}d}'.format(ngrLetters[(east // 100000, north // 100000)],
+        (east % 100000) // scale, (north % 100000) // scale, w = digits)
+
+def osgb2ngrMulti(eastNorth, precisions):
+    '''
+    return tuple of ngr strings, one for each precision in sequence precisions, for (easting, northing)
+    eg: osgb2ngrMulti((425695, 377871), (6, 8, 10)) gives ('SK256778', 'SK25697787', 'SK2569577871')
+    the square letters & offsets are found once for all precisions, raises RuntimeError outside the national grid
+    '''
+    east = int(eastNorth[0])
+    north = int(eastNorth[1])
+    if east < 0 or east >= gridMaxE or north < 0 or north >= gridMaxN:
+        raise RuntimeError('easting/northing outside national grid: {}, {}'.format(east, north))
+    letters = ngrLetters[(east // 100000, north // 100000)]
+    east %= 100000
+    north %= 100000
+    ngrs = list()
+    for precision in precisions:
+        digits = precision // 2
+        scale = 10 ** (5 - digits)
+        ngrs.append('{}{:0{w}d}{:0{w}d}'.format(letters, east // scale, north // scale, w = digits))
+    return tuple(ngrs)
+
+def ngrPrecisions(codes):
+    '''
+    return tuple of ngr precisions (digits) for comma separated precision codes, eg: 'l,m,h' gives (6, 8, 10)
+    repeated codes are ignored, raises ValueError for an unknown (or no) code
+    '''
+    precisions = list()
+    for code in codes.split(','):
+        code = code.strip().lower()
+        if code not in precisionCodes:
+            raise ValueError('unknown ngr precision: {!r} (use l, m or h, eg: l,m,h)'.format(code))
+        if precisionCodes[code] not in precisions:
+            precisions.append(precisionCodes[code])
+    return tuple(precisions)
+
+def wgs2osgbCached(latLon):
+    '''
+    crhMap.wgs2osgb() with results memoised on the exact (lat, lon) value
+    way-points at rest repeat their coordinates so long tracks hit the cache often
+    (slower than crhMap.wgs2osgb for coordinates that do not repeat)
+    '''
+    key = (latLon[0], latLon[1])
+    try:
+        return _wgs2osgbCache[key]
+    except KeyError:
+        if len(_wgs2osgbCache) >= cacheSize:
+            _wgs2osgbCache.clear()
+        eastNorth = _wgs2osgbCache[key] = crhMap.wgs2osgb(latLon)
+        return eastNorth
+
+def wgs2osgbList(latLons, shiftGrid = None):
+    '''
+    return list of (easting, northing) for sequence of (lat, lon) values
+    grid mode (shift grid given) works on whole arrays, giving None outside the grid,
+    otherwise a plain loop over crhMap.wgs2osgb (same interface, no faster)
+    '''
+    if shiftGrid is not None:
+        return _wgs2osgbGrid(latLons, shiftGrid)
+    convert = crhMap.wgs2osgb
+    return [convert(latLon) for latLon in latLons]
+
+def _meridian(lat, m):
+    '''
+    return meridional arc (m) from true origin to latitude lat (radians)
+    '''
+    n = (grsA - grsB) / (grsA + grsB)
+    return grsB * tmF0 * ((1 + n + 1.25 * n ** 2 + 1.25 * n ** 3) * (lat - tmLat0)
+        - (3 * n + 3 * n ** 2 + 21.0 / 8 * n ** 3) * m.sin(lat - tmLat0) * m.cos(lat + tmLat0)
+        + (15.0 / 8 * n ** 2 + 15.0 / 8 * n ** 3) * m.sin(2 * (lat - tmLat0)) * m.cos(2 * (lat + tmLat0))
+        - 35.0 / 24 * n ** 3 * m.sin(3 * (lat - tmLat0)) * m.cos(3 * (lat + tmLat0)))
+
+def _tmForward(lat, lon, m):
+    '''
+    return (easting, northing) on GRS80 for lat, lon (radians), m is math or numpy
+    '''
+    e2 = 1 - grsB ** 2 / grsA ** 2
+    sinLat, cosLat, tanLat = m.sin(lat), m.cos(lat), m.tan(lat)
+    nu = grsA * tmF0 / m.sqrt(1 - e2 * sinLat ** 2)
+    rho = grsA * tmF0 * (1 - e2) / (1 - e2 * sinLat ** 2) ** 1.5
+    eta2 = nu / rho - 1
+    dLon = lon - tmLon0
+    north = (_meridian(lat, m) + tmN0 + nu / 2 * sinLat * cosLat * dLon ** 2
+        + nu / 24 * sinLat * cosLat ** 3 * (5 - tanLat ** 2 + 9 * eta2) * dLon ** 4
+        + nu / 720 * sinLat * cosLat ** 5 * (61 - 58 * tanLat ** 2 + tanLat ** 4) * dLon ** 6)
+    east = (tmE0 + nu * cosLat * dLon + nu / 6 * cosLat ** 3 * (nu / rho - tanLat ** 2) * dLon ** 3
+        + nu / 120 * cosLat ** 5 * (5 - 18 * tanLat ** 2 + tanLat ** 4 + 14 * eta2
+        - 58 * tanLat ** 2 * eta2) * dLon ** 5)
+    return east, north
+
+def _tmInverse(east, north, m):
+    '''
+    return (lat, lon) radians on GRS80 for easting, northing, m is math or numpy
+    '''
+    e2 = 1 - grsB ** 2 / grsA ** 2
+    lat = (north - tmN0) / (grsA * tmF0) + tmLat0
+    for i in range(20):
+        residual = north - tmN0 - _meridian(lat, m)
+        worst = abs(residual) if m is math else abs(residual).max()
+        if worst < 0.00001:    # 0.01mm
+            break
+        lat = lat + residual / (grsA * tmF0)
+    sinLat, cosLat, tanLat = m.sin(lat), m.cos(lat), m.tan(lat)
+    nu = grsA * tmF0 / m.sqrt(1 - e2 * sinLat ** 2)
+    rho = grsA * tmF0 * (1 - e2) / (1 - e2 * sinLat ** 2) ** 1.5
+    eta2 = nu / rho - 1
+    secLat = 1 / cosLat
+    dE = east - tmE0
+    lat = (lat - tanLat / (2 * rho * nu) * dE ** 2
+        + tanLat / (24 * rho * nu ** 3) * (5 + 3 * tanLat ** 2 + eta2 - 9 * tanLat ** 2 * eta2) * dE ** 4
+        - tanLat / (720 * rho * nu ** 5) * (61 + 90 * tanLat ** 2 + 45 * tanLat ** 4) * dE ** 6)
+    lon = (tmLon0 + secLat / nu * dE - secLat / (6 * nu ** 3) * (nu / rho + 2 * tanLat ** 2) * dE ** 3
+        + secLat / (120 * nu ** 5) * (5 + 28 * tanLat ** 2 + 24 * tanLat ** 4) * dE ** 5
+        - secLat / (5040 * nu ** 7) * (61 + 662 * tanLat ** 2 + 1320 * tanLat ** 4 + 720 * tanLat ** 6) * dE ** 7)
+    return lat, lon
+
+def _tmInverseRefined(east, north, m, iterations = 2):
+    '''
+    _tmInverse() corrected by projecting its result forward again,
+    removing the series truncation error (mm) far from the central meridian
+    '''
+    lat, lon = _tmInverse(east, north, m)
+    for i in range(iterations):
+        fwdE, fwdN = _tmForward(lat, lon, m)
+        lat, lon = lat + (north - fwdN) / (grsA * tmF0), lon + (east - fwdE) / (grsA * tmF0 * m.cos(lat))
+    return lat, lon
+
+def _gridShifts(shiftGrid, east, north):
+    '''
+    return (easting shift, northing shift) sequences interpolated from shift grid
+    '''
+    shifts = shiftGrid.sample(east, north)
+    return shifts[0], shifts[1]
+
+def _numpy():
+    '''
+    return numpy module (imported by crhGrid), raises ImportError if it is not installed
+    '''
+    import crhGrid  # memory-mapped grids (grid mode only)
+    if crhGrid.numpy is None:
+        raise ImportError('numpy needed for grid mode array conversions')
+    return crhGrid.numpy
+
+def _pairList(np, first, second):
+    '''
+    return list of (first, second) value tuples from arrays, None where first is nan
+    '''
+    pairs = zip(first.tolist(), second.tolist())
+    for i in np.flatnonzero(np.isnan(first)).tolist():
+        pairs[i] = None
+    return pairs
+
+def wgs2osgbArray(latLons, shiftGrid):
+    '''
+    grid mode conversion of sequence (or n x 2 array) of (lat, lon) values,
+    return (eastings, northings) numpy arrays, nan for points outside the shift grid
+    raises ImportError if numpy is not installed
+    '''
+    np = _numpy()
+    latLon = np.radians(np.asarray(latLons, dtype = float).reshape(-1, 2))
+    east, north = _tmForward(latLon[:, 0], latLon[:, 1], np)
+    shiftE, shiftN = _gridShifts(shiftGrid, east, north)
+    return east + shiftE, north + shiftN
+
+def osgb2wgsArray(eastNorths, shiftGrid, iterations = 4):
+    '''
+    grid mode conversion of sequence (or n x 2 array) of (easting, northing) values, shifts removed iteratively,
+    return (lats, lons) numpy arrays, nan for points outside the shift grid
+    raises ImportError if numpy is not installed
+    '''
+    np = _numpy()
+    minE, minN, maxE, maxN = shiftGrid.extent()
+    eastNorth = np.asarray(eastNorths, dtype = float).reshape(-1, 2)
+    east, north = eastNorth[:, 0], eastNorth[:, 1]
+    gridE, gridN = east, north
+    for i in range(iterations):  # shifts sampled within grid until converged
+        shiftE, shiftN = _gridShifts(shiftGrid, np.clip(gridE, minE, maxE), np.clip(gridN, minN, maxN))
+        gridE, gridN = east - shiftE, north - shiftN
+    invalid = np.isnan(_gridShifts(shiftGrid, gridE, gridN)[0])
+    lat, lon = _tmInverseRefined(np.where(invalid, tmE0, gridE), np.where(invalid, 0.0, gridN), np)
+    lat, lon = np.degrees(lat), np.degrees(lon)
+    lat[invalid] = lon[invalid] = np.nan
+    return lat, lon
+
+def _wgs2osgbGrid(latLons, shiftGrid):
+    '''
+    grid mode wgs2osgbList(), None for points outside the shift grid
+    '''
+    import crhGrid  # memory-mapped grids (grid mode only)
+    np = crhGrid.numpy
+    if np is not None and len(latLons):
+        return _pairList(np, *wgs2osgbArray(latLons, shiftGrid))
+    projected = [_tmForward(math.radians(lat), math.radians(lon), math) for lat, lon in latLons]
+    shiftE, shiftN = _gridShifts(shiftGrid, [p[0] for p in projected], [p[1] for p in projected])
+    return [None if se is None or sn is None else (p[0] + se, p[1] + sn)
+        for p, se, sn in zip(projected, shiftE, shiftN)]
+
+def _osgb2wgsGrid(eastNorths, shiftGrid, iterations = 4):
+    '''
+    grid mode osgb2wgsList(), shifts removed iteratively, None for points outside the shift grid
+    '''
+    import crhGrid  # memory-mapped grids (grid mode only)
+    np = crhGrid.numpy
+    if np is not None and len(eastNorths):
+        return _pairList(np, *osgb2wgsArray(eastNorths, shiftGrid, iterations))
+    minE, minN, maxE, maxN = shiftGrid.extent()
+    results = list()
+    for east, north in eastNorths:
+        gridE, gridN = east, north
+        for i in range(iterations):  # shifts sampled within grid until converged
+            shiftE, shiftN = _gridShifts(shiftGrid, [min(max(gridE, minE), maxE)], [min(max(gridN, minN), maxN)])
+            if shiftE[0] is None or shiftN[0] is None:
+                break
+            gridE, gridN = east - shiftE[0], north - shiftN[0]
+        if shiftE[0] is None or _gridShifts(shiftGrid, [gridE], [gridN])[0][0] is None:
+            results.append(None)
+            continue
+        lat, lon = _tmInverseRefined(gridE, gridN, math)
+        results.append((math.degrees(lat), math.degrees(lon)))
+    return results
+
+def wgs2osgb(latLon, shiftGrid = None):
+    '''
+    crhMap.wgs2osgb(), or its grid mode equivalent if a crhGrid shift grid is given
+    '''
+    if shiftGrid is None:
+        return crhMap.wgs2osgb(latLon)
+    eastNorth = _wgs2osgbGrid([latLon], shiftGrid)[0]
+    if eastNorth is None:
+        raise RuntimeError('lat/lon outside shift grid: {}'.format(latLon))
+    return eastNorth
+
+def osgb2wgs(eastNorth, shiftGrid = None):
+    '''
+    crhMap.osgb2wgs() for (easting, northing), or its grid mode equivalent if a crhGrid shift grid is given
+    (without a grid the easting & northing are truncated to whole metres, via a 10 digit ngr)
+    '''
+    if shiftGrid is None:
+        return crhMap.osgb2wgs(osgb2ngr(eastNorth, 10))
+    latLon = _osgb2wgsGrid([eastNorth], shiftGrid)[0]
+    if latLon is None:
+        raise RuntimeError('easting/northing outside shift grid: {}'.format(eastNorth))
+    return latLon
+
+def osgb2wgsList(eastNorths, shiftGrid = None):
+    '''
+    return list of (lat, lon) for sequence of (easting, northing) values
+    grid mode (shift grid given) works on whole arrays, giving None outside the grid,
+    otherwise each easting & northing is truncated to whole metres (see osgb2wgs())
+    '''
+    if shiftGrid is not None:
+        return _osgb2wgsGrid(eastNorths, shiftGrid)
+    return [osgb2wgs(eastNorth) for eastNorth in eastNorths]
+
+def osgb2ngrList(eastNorths, precision = 8, invalid = None):
+    '''
+    return list of ngr strings for sequence of (easting, northing) values
+    points outside the national grid give the invalid value rather than raising RuntimeError
+    '''
+    ngrLst = list()
+    for eastNorth in eastNorths:
+        try:
+            ngrLst.append(osgb2ngr(eastNorth, precision))
+        except RuntimeError:
+            ngrLst.append(invalid)
+    return ngrLst
+
+## initialise module
+_buildLetterTable()
@@ -0,0 +1,160 @@
+# crhPipeline.py -- prefetching & background writing for batch processing
+# v1.00 crh 19-oct-26 -- initial release
+# v1.01 crh 19-oct-26 -- writer holds any exception (eg: UnicodeEncodeError), the queue still being drained
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# overlaps the reading & writing of files with their processing, eg: on network storage:
+#   prefetcher -- iterates over file names, a background thread reading up to depth files
+#                 ahead of the file being processed (read through & discarded, so the processing
+#                 then reads them from the operating system cache whatever module reads them)
+#   writer     -- writes output text to files from a background thread, in the order given,
+#                 through a queue of up to depth text blocks (so memory use stays bounded)
+# errors reading ahead (of any kind) are ignored, the file being checked & read again when processed;
+# errors writing are held by the writer & raised (as IOError, other exceptions as they are) by check()
+# or close(), later writes to the same file being dropped; the writer thread carries on draining the
+# queue whatever the error, so the processing never blocks on a full queue
+
+import threading
+from Queue import Queue
+
+from crhDebug import *  # debug & messaging
+
+## essential variables
+blockSize = 1048576 # bytes read from file at a time when reading ahead
+_end = object()     # end of queue marker
+
+## define classes
+class prefetcher(object):
+    '''
+    iterable of file names, files read ahead by a background thread (up to depth files ahead)
+    '''
+    def __init__(self, fileNames, depth = 2, fetch = None):
+        self.fileNames = list(fileNames)
+        self.fetch = readThrough if fetch is None else fetch
+        self.queue = Queue(maxsize = max(1, depth))
+        self.thread = threading.Thread(target = self._run, name = 'prefetcher')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        for fileName in self.fileNames:
+            try:
+                self.fetch(fileName)
+            except Exception:   # checked again when processed
+                pass
+            self.queue.put(fileName)
+        self.queue.put(_end)
+
+    def __iter__(self):
+        while True:
+            fileName = self.queue.get()
+            if fileName is _end:
+                return
+            yield fileName
+
+    def __len__(self):
+        return len(self.fileNames)
+
+class writer(object):
+    '''
+    background file writer, write() & end() text for each output file in turn, then close()
+    opener(fileName) returns an open file object (None if the file cannot be opened)
+    '''
+    def __init__(self, opener, depth = 2, quiet = False):
+        self.opener = opener
+        self.quiet = quiet
+        self.queue = Queue(maxsize = max(1, depth))
+        self.errors = list()
+        self.failed = set()
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target = self._run, name = 'writer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        fileH = openName = None
+        while True:
+            fileName, text = self.queue.get()
+            if fileName is _end:
+                break
+            if fileName in self.failed:
+                continue
+            try:
+                if fileH is not None and fileName != openName:  # previous file not ended
+                    fileH.close()
+                    fileH = None
+                if text is None:    # end of file
+                    if fileH is not None:
+                        fileH.close()
+                        fileH = None
+                    continue
+                if fileH is None:
+                    fileH = self.opener(fileName)
+                    if fileH is None:
+                        raise IOError('error opening output file {}'.format(fileName))
+                    openName = fileName
+                    statusErrMsg('info', 'writer', 'output file opened: {}'.format(fileName), self.quiet)
+                fileH.write(text)
+            except Exception as e:
+                self._fail(fileName, e)
+                if fileH is not None:
+                    try:
+                        fileH.close()
+                    except Exception:
+                        pass
+                    fileH = None
+        if fileH is not None:
+            try:
+                fileH.close()
+            except Exception as e:
+                self._fail(openName, e)
+
+    def _fail(self, fileName, e):
+        '''
+        hold error writing file, to be raised by check(), & drop later writes to the file
+        '''
+        with self.lock:
+            self.failed.add(fileName)
+            self.errors.append(IOError(str(e)) if isinstance(e, OSError) else e)
+
+    def write(self, fileName, text):
+        '''
+        queue text to be written to file (opened on first write), blocking while the queue is full
+        '''
+        self.queue.put((fileName, text))
+
+    def end(self, fileName):
+        '''
+        queue end of output to file (closed once written)
+        '''
+        self.queue.put((fileName, None))
+
+    def check(self):
+        '''
+        raise first write error not already raised (IOError, or other exception as held), if any
+        '''
+        with self.lock:
+            if self.errors:
+                raise self.errors.pop(0)
+
+    def close(self):
+        '''
+        wait for all queued text to be written, then raise first write error (if any)
+        '''
+        if self.thread.is_alive():
+            self.queue.put((_end, None))
+            self.thread.join()
+        self.check()
+
+## define functions
+def readThrough(fileName):
+    '''
+    read file through, discarding the data (brings it into the operating system cache)
+    '''
+    with open(fileName, 'rb') as f:
+        while f.read(blockSize):
+            pass
@@ -0,0 +1,198 @@
+# crhProgress.py -- rate-limited progress & throughput reporting for long runs
+# v1.00 crh 19-oct-26 -- initial release
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# a reporter counts the files, points (way-points or file records) & bytes done, & at most once
+# every interval seconds reports them with the point & byte rates & an estimated time to completion
+# (eta, from the bytes done if the total bytes are known, otherwise from the files done)
+#
+# the hot loop only calls point() (or points(n)), which counts down to the next clock check,
+# so there is no per-point time call or message; the clock is read every checkEvery points
+# & when a file is done
+#
+# reports go to stderr (errMsg, so suppressed by quiet) and/or are appended to a progress file
+# as bsv records (progressHeader fields, header written when the file is new), eg: for a job scheduler:
+#   time|elapsed|files|totalFiles|points|bytes|totalBytes|pointsPerSec|bytesPerSec|eta|state
+# totals not known, & the eta when it cannot be estimated, are empty fields
+# the state is 'running', then 'done' for the final record written by done()
+
+import os
+from time import time, gmtime, strftime
+
+from crhDebug import *  # debug & messaging
+
+## essential variables
+interval = 10.0     # minimum seconds between reports
+checkEvery = 1000   # points counted between clock checks
+progressHeader = 'time|elapsed|files|totalFiles|points|bytes|totalBytes|pointsPerSec|bytesPerSec|eta|state'
+
+## define classes
+class reporter(object):
+    '''
+    progress reporter, call point() or points() as points are done & fileDone() as files are done,
+    then done() for the final report
+    position is an optional callable returning the bytes done in the current file (eg: its tell()),
+    only called when reporting
+    '''
+    def __init__(self, label = 'progress', totalFiles = None, totalBytes = None, interval = interval,
+            progressFile = None, quiet = False, toStderr = True, position = None):
+        self.label = label
+        self.totalFiles = totalFiles
+        self.totalBytes = totalBytes
+        self.interval = interval
+        self.progressFile = progressFile
+        self.quiet = quiet
+        self.toStderr = toStderr
+        self.position = position
+        self.files = self.pointCount = self.bytes = 0
+        self.start = self.lastReport = time()
+        self.countdown = checkEvery
+
+    def point(self):
+        '''
+        count one point done (hot loop)
+        '''
+        self.pointCount += 1
+        self.countdown -= 1
+        if not self.countdown:
+            self.check()
+
+    def points(self, count):
+        '''
+        count several points done
+        '''
+        self.pointCount += count
+        self.countdown -= count
+        if self.countdown <= 0:
+            self.check()
+
+    def fileDone(self, points = 0, bytes = 0):
+        '''
+        count a file done, with the points & bytes not already counted
+        '''
+        self.files += 1
+        self.pointCount += points
+        self.bytes += bytes
+        self.check()
+
+    def check(self):
+        '''
+        report if the interval has passed since the last report
+        '''
+        self.countdown = checkEvery
+        now = time()
+        if now - self.lastReport >= self.interval:
+            self.report(now)
+
+    def done(self):
+        '''
+        final report (always made)
+        '''
+        self.bytes = self.bytesDone()
+        self.position = None
+        self.report(time(), 'done')
+
+    def bytesDone(self):
+        '''
+        return bytes done, including the current file position if known
+        '''
+        if self.position is None:
+            return self.bytes
+        try:
+            return self.bytes + self.position()
+        except (IOError, ValueError):   # file closed or not seekable
+            return self.bytes
+
+    def eta(self, elapsed, bytesDone):
+        '''
+        return estimated seconds to completion, None if it cannot be estimated
+        '''
+        if self.totalBytes and bytesDone:
+            return max(0.0, elapsed * (self.totalBytes - bytesDone) / bytesDone)
+        if self.totalFiles and self.files:
+            return max(0.0, elapsed * (self.totalFiles - self.files) / self.files)
+        return None
+
+    def report(self, now, state = 'running'):
+        '''
+        report progress to stderr and/or progress file
+        '''
+        self.lastReport = now
+        elapsed = now - self.start
+        bytesDone = self.bytesDone()
+        pointRate = self.pointCount / elapsed if elapsed > 0 else 0.0
+        byteRate = bytesDone / elapsed if elapsed > 0 else 0.0
+        eta = None if state == 'done' else self.eta(elapsed, bytesDone)
+        if self.toStderr:
+            errMsg(self.progressText(bytesDone, pointRate, byteRate, eta, state), self.quiet)
+        if self.progressFile is not None:
+            self.writeRecord(now, elapsed, bytesDone, pointRate, byteRate, eta, state)
+
+    def progressText(self, bytesDone, pointRate, byteRate, eta, state):
+        '''
+        return progress message text
+        '''
+        text = '{}: '.format(self.label)
+        if self.totalFiles is not None:
+            text += '{}/{} files, '.format(self.files, self.totalFiles)
+        elif self.files:
+            text += '{} files, '.format(self.files)
+        text += '{:,} points ({:,.0f}/s)'.format(self.pointCount, pointRate)
+        if bytesDone:
+            text += ', {} ({}/s)'.format(sizeText(bytesDone), sizeText(byteRate))
+        if state == 'done':
+            text += ', done'
+        elif eta is not None:
+            text += ', eta {}'.format(durationText(eta))
+        return text
+
+    def writeRecord(self, now, elapsed, bytesDone, pointRate, byteRate, eta, state):
+        '''
+        append progress record to progress file, header first if the file is new
+        '''
+        fields = [strftime('%Y-%m-%dT%H:%M:%SZ', gmtime(now)), '{:.1f}'.format(elapsed), str(self.files),
+            _field(self.totalFiles), str(self.pointCount), str(bytesDone), _field(self.totalBytes),
+            '{:.1f}'.format(pointRate), '{:.1f}'.format(byteRate),
+            '' if eta is None else '{:.0f}'.format(eta), state]
+        try:
+            newFile = not os.path.exists(self.progressFile) or not os.path.getsize(self.progressFile)
+            with open(self.progressFile, 'a') as f:
+                if newFile:
+                    f.write(progressHeader + '\n')
+                f.write('|'.join(fields) + '\n')
+        except (IOError, OSError) as e:    # progress reporting never stops the run
+            statusErrMsg('warn', 'progress', 'unable to write progress file: {}'.format(e), self.quiet)
+            self.progressFile = None
+
+## define functions
+def _field(value):
+    return '' if value is None else str(value)
+
+def fileSize(fileName):
+    '''
+    return size of file in bytes, 0 if it cannot be read
+    '''
+    try:
+        return os.path.getsize(fileName)
+    except OSError:
+        return 0
+
+def sizeText(bytes):
+    '''
+    return byte count as text, eg: 12.3MB
+    '''
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if bytes < 1024.0 or unit == 'GB':
+            return '{:.1f}{}'.format(bytes, unit) if unit != 'B' else '{:.0f}B'.format(bytes)
+        bytes /= 1024.0
+
+def durationText(secs):
+    '''
+    return seconds as hh:mm:ss text
+    '''
+    secs = int(round(secs))
+    return '{:02d}:{:02d}:{:02d}'.format(secs // 3600, secs // 60 % 60, secs % 60)
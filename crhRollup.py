@@ -0,0 +1,185 @@
+# crhRollup.py -- per national grid square occupancy & dwell time rollups
+# v1.00 crh 19-oct-26 -- initial release
+# v1.01 crh 19-oct-26 -- cell keys hold the full northing extent at 1m squares (HU & HP squares)
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# a rollup bins the retained way-points of one or more tracks by national grid square
+# (digits ngr precision: 4 for 1km squares, 6 for 100m squares ...) & for each square adds up:
+#   dwell       -- time (sec) from each way-point in the square to the next way-point
+#   distance    -- distance (m) from each way-point in the square to the next way-point
+#   visits      -- times the track entered the square (a track starting in it counting as one)
+#   points      -- retained way-points in the square
+# so the time & distance of each leg goes to the square it starts in; way-points without an
+# easting & northing are skipped, those without a time add no dwell time
+#
+# add() takes the way-points of a track window by window (the last way-point carried to the next
+# window), endTrack() ends the track, so the next way-point added starts a new visit;
+# rollups of separate files or batches are combined by merge()
+# with numpy installed each window is binned by a vectorised group-by (no python level loop)
+#
+# the table output (genTable) is a sparse bsv table, only squares visited having a record:
+#   ngr|easting|northing|dwell|distance|visits|points
+# easting & northing being those of the south west corner of the square, records in ngr order;
+# loads() reads such a table back (eg: to combine the tables of separate runs)
+
+from math import hypot
+from StringIO import StringIO
+
+import crhMapFast       # fast mapping utilities
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+## essential variables
+rollupDigits = (4, 6, 8, 10)    # ngr precisions of rollup squares
+rollupHeader = 'ngr|easting|northing|dwell|distance|visits|points'
+_keyScale = 2 * 10 ** 6 # cell key: east cell * _keyScale + north cell
+                        # (over the 1300000 north cells of 1m squares)
+
+## define classes
+class rollup(object):
+    '''
+    per grid square totals, add() way-points (crhTrack.wayPoint) then genTable()
+    '''
+    def __init__(self, digits = 4):
+        if digits not in rollupDigits:
+            raise ValueError('rollup ngr precision must be one of {}: {}'.format(rollupDigits, digits))
+        self.digits = digits
+        self.size = 10 ** (5 - digits // 2)  # square size (m)
+        self.cells = dict() # cell key -> [dwell, distance, visits, points]
+        self.last = None    # (east, north, secs, key) of last way-point added, None at start of track
+
+    def add(self, points):
+        '''
+        add list of retained way-points (the next window of the track)
+        '''
+        points = [(point.east, point.north, point.secs) for point in points if point.east is not None]
+        if not points:
+            return
+        if numpy is not None:
+            self._addArray(points)
+        else:
+            self._addList(points)
+
+    def _addList(self, points):
+        size = self.size
+        last = self.last
+        for east, north, secs in points:
+            key = int(east // size) * _keyScale + int(north // size)
+            totals = self.cells.get(key)
+            if totals is None:
+                totals = self.cells[key] = [0.0, 0.0, 0, 0]
+            totals[3] += 1
+            if last is None or last[3] != key:
+                totals[2] += 1
+            if last is not None:
+                lastTotals = self.cells[last[3]]
+                lastTotals[1] += hypot(east - last[0], north - last[1])
+                if secs is not None and last[2] is not None:
+                    lastTotals[0] += secs - last[2]
+            last = (east, north, secs, key)
+        self.last = last
+
+    def _addArray(self, points):
+        '''
+        vectorised add(): the way-points of the window (after the carried last way-point)
+        are binned by unique() & summed by bincount()
+        '''
+        rows = points if self.last is None else [self.last[:3]] + points
+        data = numpy.array([(e, n, numpy.nan if s is None else s) for e, n, s in rows], dtype = float)
+        keys = (data[:, 0] // self.size).astype(numpy.int64) * _keyScale + (data[:, 1] // self.size).astype(numpy.int64)
+        distance = numpy.hypot(numpy.diff(data[:, 0]), numpy.diff(data[:, 1]))
+        dwell = numpy.nan_to_num(numpy.diff(data[:, 2]))
+        entered = numpy.ones(len(keys), dtype = bool)
+        entered[1:] = keys[1:] != keys[:-1]
+        counted = numpy.ones(len(keys), dtype = bool)
+        if self.last is not None:   # carried way-point already counted
+            entered[0] = counted[0] = False
+        cells, inverse = numpy.unique(keys, return_inverse = True)
+        sums = (numpy.bincount(inverse[:-1], dwell, len(cells)), numpy.bincount(inverse[:-1], distance, len(cells)),
+            numpy.bincount(inverse, entered, len(cells)), numpy.bincount(inverse, counted, len(cells)))
+        for index, key in enumerate(cells.tolist()):
+            totals = self.cells.get(key)
+            if totals is None:
+                totals = self.cells[key] = [0.0, 0.0, 0, 0]
+            totals[0] += sums[0][index]
+            totals[1] += sums[1][index]
+            totals[2] += int(sums[2][index])
+            totals[3] += int(sums[3][index])
+        east, north, secs = points[-1]
+        self.last = (east, north, secs, int(keys[-1]))
+
+    def endTrack(self):
+        '''
+        end the current track, the next way-point added starting a new visit
+        '''
+        self.last = None
+
+    def merge(self, other):
+        '''
+        add totals of other rollup (same precision) to this one, return self
+        '''
+        if other.digits != self.digits:
+            raise ValueError('rollups of different ngr precisions: {} & {}'.format(self.digits, other.digits))
+        for key, values in other.cells.items():
+            totals = self.cells.get(key)
+            if totals is None:
+                self.cells[key] = list(values)
+            else:
+                for index, value in enumerate(values):
+                    totals[index] += value
+        return self
+
+    def rows(self):
+        '''
+        return list of (ngr, easting, northing, dwell, distance, visits, points) tuples, in ngr order
+        '''
+        rows = list()
+        for key, (dwell, distance, visits, points) in self.cells.items():
+            east, north = (key // _keyScale) * self.size, (key % _keyScale) * self.size
+            try:
+                ngr = crhMapFast.osgb2ngr((east, north), self.digits)
+            except RuntimeError:
+                ngr = 'n/a'
+            rows.append((ngr, east, north, dwell, distance, visits, points))
+        rows.sort()
+        return rows
+
+    def genTable(self):
+        '''
+        return StringIO holding sparse bsv table of the squares visited
+        '''
+        sio = StringIO()
+        sio.write(rollupHeader + '\n')
+        for ngr, east, north, dwell, distance, visits, points in self.rows():
+            sio.write('{}|{}|{}|{:.0f}|{:.1f}|{}|{}\n'.format(ngr, east, north, dwell, distance, visits, points))
+        return sio
+
+## define functions
+def isTable(text):
+    '''
+    return True if text is a rollup table (as genTable)
+    '''
+    return text.startswith(rollupHeader)
+
+def loads(text):
+    '''
+    return rollup read from bsv table text (as genTable), raises ValueError if invalid
+    '''
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines or lines[0] != rollupHeader:
+        raise ValueError('not a rollup table')
+    ngrs = [line.split('|', 1)[0] for line in lines[1:]]
+    digits = next((len(ngr) - 2 for ngr in ngrs if ngr != 'n/a'), 4)
+    total = rollup(digits)
+    for line in lines[1:]:
+        ngr, east, north, dwell, distance, visits, points = line.split('|')
+        key = (int(east) // total.size) * _keyScale + int(north) // total.size
+        total.cells[key] = [float(dwell), float(distance), int(visits), int(points)]
+    return total
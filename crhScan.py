@@ -0,0 +1,143 @@
+# crhScan.py -- quick-look gpx file summaries without full parsing
+# v1.00 crh 19-oct-26 -- initial release
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# for cataloguing large gpx archives: each file is read as raw bytes in large blocks & only the
+# tags needed for the summary are tokenized, nothing is projected, thinned or counted statistically
+#
+# summary fields:
+#   points      -- number of way-point (trkpt, rtept & wpt) elements
+#   start/end   -- first & last <time> inside a way-point element
+#   name/desc   -- first <name> & <desc> outside way-point elements (as crhTrack)
+#   bounding box-- min & max of the way-point lat & lon attributes
+#   creator     -- creator attribute of the <gpx> element
+# compressed files (eg: route.gpx.gz) are read through crhCompress
+
+import re
+from collections import namedtuple
+
+import crhCompress      # compressed files
+
+## essential variables
+blockSize = 1048576 # bytes read from gpx file at a time
+pointTags = ('trkpt', 'rtept', 'wpt')
+summary = namedtuple('summary', 'file points startTime endTime name desc minLat minLon maxLat maxLon creator')
+scanHeader = 'file|points|startTime|endTime|name|desc|minLat|minLon|maxLat|maxLon|creator'
+
+tagRe = re.compile(r'<(/?)(trkpt|rtept|wpt|time|name|desc|gpx)\b([^>]*)>')
+latRe = re.compile(r'\blat\s*=\s*["\']([^"\']+)')
+lonRe = re.compile(r'\blon\s*=\s*["\']([^"\']+)')
+creatorRe = re.compile(r'\bcreator\s*=\s*["\']([^"\']*)')
+
+## define classes
+class scanner(object):
+    '''
+    incremental gpx summary tokenizer, feed() it blocks of raw gpx bytes then read its attributes
+    only the unscanned tail of the data fed so far is held in memory
+    '''
+    def __init__(self):
+        self.buffer = ''
+        self.points = 0
+        self.startTime = self.endTime = None
+        self.name = self.desc = None
+        self.creator = None
+        self.minLat = self.minLon = self.maxLat = self.maxLon = None
+        self.inPoint = False
+
+    def feed(self, data):
+        '''
+        add block of gpx bytes to the summary
+        '''
+        buf = self.buffer + data
+        end = 0
+        for match in tagRe.finditer(buf):
+            close, tag, attrs = match.groups()
+            if tag in pointTags:
+                if close:
+                    self.inPoint = False
+                else:
+                    self.points += 1
+                    self._bounds(attrs)
+                    self.inPoint = not attrs.endswith('/')
+            elif tag == 'gpx':
+                if not close and self.creator is None:
+                    creator = creatorRe.search(attrs)
+                    if creator:
+                        self.creator = creator.group(1)
+            elif not close and not attrs.endswith('/'):
+                textEnd = buf.find('<', match.end())
+                if textEnd < 0:     # element text continues in the next block
+                    self.buffer = buf[match.start():]
+                    return
+                self._text(tag, buf[match.end():textEnd].strip())
+            end = match.end()
+        tail = buf[end:]
+        start = tail.rfind('<')
+        self.buffer = tail[start:] if start >= 0 else ''
+
+    def _bounds(self, attrs):
+        lat = latRe.search(attrs)
+        lon = lonRe.search(attrs)
+        try:
+            lat, lon = float(lat.group(1)), float(lon.group(1))
+        except (AttributeError, ValueError):
+            return
+        if self.minLat is None:
+            self.minLat = self.maxLat = lat
+            self.minLon = self.maxLon = lon
+        else:
+            self.minLat, self.maxLat = min(self.minLat, lat), max(self.maxLat, lat)
+            self.minLon, self.maxLon = min(self.minLon, lon), max(self.maxLon, lon)
+
+    def _text(self, tag, text):
+        if tag == 'time':
+            if self.inPoint:
+                if self.startTime is None:
+                    self.startTime = text
+                self.endTime = text
+        elif self.inPoint:  # way-point name or desc
+            return
+        elif tag == 'name':
+            if self.name is None: self.name = text
+        elif self.desc is None:
+            self.desc = text
+
+    def result(self, fileName):
+        '''
+        return summary of the data fed so far, for file fileName
+        '''
+        return summary(fileName, self.points, self.startTime, self.endTime, self.name, self.desc,
+            self.minLat, self.minLon, self.maxLat, self.maxLon, self.creator)
+
+## define functions
+def scanFile(fileName):
+    '''
+    return summary of (possibly compressed) gpx file
+    raises IOError if the file cannot be read
+    '''
+    scan = scanner()
+    with crhCompress.openInput(fileName) as f:
+        while True:
+            data = f.read(blockSize)
+            if not data:
+                break
+            scan.feed(data)
+    return scan.result(fileName)
+
+def scanRow(fileSummary):
+    '''
+    return bsv record for file summary, missing values empty
+    '''
+    fields = list()
+    for field, value in zip(summary._fields, fileSummary):
+        if value is None:
+            fields.append('')
+        elif field in ('minLat', 'minLon', 'maxLat', 'maxLon'):
+            fields.append('{:+010.5f}'.format(value))
+        else:
+            fields.append(str(value).replace('|', '/'))
+    return '|'.join(fields)
@@ -0,0 +1,201 @@
+# crhSegment.py -- independent tracks, segments & routes of a gpx file, processed in parallel
+# v1.00 crh 19-oct-26 -- initial release
+# v1.01 crh 19-oct-26 -- splitter only searches newly fed text for the end of the unfinished block
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# a gpx file may hold many <trk> blocks, each of one or more <trkseg> segments, & <rte> blocks;
+# crhTrack treats their way-points as one sequence, here each segment is processed separately:
+#   splitter -- incremental splitter, feed() it blocks of gpx text & get back the segments completed,
+#               each <trkseg> (named by its <trk>) or <rte> a segment (a <trk> without <trkseg> one
+#               segment), only the unfinished <trk> or <rte> block being held in memory, & only the
+#               text fed since the last search being searched for its closing tag (linear in file size)
+#   resultGen -- processes segments with crhTrack (one track object each), in worker processes when
+#               workers > 1, & yields their results in document order
+# the segments are independent (no deltas between them), so their statistics combine with
+# crhTrack.stats.merge into a document summary, whatever worker processed them;
+# way-points outside tracks & routes (<wpt>) are not part of any segment, they are only counted
+#
+# workers are processes (multiprocessing), so they use separate cores; each job is the segment
+# text & the track configuration, which must pickle (crhGrid grids & crhClip areas do)
+
+import re
+import multiprocessing
+from collections import namedtuple
+
+import crhTrack         # streaming gpx processing
+import crhRollup        # ngr square rollups
+
+## essential variables
+blockSize = crhTrack.blockSize  # bytes read from gpx file at a time
+segmentKinds = ('trk', 'rte')
+
+segment = namedtuple('segment', 'index kind trackNo segNo name desc text')
+result = namedtuple('result', 'segment stats bsv squares')
+
+openRe = re.compile(r'<(trk|rte)[\s>]')
+closeRes = dict((kind, re.compile(r'</{}\s*>'.format(kind))) for kind in segmentKinds)
+segRe = re.compile(r'<trkseg(?:\s[^>]*)?(?:/>|>(.*?)</trkseg\s*>)', re.S)
+wptRe = re.compile(r'<wpt\b')
+nameRe = re.compile(r'<(name|desc)>(.*?)</\1\s*>', re.S)
+pointRe = re.compile(r'<(?:trkseg|trkpt|rtept)\b')
+
+## define classes
+class splitter(object):
+    '''
+    incremental gpx segment splitter
+    '''
+    def __init__(self):
+        self.buffer = ''    # unfinished block (from its open tag) or unprocessed text outside blocks
+        self.kind = None    # kind of unfinished block, None if outside blocks
+        self.scanned = 0    # length of buffer searched for the block's closing tag
+        self.name = None    # first <name> & <desc> outside tracks & routes (document metadata)
+        self.desc = None
+        self.tracks = self.routes = self.segments = 0
+        self.waypoints = 0  # <wpt> way-points outside tracks & routes
+
+    def feed(self, data):
+        '''
+        add block of gpx text, return list of segments completed by it
+        '''
+        segments = list()
+        buf = self.buffer + data
+        pos = 0     # start of unfinished block, or of text outside blocks
+        while True:
+            if self.kind is None:
+                match = openRe.search(buf, pos)
+                if not match:
+                    cut = self._cut(buf, pos)
+                    self._between(buf[pos:cut])
+                    pos = cut
+                    break
+                self._between(buf[pos:match.start()])
+                pos = match.start()
+                self.kind = match.group(1)
+                self.scanned = pos
+            # resume from the last tag start searched, which may be the start of a closing tag fed in part
+            start = max(buf.rfind('<', pos + 1, self.scanned), pos + 1)
+            close = closeRes[self.kind].search(buf, start)
+            if not close:
+                self.scanned = len(buf)
+                break
+            body = buf[buf.index('>', pos) + 1:close.start()]
+            segments.extend(self._split(self.kind, body))
+            pos = close.end()
+            self.kind = None
+        self.buffer = buf[pos:]
+        self.scanned -= pos
+        return segments
+
+    def _cut(self, buf, pos):
+        '''
+        return end of text outside blocks that can be processed now: before the last tag start (which
+        may be an open tag fed in part) or an unfinished <name> or <desc>
+        '''
+        cut = max(buf.rfind('<', pos), pos)
+        for tag in ('name', 'desc'):
+            start = buf.rfind('<{}>'.format(tag), pos, cut)
+            if start >= 0 and buf.find('</' + tag, start, cut) < 0:
+                cut = min(cut, start)
+        return cut
+
+    def _between(self, text):
+        '''
+        note document name & desc, & count way-points, in text outside tracks & routes
+        '''
+        self.waypoints += len(wptRe.findall(text))
+        for match in nameRe.finditer(text):
+            if match.group(1) == 'name':
+                if self.name is None: self.name = match.group(2).strip()
+            elif self.desc is None:
+                self.desc = match.group(2).strip()
+
+    def _split(self, kind, body):
+        '''
+        return list of segments in body text of <trk> or <rte> block
+        '''
+        point = pointRe.search(body)
+        name = desc = None
+        for match in nameRe.finditer(body[:point.start()] if point else body):
+            if match.group(1) == 'name':
+                if name is None: name = match.group(2).strip()
+            elif desc is None:
+                desc = match.group(2).strip()
+        if kind == 'rte':
+            self.routes += 1
+            texts = [body]
+            number = self.routes
+        else:
+            self.tracks += 1
+            texts = [match.group(1) or '' for match in segRe.finditer(body)] or [body]
+            number = self.tracks
+        segments = list()
+        for segNo, text in enumerate(texts, 1):
+            self.segments += 1
+            segments.append(segment(self.segments, kind, number, segNo, name, desc, text))
+        return segments
+
+    def segmentGen(self, fileH, size = None):
+        '''
+        yield segments read from open gpx file in blocks
+        '''
+        size = size or blockSize
+        while True:
+            data = fileH.read(size)
+            if not data:
+                break
+            for seg in self.feed(data):
+                yield seg
+
+## define functions
+def label(seg):
+    '''
+    return segment label text, eg: trk 2 segment 1 (routes have one segment)
+    '''
+    if seg.kind == 'rte':
+        return 'rte {}'.format(seg.trackNo)
+    return 'trk {} segment {}'.format(seg.trackNo, seg.segNo)
+
+def processSegment(job):
+    '''
+    process one segment, job is (segment, track keyword arguments, bsv, rollup digits)
+    returns result: (segment without its text, stats, bsv text or None, crhRollup.rollup or None)
+    '''
+    seg, trackArgs, bsv, rollupDigits = job
+    trk = crhTrack.track(**trackArgs)
+    points = trk.feed(seg.text)
+    trk.stats.name, trk.stats.desc = seg.name, seg.desc
+    text = None
+    if bsv:
+        text = trk.bsvHead() + trk.bsvRows(trk.bsvFilter(points))
+    squares = None
+    if rollupDigits:
+        squares = crhRollup.rollup(rollupDigits)
+        squares.add(points)
+    return result(seg._replace(text = None), trk.stats, text, squares)
+
+def resultGen(segments, trackArgs, bsv = False, rollupDigits = 0, workers = 1):
+    '''
+    yield results (see processSegment) of processing segments, in order
+    using a pool of workers processes if workers > 1 (0: one per cpu core)
+    '''
+    jobs = ((seg, trackArgs, bsv, rollupDigits) for seg in segments)
+    if workers == 0:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1:
+        for job in jobs:
+            yield processSegment(job)
+        return
+    pool = multiprocessing.Pool(workers)
+    try:
+        for res in pool.imap(processSegment, jobs):
+            yield res
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
@@ -0,0 +1,354 @@
+# crhSimilar.py -- track fingerprints & similarity search over gpx archives
+# v1.00 crh 19-oct-26 -- initial release
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# each track is summarised by a fingerprint:
+#   cells       -- the set of national grid squares (cellSize m, default 1km as a 4 digit ngr) it passes through
+#   start/end   -- the easting & northing of its first & last way-points
+#   path        -- the track downsampled to way-points at least pathStep m apart (at most pathPoints of them)
+# an index holds the fingerprints of an archive of tracks, with an inverted index from each cell
+# to the tracks passing through it, so a search only looks at tracks sharing cells with the query:
+#   candidates  -- tracks sharing at least minShare of their cells (jaccard) with the query track
+#                  & whose start & end points are within maxEnd m of the query's (either direction)
+#   exact       -- candidate paths are compared with the query path by hausdorff or discrete frechet
+#                  distance (m), tracks within maxDist m being returned, closest first
+# walks of the same route in the opposite direction match unless reverse is False
+#
+# index files hold a header record then a bsv record for each track (see indexHeader),
+# the cells & path being space separated ints (the path as its first easting & northing followed by
+# the differences from each way-point to the next); the paths are only decoded when needed,
+# so loading & searching an index of tens of thousands of tracks is quick
+# index files may be compressed (eg: archive.idx.gz, see crhCompress)
+# with numpy installed the hausdorff distance is computed without a python level loop
+
+import os
+from math import hypot
+from collections import defaultdict
+
+import crhTrack         # streaming gpx processing
+import crhCompress      # compressed files
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+## essential variables
+cellSize = 1000     # fingerprint cell size (m), 1000: 4 digit ngr squares
+pathStep = 50       # minimum distance (m) between downsampled path way-points
+pathPoints = 256    # maximum downsampled path way-points
+minShare = 0.5      # minimum proportion (jaccard) of cells shared by candidate tracks
+maxEnd = 500        # maximum distance (m) between candidate start & end points (None: not checked)
+maxDist = 100       # maximum exact distance (m) of similar tracks
+measures = ('hausdorff', 'frechet')
+indexVersion = 1
+indexHeader = 'file|mtime|points|startE|startN|endE|endN|cells|path'
+
+## define classes
+class fingerprint(object):
+    '''
+    track fingerprint, create with fromPoints() or fingerprintFile() (or read from an index)
+    path is decoded from pathText on first use
+    '''
+    __slots__ = ('file', 'mtime', 'points', 'start', 'end', 'cells', '_path', 'pathText')
+
+    def __init__(self, file, mtime, points, start, end, cells, path = None, pathText = None):
+        self.file = file
+        self.mtime = mtime
+        self.points = points
+        self.start = start
+        self.end = end
+        self.cells = cells  # frozenset of cell ids
+        self._path = path
+        self.pathText = pathText
+
+    @property
+    def path(self):
+        if self._path is None:
+            path = list()
+            east = north = 0
+            values = self.pathText.split() if self.pathText else []
+            for deltaE, deltaN in zip(values[0::2], values[1::2]):
+                east += int(deltaE)
+                north += int(deltaN)
+                path.append((east, north))
+            self._path = path
+        return self._path
+
+    def record(self):
+        '''
+        return index bsv record
+        '''
+        pathText = self.pathText
+        if self._path is not None:
+            deltas = list()
+            east = north = 0
+            for pathE, pathN in self._path:
+                deltas.append('{} {}'.format(pathE - east, pathN - north))
+                east, north = pathE, pathN
+            pathText = ' '.join(deltas)
+        return '|'.join([self.file.replace('|', '/'), str(self.mtime), str(self.points),
+            _coord(self.start, 0), _coord(self.start, 1), _coord(self.end, 0), _coord(self.end, 1),
+            ' '.join([str(cell) for cell in sorted(self.cells)]), pathText])
+
+    @classmethod
+    def fromRecord(cls, record):
+        '''
+        return fingerprint read from index bsv record, raises ValueError if invalid
+        '''
+        fields = record.rstrip('\r\n').split('|')
+        if len(fields) != 9:
+            raise ValueError('invalid index record: {}'.format(record[:60]))
+        start = (int(fields[3]), int(fields[4])) if fields[3] else None
+        end = (int(fields[5]), int(fields[6])) if fields[5] else None
+        cells = frozenset(map(int, fields[7].split()))
+        return cls(fields[0], int(fields[1]), int(fields[2]), start, end, cells, pathText = fields[8])
+
+class index(object):
+    '''
+    fingerprint index: add() fingerprints (or load() an index file), then search() it
+    '''
+    def __init__(self, cellSize = cellSize):
+        self.cellSize = cellSize
+        self.prints = list()
+        self.byFile = dict()    # file -> position in prints
+        self.cellIndex = defaultdict(list)  # cell -> positions in prints
+
+    def __len__(self):
+        return len(self.prints) - self.prints.count(None)
+
+    def add(self, fp):
+        '''
+        add fingerprint, replacing any held for the same file
+        '''
+        if fp.file in self.byFile:
+            self.remove(fp.file)
+        position = len(self.prints)
+        self.prints.append(fp)
+        self.byFile[fp.file] = position
+        for cell in fp.cells:
+            self.cellIndex[cell].append(position)
+
+    def remove(self, fileName):
+        '''
+        remove fingerprint held for file (if any)
+        '''
+        position = self.byFile.pop(fileName, None)
+        if position is None:
+            return
+        for cell in self.prints[position].cells:
+            self.cellIndex[cell].remove(position)
+        self.prints[position] = None
+
+    def get(self, fileName):
+        '''
+        return fingerprint held for file, None if none
+        '''
+        position = self.byFile.get(fileName)
+        return None if position is None else self.prints[position]
+
+    def current(self, fileName):
+        '''
+        return True if the fingerprint held for file is up to date (file unchanged since)
+        '''
+        fp = self.get(fileName)
+        try:
+            return fp is not None and fp.mtime == int(os.path.getmtime(fileName))
+        except OSError:
+            return False
+
+    def save(self, fileName):
+        '''
+        write index file, raises IOError if it cannot be written
+        '''
+        outputH = crhCompress.openOutput(fileName, 'w')
+        if outputH is None:
+            raise IOError('error opening index file {}'.format(fileName))
+        try:
+            outputH.write('crhSimilar|{}|{}\n'.format(indexVersion, self.cellSize))
+            outputH.write(indexHeader + '\n')
+            for fp in self.prints:
+                if fp is not None:
+                    outputH.write(fp.record() + '\n')
+        finally:
+            outputH.close()
+
+    @classmethod
+    def load(cls, fileName):
+        '''
+        return index read from index file
+        raises IOError if it cannot be read, RuntimeError if it is not an index file
+        '''
+        lines = iter(crhCompress.lineGen(fileName))
+        header = next(lines, '').rstrip('\r\n').split('|')
+        if len(header) != 3 or header[0] != 'crhSimilar' or header[1] != str(indexVersion):
+            raise RuntimeError('not a version {} track index file: {}'.format(indexVersion, fileName))
+        idx = cls(int(header[2]))
+        for line in lines:
+            if not line.strip() or line.startswith('file|'):
+                continue
+            try:
+                idx.add(fingerprint.fromRecord(line))
+            except ValueError as e:
+                raise RuntimeError(str(e))
+        return idx
+
+    def candidates(self, fp, minShare = minShare, maxEnd = maxEnd, reverse = True):
+        '''
+        return list of (share, fingerprint) of tracks sharing cells with fingerprint fp (see notes)
+        '''
+        shared = defaultdict(int)
+        for cell in fp.cells:
+            for position in self.cellIndex.get(cell, ()):
+                shared[position] += 1
+        found = list()
+        for position, count in shared.items():
+            other = self.prints[position]
+            if other.file == fp.file:
+                continue
+            share = float(count) / (len(fp.cells) + len(other.cells) - count)
+            if share < minShare:
+                continue
+            if maxEnd is not None and not endsMatch(fp, other, maxEnd, reverse):
+                continue
+            found.append((share, other))
+        return found
+
+    def search(self, fp, measure = 'hausdorff', maxDist = maxDist, minShare = minShare, maxEnd = maxEnd,
+            reverse = True):
+        '''
+        return list of (distance, share, fingerprint) of tracks within maxDist m of fingerprint fp,
+        closest first, candidates compared by measure ('hausdorff' or 'frechet')
+        '''
+        compare = hausdorff if measure == 'hausdorff' else discreteFrechet
+        found = list()
+        for share, other in self.candidates(fp, minShare, maxEnd, reverse):
+            path = other.path
+            if reverse and measure != 'hausdorff' and opposite(fp, other):
+                path = path[::-1]
+            dist = compare(fp.path, path, maxDist)
+            if dist <= maxDist:
+                found.append((dist, share, other))
+        found.sort(key = lambda item: (item[0], item[2].file))
+        return found
+
+## define functions
+def _coord(point, axis):
+    return '' if point is None else str(point[axis])
+
+def cellId(east, north, size = cellSize):
+    '''
+    return int id of the size m grid cell holding (east, north)
+    '''
+    return int(east // size) * 100000 + int(north // size)
+
+def fromPoints(eastNorths, file = '', mtime = 0, size = cellSize):
+    '''
+    return fingerprint of track given as iterable of (easting, northing), None if it has no way-points
+    '''
+    cells = set()
+    path = list()
+    last = None
+    points = 0
+    for east, north in eastNorths:
+        points += 1
+        east, north = int(round(east)), int(round(north))
+        cells.add(cellId(east, north, size))
+        if last is None or hypot(east - last[0], north - last[1]) >= pathStep:
+            path.append((east, north))
+            last = (east, north)
+    if not points:
+        return None
+    end = (east, north)
+    if path[-1] != end:
+        path.append(end)
+    if len(path) > pathPoints:  # keep every step'th way-point, & the end
+        step = (len(path) + pathPoints - 2) // (pathPoints - 1)
+        path = path[:-1:step] + [end]
+    return fingerprint(file, mtime, points, path[0], end, frozenset(cells), path)
+
+def fingerprintFile(fileName, size = cellSize):
+    '''
+    return fingerprint of (possibly compressed) gpx file, None if it has no projected way-points
+    raises IOError if the file cannot be read
+    '''
+    trk = crhTrack.track(time = False, tolerT = 0, quiet = True)
+    with crhCompress.openInput(fileName) as f:
+        eastNorths = [(point.east, point.north) for point in trk.pointGen(f) if point.east is not None]
+    return fromPoints(eastNorths, fileName, int(os.path.getmtime(fileName)), size)
+
+def endsMatch(a, b, maxEnd = maxEnd, reverse = True):
+    '''
+    return True if fingerprints a & b start & end within maxEnd m of each other (or the reverse)
+    '''
+    if a.start is None or b.start is None:
+        return False
+    if _near(a.start, b.start, maxEnd) and _near(a.end, b.end, maxEnd):
+        return True
+    return reverse and _near(a.start, b.end, maxEnd) and _near(a.end, b.start, maxEnd)
+
+def opposite(a, b):
+    '''
+    return True if fingerprint b runs in the opposite direction to a (judged by start & end points)
+    '''
+    if a.start is None or b.start is None:
+        return False
+    return hypot(a.start[0] - b.end[0], a.start[1] - b.end[1]) + hypot(a.end[0] - b.start[0], a.end[1] - b.start[1]) \
+        < hypot(a.start[0] - b.start[0], a.start[1] - b.start[1]) + hypot(a.end[0] - b.end[0], a.end[1] - b.end[1])
+
+def _near(p, q, limit):
+    return hypot(p[0] - q[0], p[1] - q[1]) <= limit
+
+def hausdorff(a, b, limit = None):
+    '''
+    return hausdorff distance (m) between paths a & b (lists of (easting, northing))
+    limit is not used (as discreteFrechet)
+    '''
+    if not a or not b:
+        return float('inf')
+    if numpy is not None:
+        pa = numpy.asarray(a, dtype = float)
+        pb = numpy.asarray(b, dtype = float)
+        dists = numpy.hypot(pa[:, 0, None] - pb[None, :, 0], pa[:, 1, None] - pb[None, :, 1])
+        return float(max(dists.min(axis = 1).max(), dists.min(axis = 0).max()))
+    return max(_directed(a, b), _directed(b, a))
+
+def _directed(a, b):
+    worst = 0.0
+    for ea, na in a:
+        best = min([(ea - eb) ** 2 + (na - nb) ** 2 for eb, nb in b])
+        if best > worst:
+            worst = best
+    return worst ** 0.5
+
+def discreteFrechet(a, b, limit = None):
+    '''
+    return discrete frechet distance (m) between paths a & b (lists of (easting, northing))
+    once every coupling exceeds limit (if given) the search stops, returning inf
+    (squared distances are compared, the square root only taken of the result)
+    '''
+    if not a or not b:
+        return float('inf')
+    limit2 = None if limit is None else limit * limit
+    prev = None
+    for i, (ea, na) in enumerate(a):
+        row = list()
+        last = None
+        for j, (eb, nb) in enumerate(b):
+            d = (ea - eb) * (ea - eb) + (na - nb) * (na - nb)
+            if prev is None:
+                best = d if last is None else max(last, d)
+            elif last is None:
+                best = max(prev[0], d)
+            else:
+                best = max(min(prev[j], prev[j - 1], last), d)
+            row.append(best)
+            last = best
+        if limit2 is not None and min(row) > limit2:
+            return float('inf')
+        prev = row
+    return prev[-1] ** 0.5
@@ -0,0 +1,701 @@
+# crhTrack.py -- streaming gpx way-point processing in bounded memory
+# v1.00 crh 19-oct-26 -- initial release (windowed processing)
+# v1.10 crh 19-oct-26 -- incremental feed() for growing (followed) gpx files
+# v1.20 crh 19-oct-26 -- mergeable & serialisable statistics
+# v1.30 crh 19-oct-26 -- per-instance configuration (thread-safe), module values are defaults only
+# v1.40 crh 19-oct-26 -- multi-precision ngr values (a bsv column for each precision)
+# v1.50 crh 19-oct-26 -- elevations replaced (or checked) from an elevation grid (dem)
+# v1.60 crh 19-oct-26 -- clip to ngr square or lat/lon box
+# v1.61 crh 19-oct-26 -- height increments as crhGPX: strictly over tolerance, level way-points not ignored
+# v1.62 crh 19-oct-26 -- way-points with name or desc elements split across blocks no longer lost
+# v1.63 crh 19-oct-26 -- loads() gives byte strings, as read from gpx (non-ascii names & descs)
+# v1.64 crh 19-oct-26 -- way-points outside the national grid kept as n/a, without easting & northing
+# v1.65 crh 19-oct-26 -- statistics of differing configuration (tolerances, precision, maxDelta) not merged
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# streaming counterpart of crhGPX: the gpx file is read in blocks & way-points are
+# processed as they arrive, so memory use is set by the window size, not the file length
+#
+# reader    -- incremental tokenizer, feed() it blocks of gpx text & get back way-points
+# stats     -- running route statistics (carried across window boundaries), merge() combines
+#              the statistics of independent files or segments, dumps()/loads() serialise them
+# track     -- applies the time (t) tolerance, projects to OSGB, updates the statistics &
+#              yields the retained way-points in windows of a fixed size, or returns those
+#              completed by each block of text fed to it (growing files)
+#
+# output layout (bsv records, gpx xml markup & statistics text) follows crhGPX, so
+# processing a file window by window gives output identical to processing it whole
+#
+# all configuration (tolerances, precision, max delta warning values, quiet & verbose)
+# is held by each track & stats object, the module values below only providing defaults,
+# so differently configured tracks can be processed side by side in separate threads
+#
+# precision is either a single ngr precision (eg: 8) or a sequence of them (eg: (6, 8, 10)),
+# when a wayPoint's ngr is a tuple of ngr strings, formatted from the one projected easting/northing,
+# output as consecutive bsv fields (ngr6|ngr8|ngr10 in the header record)
+#
+# a track given a crhGrid elevation grid (dem) samples it at the eastings & northings of each batch
+# of retained way-points at once, before they are counted: the gpx elevations are replaced by the
+# sampled values (rounded to 0.1m, as output) or, in check mode, kept & compared with them,
+# way-points outside the grid keeping their gpx elevations in either case
+#
+# a track given a crhClip clip area only retains the way-points inside it, those outside are counted
+# as clipped: the lat/lon pre-test comes before the t tolerance & projection, the exact ngr square
+# test before the ngr is formatted, so the statistics & output describe the clipped section only
+
+import re
+import json
+import math
+import calendar
+from collections import namedtuple
+from StringIO import StringIO
+from math import hypot
+
+from crhDebug import *  # debug & messaging
+import crhMapFast       # fast mapping utilities
+
+## essential variables
+blockSize = 65536   # bytes read from gpx file at a time
+# exceeding the following values generates warning messages (verbose mode only)
+# default values, see track & stats classes
+maxDeltaL = 400.0
+maxDeltaV = 30.0
+maxDeltaS = 250.0
+
+statsFields = ('tolerT', 'tolerL', 'tolerV', 'precision', 'name', 'desc', 'parts',
+    'processed', 'discardedT', 'retained', 'bsvRetained', 'bsvDiscarded',
+    'distance', 'maxL', 'maxV', 'maxS', 'ignoredV', 'adjGain', 'adjLoss', 'repGain', 'repLoss',
+    'startEle', 'endEle', 'highEle', 'lowEle', 'startEN', 'endEN',
+    'startTime', 'endTime', 'startSecs', 'endSecs', 'refEle', 'maxDeltaL', 'maxDeltaV', 'maxDeltaS',
+    'demSampled', 'demMissing', 'demCompared', 'demSumDiff', 'demSumAbsDiff', 'demMaxDiff', 'clipped')
+configFields = ('tolerT', 'tolerL', 'tolerV', 'precision', 'maxDeltaL', 'maxDeltaV', 'maxDeltaS')
+
+wayPoint = namedtuple('wayPoint', 'lat lon ele time secs east north ngr')
+bsvHeader = 'latitude|longitude|elevation|timestamp|easting|northing|ngr'
+
+tokenRe = re.compile(r'<(trkpt|rtept|wpt)\b([^>]*?)(?:/>|>(.*?)</\1\s*>)'
+    r'|<(name|desc)>(.*?)</\4\s*>', re.S)
+openRe = re.compile(r'<(?:trkpt|rtept|wpt|name|desc)\b')
+pointRe = re.compile(r'<(?:trkpt|rtept|wpt)\b')
+latRe = re.compile(r'\blat\s*=\s*["\']([^"\']+)')
+lonRe = re.compile(r'\blon\s*=\s*["\']([^"\']+)')
+eleRe = re.compile(r'<ele>\s*([^<\s]+)\s*</ele>')
+timeRe = re.compile(r'<time>\s*([^<\s]+)\s*</time>')
+
+## define functions
+def isoSecs(timestamp):
+    '''
+    return seconds since epoch for gpx timestamp (eg: 2015-08-07T11:19:56Z), None if invalid
+    '''
+    try:
+        return calendar.timegm((int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+            int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19]), 0, 0, 0))
+    except (ValueError, IndexError):
+        return None
+
+def hms(secs):
+    '''
+    return H:M:S string for number of seconds
+    '''
+    secs = int(secs)
+    return '{}:{:02d}:{:02d}'.format(secs // 3600, secs % 3600 // 60, secs % 60)
+
+def fmtLat(value):
+    '''
+    return lat/lon value formatted as used in bsv & xml output
+    '''
+    return '{:+010.5f}'.format(value)
+
+def fmtEle(value):
+    '''
+    return elevation formatted as used in bsv & xml output, empty string if missing
+    '''
+    if value is None:
+        return ''
+    return '{:+07.1f}'.format(value)
+
+def multiPrecision(precision):
+    '''
+    return True if precision is a sequence of ngr precisions rather than a single one
+    '''
+    return not isinstance(precision, (int, long))
+
+def precisionText(precision):
+    '''
+    return ngr precision (or comma separated precisions) as text
+    '''
+    if multiPrecision(precision):
+        return ','.join([str(value) for value in precision])
+    return str(precision)
+
+def ngrText(ngr):
+    '''
+    return wayPoint ngr value as bsv field(s)
+    '''
+    return ngr if isinstance(ngr, basestring) else '|'.join(ngr)
+
+def bsvHeaderText(precision):
+    '''
+    return bsv header record fields for ngr precision (or sequence of precisions)
+    '''
+    if multiPrecision(precision):
+        return bsvHeader[:-len('ngr')] + '|'.join(['ngr{}'.format(value) for value in precision])
+    return bsvHeader
+
+def _first(a, b):
+    '''
+    return a unless it is None, then b
+    '''
+    return b if a is None else a
+
+def _pick(func, a, b):
+    '''
+    return func(a, b) ignoring None values
+    '''
+    if a is None: return b
+    if b is None: return a
+    return func(a, b)
+
+def _native(value):
+    '''
+    return json value with unicode strings encoded as utf-8 (byte strings, as read from gpx) & lists as tuples
+    '''
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    if isinstance(value, list):
+        return tuple([_native(item) for item in value])
+    return value
+
+def mergeStats(statsIter):
+    '''
+    return stats object combining the stats objects from statsIter (in order), None if empty
+    '''
+    total = None
+    for part in statsIter:
+        total = part if total is None else total.merge(part)
+    return total
+
+def windowGen(iterable, size):
+    '''
+    yield successive lists of at most size items from iterable
+    '''
+    window = list()
+    for item in iterable:
+        window.append(item)
+        if len(window) >= size:
+            yield window
+            window = list()
+    if window:
+        yield window
+
+class reader(object):
+    '''
+    incremental gpx way-point tokenizer
+    only the unparsed tail of the text fed so far is held in memory
+    '''
+    def __init__(self):
+        self.buffer = ''
+        self.name = None    # first <name> & <desc> outside way-points
+        self.desc = None
+        self.complete = False   # closing </gpx> tag seen
+
+    def feed(self, data):
+        '''
+        add block of gpx text, return list of (lat, lon, ele, time) tuples completed by it
+        '''
+        points = list()
+        buf = self.buffer + data
+        end = 0
+        for match in tokenRe.finditer(buf):
+            if match.group(1) is None:  # name or desc element
+                if pointRe.search(buf, end, match.start()):  # inside way-point not yet complete, wait for it
+                    break
+                end = match.end()
+                if match.group(4) == 'name':
+                    if self.name is None: self.name = match.group(5).strip()
+                elif self.desc is None:
+                    self.desc = match.group(5).strip()
+                continue
+            end = match.end()
+            points.append(self._parse(match.group(2), match.group(3) or ''))
+        tail = buf[end:]
+        if '</gpx' in tail:
+            self.complete = True
+        unfinished = openRe.search(tail)
+        if unfinished:
+            self.buffer = tail[unfinished.start():]
+        else:
+            self.buffer = tail[max(tail.rfind('<'), 0):]
+        return points
+
+    def _parse(self, attrs, body):
+        '''
+        return (lat, lon, ele, time) tuple from way-point attributes & body text
+        '''
+        lat = latRe.search(attrs)
+        lon = lonRe.search(attrs)
+        ele = eleRe.search(body)
+        timestamp = timeRe.search(body)
+        try:
+            ele = float(ele.group(1)) if ele else None
+        except ValueError:
+            ele = None
+        return (float(lat.group(1)) if lat else None, float(lon.group(1)) if lon else None,
+            ele, timestamp.group(1) if timestamp else None)
+
+    def pointGen(self, fileH, size = None):
+        '''
+        yield (lat, lon, ele, time) tuples read from open gpx file in blocks
+        '''
+        size = size or blockSize
+        while True:
+            data = fileH.read(size)
+            if not data:
+                break
+            for point in self.feed(data):
+                yield point
+
+class stats(object):
+    '''
+    running route statistics, updated one retained way-point at a time
+    statistics of consecutive, independent parts (files or segments) combine with merge()
+    '''
+    def __init__(self, tolerT = 12, tolerL = 5, tolerV = 10, precision = 8,
+            maxDeltaL = None, maxDeltaV = None, maxDeltaS = None):
+        self.tolerT = tolerT
+        self.tolerL = tolerL
+        self.tolerV = tolerV
+        self.precision = precision
+        self.maxDeltaL = _first(maxDeltaL, globals()['maxDeltaL'])  # module defaults if not given
+        self.maxDeltaV = _first(maxDeltaV, globals()['maxDeltaV'])
+        self.maxDeltaS = _first(maxDeltaS, globals()['maxDeltaS'])
+        self.name = self.desc = None
+        self.parts = 1  # number of files/segments combined
+        self.processed = self.discardedT = self.retained = 0
+        self.bsvRetained = self.bsvDiscarded = None   # set once bsv records generated
+        self.distance = self.maxL = self.maxV = self.maxS = 0.0
+        self.ignoredV = 0
+        self.adjGain = self.adjLoss = self.repGain = self.repLoss = 0.0
+        self.startEle = self.endEle = self.highEle = self.lowEle = None
+        self.startEN = self.endEN = None
+        self.startTime = self.endTime = None
+        self.startSecs = self.endSecs = None
+        self.refEle = None  # elevation at last counted cumulative height increment
+        self.demSampled = self.demMissing = self.demCompared = None   # set once an elevation grid sampled
+        self.demSumDiff = self.demSumAbsDiff = self.demMaxDiff = None   # gpx less grid elevations (m)
+        self.clipped = None     # way-points outside clip area, set once clipped
+
+    def add(self, point):
+        '''
+        update statistics with the next retained way-point, return (deltaL, deltaV)
+        '''
+        deltaL = deltaV = None
+        if self.endEN is not None and point.east is not None:
+            deltaL = hypot(point.east - self.endEN[0], point.north - self.endEN[1])
+            self.distance += deltaL
+            self.maxL = max(self.maxL, deltaL)
+        if point.ele is not None:
+            if self.endEle is not None:
+                deltaV = point.ele - self.endEle
+                if abs(deltaV) > abs(self.maxV):
+                    self.maxV = deltaV
+                if deltaV > 0:
+                    self.repGain += deltaV
+                else:
+                    self.repLoss -= deltaV
+            if self.refEle is None:
+                self.refEle = self.startEle = self.highEle = self.lowEle = point.ele
+            else:
+                increment = point.ele - self.refEle
+                if abs(increment) > self.tolerV:    # as crhGPX: strictly over the tolerance
+                    if increment > 0:
+                        self.adjGain += increment
+                    else:
+                        self.adjLoss -= increment
+                    self.refEle = point.ele
+                elif increment:     # level way-points are not counted as ignored
+                    self.ignoredV += 1
+                self.highEle = max(self.highEle, point.ele)
+                self.lowEle = min(self.lowEle, point.ele)
+            self.endEle = point.ele
+        if point.secs is not None:
+            if self.endSecs is not None:
+                self.maxS = max(self.maxS, float(point.secs - self.endSecs))
+            else:
+                self.startTime, self.startSecs = point.time, point.secs
+            self.endTime, self.endSecs = point.time, point.secs
+        if point.east is not None:
+            if self.startEN is None:
+                self.startEN = (point.east, point.north)
+            self.endEN = (point.east, point.north)
+        self.retained += 1
+        return deltaL, deltaV
+
+    def addDem(self, ele, demEle):
+        '''
+        update elevation grid statistics with a way-point's gpx & sampled grid elevations (None if missing)
+        '''
+        if self.demSampled is None:
+            self.demSampled = self.demMissing = self.demCompared = 0
+            self.demSumDiff = self.demSumAbsDiff = self.demMaxDiff = 0.0
+        if demEle is None:
+            self.demMissing += 1
+            return
+        self.demSampled += 1
+        if ele is not None:
+            diff = ele - demEle
+            self.demCompared += 1
+            self.demSumDiff += diff
+            self.demSumAbsDiff += abs(diff)
+            if abs(diff) > abs(self.demMaxDiff):
+                self.demMaxDiff = diff
+
+    def merge(self, other):
+        '''
+        return new stats object combining self with the statistics of the following part other
+        deltas between the parts are not counted (they are treated as independent)
+        merge() is associative, so partial results may be combined in any grouping
+        raises ValueError if the configurations (configFields) differ, the counts not being comparable
+        '''
+        differ = [field for field in configFields if getattr(self, field) != getattr(other, field)]
+        if differ:
+            raise ValueError('statistics of differing configuration not merged: {}'.format(', '.join(
+                '{} {} & {}'.format(field, getattr(self, field), getattr(other, field)) for field in differ)))
+        total = stats(self.tolerT, self.tolerL, self.tolerV, self.precision,
+            self.maxDeltaL, self.maxDeltaV, self.maxDeltaS)
+        for field in ('parts', 'processed', 'discardedT', 'retained', 'ignoredV', 'distance',
+                'adjGain', 'adjLoss', 'repGain', 'repLoss'):
+            setattr(total, field, getattr(self, field) + getattr(other, field))
+        for field in ('bsvRetained', 'bsvDiscarded', 'clipped', 'demSampled', 'demMissing', 'demCompared',
+                'demSumDiff', 'demSumAbsDiff'):
+            setattr(total, field, _pick(lambda a, b: a + b, getattr(self, field), getattr(other, field)))
+        total.maxL = max(self.maxL, other.maxL)
+        total.maxS = max(self.maxS, other.maxS)
+        total.maxV = other.maxV if abs(other.maxV) > abs(self.maxV) else self.maxV
+        total.demMaxDiff = _pick(lambda a, b: b if abs(b) > abs(a) else a, self.demMaxDiff, other.demMaxDiff)
+        total.highEle = _pick(max, self.highEle, other.highEle)
+        total.lowEle = _pick(min, self.lowEle, other.lowEle)
+        for field in ('name', 'desc', 'startEle', 'startEN'):
+            setattr(total, field, _first(getattr(self, field), getattr(other, field)))
+        for field in ('endEle', 'endEN', 'refEle'):
+            setattr(total, field, _first(getattr(other, field), getattr(self, field)))
+        if self.startSecs is None or (other.startSecs is not None and other.startSecs < self.startSecs):
+            total.startTime, total.startSecs = other.startTime, other.startSecs
+        else:
+            total.startTime, total.startSecs = self.startTime, self.startSecs
+        if self.endSecs is None or (other.endSecs is not None and other.endSecs > self.endSecs):
+            total.endTime, total.endSecs = other.endTime, other.endSecs
+        else:
+            total.endTime, total.endSecs = self.endTime, self.endSecs
+        return total
+
+    def dumps(self):
+        '''
+        return compact single line serialisation (json list of statsFields values)
+        '''
+        return json.dumps([getattr(self, field) for field in statsFields], separators = (',', ':'))
+
+    @classmethod
+    def loads(cls, text):
+        '''
+        return stats object from dumps() serialisation
+        (fields missing from earlier serialisations keep their defaults)
+        '''
+        obj = cls()
+        for field, value in zip(statsFields, json.loads(text)):
+            setattr(obj, field, _native(value))
+        return obj
+
+    def genStats(self):
+        '''
+        return StringIO object holding route statistics text (crhGPX layout)
+        '''
+        sio = StringIO()
+        if self.parts > 1:
+            sio.write('Files/segments combined   : {:>5}\n'.format(self.parts))
+        sio.write('GPX way-points processed  : {:>5}\n'.format(self.processed))
+        if self.clipped is not None:
+            sio.write('Way-points clipped        : {:>5}\n'.format(self.clipped))
+        sio.write('Way-points discarded (t)  : {:>5}\n'.format(self.discardedT))
+        sio.write('Way-points retained       : {:>5}\n'.format(self.retained))
+        if self.bsvRetained is not None:
+            sio.write('Duplicate BSVs discarded  : {:>5}\n'.format(self.bsvDiscarded))
+            sio.write('BSVs retained             : {:>5}\n'.format(self.bsvRetained))
+        sio.write('Distance                  : {:>8.2f}km\n'.format(self.distance / 1000.0))
+        sio.write('Max length delta          : {:>7.1f}m\n'.format(self.maxL))
+        sio.write('Max vertical delta        : {:>+7.1f}m\n'.format(self.maxV))
+        sio.write('Max time delta            : {:>7.1f}sec\n'.format(self.maxS))
+        sio.write('Height increments ignored : {:>5}\n'.format(self.ignoredV))
+        sio.write('Adjusted height gain      : {:>5.0f}m\n'.format(self.adjGain))
+        sio.write('Adjusted height loss      : {:>5.0f}m\n'.format(self.adjLoss))
+        if self.startEle is not None:
+            sio.write('Start way-point elevation : {:>7.1f}m\n'.format(self.startEle))
+            sio.write('End way-point elevation   : {:>7.1f}m\n'.format(self.endEle))
+            sio.write('High way-point elevation  : {:>7.1f}m\n'.format(self.highEle))
+            sio.write('Low way-point elevation   : {:>7.1f}m\n'.format(self.lowEle))
+            sio.write('Net height gain           : {:>7.1f}m\n'.format(self.endEle - self.startEle))
+        if self.startEN is not None:
+            sio.write('Start-end separation (gpx): {:>8.2f}km\n'.format(hypot(self.endEN[0] - self.startEN[0],
+                self.endEN[1] - self.startEN[1]) / 1000.0))
+        if self.startTime is not None:
+            sio.write('Start timestamp           : {}\n'.format(self.startTime))
+            sio.write('End timestamp             : {}\n'.format(self.endTime))
+            sio.write('Elapsed time (H:M:S)      : {}\n'.format(hms(self.endSecs - self.startSecs)))
+        if self.demSampled is not None:
+            sio.write('DEM elevations sampled    : {:>5}\n'.format(self.demSampled))
+            sio.write('DEM elevations missing    : {:>5}\n'.format(self.demMissing))
+            if self.demCompared:
+                sio.write('Mean gpx-DEM difference   : {:>+7.1f}m\n'.format(self.demSumDiff / self.demCompared))
+                sio.write('Mean abs gpx-DEM diff     : {:>7.1f}m\n'.format(self.demSumAbsDiff / self.demCompared))
+                sio.write('Max gpx-DEM difference    : {:>+7.1f}m\n'.format(self.demMaxDiff))
+        sio.write('\n')
+        sio.write('GPX xml name tag          : {}\n'.format(self.name))
+        sio.write('GPX xml desc tag          : {}\n'.format(self.desc))
+        sio.write('Max Delta L (BSV)         : {:>7.1f}m\n'.format(self.maxDeltaL))
+        sio.write('Max Delta V (elevation)   : {:>7.1f}m\n'.format(self.maxDeltaV))
+        sio.write('Max Delta S (time)        : {:>7.1f}sec\n'.format(self.maxDeltaS))
+        sio.write('Reported height gain      : {:>5.0f}m\n'.format(self.repGain))
+        sio.write('Reported height loss      : {:>5.0f}m\n'.format(self.repLoss))
+        sio.write('Precision (NGR)           : {:>5} digits\n'.format(precisionText(self.precision)))
+        sio.write('Tolerance L (BSV)         : {:>5}m\n'.format(self.tolerL))
+        sio.write('Tolerance V (cumulative)  : {:>5}m\n'.format(self.tolerV))
+        sio.write('Tolerance T (way-point)   : {:>5}sec\n'.format(self.tolerT))
+        return sio
+
+class track(object):
+    '''
+    streaming gpx track: way-points are thinned, projected & counted as they are read
+    quiet & verbose default to the class values, maxDelta values to the module values
+    '''
+    quiet = False
+    verbose = False
+
+    def __init__(self, time = True, delta = False, tolerT = 12, tolerL = 5, tolerV = 10, precision = 8,
+            quiet = None, verbose = None, maxDeltaL = None, maxDeltaV = None, maxDeltaS = None,
+            dem = None, demCheck = False, clip = None):
+        if quiet is not None:
+            self.quiet = quiet
+        if verbose is not None:
+            self.verbose = verbose
+        self.time = time
+        self.delta = delta
+        self.tolerT = tolerT
+        self.tolerL = tolerL
+        self.tolerV = tolerV
+        self.precision = precision
+        self.dem = dem  # elevation grid (crhGrid.grid), None if not used
+        self.demCheck = demCheck    # compare gpx elevations with the grid rather than replace them
+        self.clip = clip    # clip area (crhClip.clip), None if not used
+        self.reader = reader()
+        self.stats = stats(tolerT, tolerL, tolerV, precision, maxDeltaL, maxDeltaV, maxDeltaS)
+        if clip is not None:
+            self.stats.clipped = 0
+        self.lastSecs = None    # time of last retained way-point (t tolerance)
+        self.lastBSV = None     # way-point of last retained bsv record (l tolerance)
+
+    def retain(self, rawPoint):
+        '''
+        apply t tolerance to raw (lat, lon, ele, time) tuple
+        return projected wayPoint if retained, otherwise None (retained way-points are then count()ed)
+        '''
+        lat, lon, ele, timestamp = rawPoint
+        self.stats.processed += 1
+        if self.clip is not None and (lat is None or lon is None or not self.clip.preTest(lat, lon)):
+            self.stats.clipped += 1
+            return None
+        secs = isoSecs(timestamp) if self.time and timestamp else None
+        if secs is not None and self.tolerT and self.lastSecs is not None \
+                and secs - self.lastSecs < self.tolerT:
+            self.stats.discardedT += 1
+            return None
+        east = north = None
+        if lat is not None and lon is not None:
+            try:
+                east, north = crhMapFast.wgs2osgbCached((lat, lon))
+            except RuntimeError:    # outside the national grid, ngr n/a
+                pass
+            if self.clip is not None and not self.clip.contains(east, north):
+                self.stats.clipped += 1
+                return None
+        if secs is not None and self.stats.processed > 1:   # as crhGPX, start way-point kept separately
+            self.lastSecs = secs
+        if not self.time:
+            timestamp = None
+        if east is None:
+            ngr = 'n/a'
+        else:
+            try:
+                if multiPrecision(self.precision):
+                    ngr = crhMapFast.osgb2ngrMulti((east, north), self.precision)
+                else:
+                    ngr = crhMapFast.osgb2ngr((east, north), self.precision)
+            except RuntimeError:
+                ngr = 'n/a'
+        if ngr == 'n/a' and multiPrecision(self.precision):
+            ngr = ('n/a',) * len(self.precision)
+        return wayPoint(lat, lon, ele, timestamp, secs, east, north, ngr)
+
+    def elevate(self, points):
+        '''
+        sample elevation grid at list of retained wayPoints (one batch), return them with the gpx
+        elevations replaced by the grid values (unless in check mode or outside the grid)
+        '''
+        nan = float('nan')
+        eastings = [nan if point.east is None else point.east for point in points]
+        northings = [nan if point.north is None else point.north for point in points]
+        values = self.dem.sample(eastings, northings)[0]
+        elevated = list()
+        for point, value in zip(points, values):
+            demEle = None if value is None or math.isnan(value) else round(float(value), 1)
+            self.stats.addDem(point.ele, demEle)
+            if demEle is not None:
+                if not self.demCheck:
+                    point = point._replace(ele = demEle)
+                elif self.verbose and point.ele is not None and abs(point.ele - demEle) > self.stats.maxDeltaV:
+                    statusErrMsg('warn', 'crhTrack', 'elevation {:+.1f}m from DEM at {}'.format(point.ele - demEle,
+                        ngrText(point.ngr)), self.quiet)
+            elevated.append(point)
+        return elevated
+
+    def count(self, point):
+        '''
+        update the statistics with retained wayPoint
+        '''
+        deltaL, deltaV = self.stats.add(point)
+        if self.verbose:
+            if deltaL is not None and deltaL > self.stats.maxDeltaL:
+                statusErrMsg('warn', 'crhTrack', 'length delta {:.1f}m at {}'.format(deltaL, ngrText(point.ngr)),
+                    self.quiet)
+            if deltaV is not None and abs(deltaV) > self.stats.maxDeltaV:
+                statusErrMsg('warn', 'crhTrack', 'vertical delta {:+.1f}m at {}'.format(deltaV, ngrText(point.ngr)),
+                    self.quiet)
+
+    def feed(self, data):
+        '''
+        add block of gpx text, return list of retained wayPoints completed by it
+        '''
+        points = list()
+        for rawPoint in self.reader.feed(data):
+            point = self.retain(rawPoint)
+            if point is not None:
+                points.append(point)
+        if self.dem is not None and points:
+            points = self.elevate(points)
+        for point in points:
+            self.count(point)
+        self.stats.name = self.reader.name
+        self.stats.desc = self.reader.desc
+        return points
+
+    def pointGen(self, fileH):
+        '''
+        yield retained wayPoints read from open gpx file
+        '''
+        while True:
+            data = fileH.read(blockSize)
+            if not data:
+                break
+            for point in self.feed(data):
+                yield point
+
+    def windowGen(self, fileH, size):
+        '''
+        yield retained wayPoints read from open gpx file in lists of at most size way-points
+        '''
+        return windowGen(self.pointGen(fileH), size)
+
+    def bsvFilter(self, points):
+        '''
+        return list of (wayPoint, deltaL, deltaV) for points not duplicating the previous bsv record
+        ie: separated by at least the l tolerance, state is carried over to the next call
+        '''
+        if self.stats.bsvRetained is None:
+            self.stats.bsvRetained = self.stats.bsvDiscarded = 0
+        records = list()
+        for point in points:
+            deltaL = deltaV = None
+            if self.lastBSV is not None and point.east is not None and self.lastBSV.east is not None:
+                deltaL = hypot(point.east - self.lastBSV.east, point.north - self.lastBSV.north)
+                if self.tolerL and deltaL < self.tolerL:
+                    self.stats.bsvDiscarded += 1
+                    continue
+            if self.lastBSV is not None and point.ele is not None and self.lastBSV.ele is not None:
+                deltaV = point.ele - self.lastBSV.ele
+            self.lastBSV = point
+            self.stats.bsvRetained += 1
+            records.append((point, deltaL, deltaV))
+        return records
+
+    def bsvHead(self):
+        '''
+        return bsv header record
+        '''
+        if self.delta:
+            return bsvHeaderText(self.precision) + '|deltaL|deltaV\n'
+        return bsvHeaderText(self.precision) + '\n'
+
+    def bsvRows(self, records):
+        '''
+        return bsv text for list of (wayPoint, deltaL, deltaV) records
+        '''
+        rows = list()
+        for point, deltaL, deltaV in records:
+            row = '{}|{}|{}|{}|{}|{}|{}'.format(fmtLat(point.lat), fmtLat(point.lon), fmtEle(point.ele),
+                point.time or '', '' if point.east is None else point.east,
+                '' if point.north is None else point.north, ngrText(point.ngr))
+            if self.delta:
+                row += '|{}|{}'.format('' if deltaL is None else '{:.1f}'.format(deltaL),
+                    '' if deltaV is None else '{:+.1f}'.format(deltaV))
+            rows.append(row + '\n')
+        return ''.join(rows)
+
+    def xmlHead(self, pretty = True, track = True):
+        '''
+        return gpx xml markup preceding the way-points
+        '''
+        nl, i1, i2, i3 = ('\n', '  ', '    ', '      ') if pretty else ('', '', '', '')
+        head = '<?xml version="1.0" encoding="ASCII"?>' + nl + '<gpx creator="crhGPX" version="1.0">' + nl
+        head += i1 + ('<trk>' if track else '<rte>') + nl
+        if self.reader.name is not None:
+            head += i2 + '<name>{}</name>'.format(self.reader.name) + nl
+        if self.reader.desc is not None:
+            head += i2 + '<desc>{}</desc>'.format(self.reader.desc) + nl
+        if track:
+            head += i2 + '<trkseg>' + nl
+        return head
+
+    def xmlRows(self, points, pretty = True, track = True):
+        '''
+        return gpx xml markup for list of wayPoints
+        '''
+        nl, indent = ('\n', '      ' if track else '    ') if pretty else ('', '')
+        inner = indent + '  ' if pretty else ''
+        tag = 'trkpt' if track else 'rtept'
+        rows = list()
+        for point in points:
+            rows.append('{}<{} lat="{}" lon="{}">{}'.format(indent, tag, fmtLat(point.lat), fmtLat(point.lon), nl))
+            if point.ele is not None:
+                rows.append('{}<ele>{}</ele>{}'.format(inner, fmtEle(point.ele), nl))
+            if point.time is not None:
+                rows.append('{}<time>{}</time>{}'.format(inner, point.time, nl))
+            rows.append('{}</{}>{}'.format(indent, tag, nl))
+        return ''.join(rows)
+
+    def xmlTail(self, pretty = True, track = True):
+        '''
+        return gpx xml markup following the way-points
+        '''
+        nl, i1, i2 = ('\n', '  ', '    ') if pretty else ('', '', '')
+        if track:
+            return i2 + '</trkseg>' + nl + i1 + '</trk>' + nl + '</gpx>' + nl
+        return i1 + '</rte>' + nl + '</gpx>' + nl
+
+    def genStats(self):
+        '''
+        return StringIO object holding route statistics text
+        '''
+        return self.stats.genStats()
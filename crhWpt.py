@@ -0,0 +1,290 @@
+# crhWpt.py -- compact delta-encoded binary way-point files (alternative to bsv records)
+# v1.00 crh 19-oct-26 -- initial release
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# binary way-point file layout:
+#   header: magic 'CRHW', version (uint16), ngr precision (uint8), flags (uint8, unused),
+#           t, l & v tolerances used generating the way-points (float32),
+#           gpx name & desc (varint length + 1, 0 if none, then utf-8 text)
+#   blocks: varint way-point count, varint byte length, then for each way-point
+#           a varint presence flag (lat/lon, elevation, time, easting/northing) followed by
+#           zig-zag varint deltas of the fields present, from the previous value in the block
+#   end:    varint 0 (empty block)
+# fields are fixed point: lat/lon 0.00001 deg & elevation 0.1m (as output in bsv records),
+# time in seconds since the epoch & easting/northing in m, so bsv records convert without loss
+# (timestamps are rebuilt as yyyy-mm-ddThh:mm:ssZ, fractional seconds are not kept)
+# ngr values are not stored, but rebuilt from the easting & northing when read
+# each block starts from zero, so blocks decode independently (or can be skipped)
+
+import struct
+from array import array
+from time import gmtime, strftime
+
+import crhMapFast       # fast mapping utilities
+import crhTrack         # streaming gpx processing
+
+## essential variables
+magic = b'CRHW'
+version = 1
+headerFmt = '<4sHBBfff'
+headerSize = struct.calcsize(headerFmt)
+wptExt = '.wpt'
+blockPoints = 4096  # way-points per block
+latLonScale = 100000
+eleScale = 10
+hasLatLon, hasEle, hasTime, hasEN = 1, 2, 4, 8  # presence flag bits
+fieldBits = (hasLatLon, hasLatLon, hasEle, hasTime, hasEN, hasEN)   # lat, lon, ele, secs, east, north
+nan = float('nan')
+
+## define functions
+def _varint(value, buf):
+    '''
+    append unsigned int value to bytearray buf as varint
+    '''
+    while value > 0x7f:
+        buf.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+def _zigzag(value, buf):
+    '''
+    append signed int value to bytearray buf as zig-zag varint
+    '''
+    _varint(value << 1 if value >= 0 else ((-value) << 1) - 1, buf)
+
+def _fixed(value, places):
+    '''
+    return value as fixed point int with places decimal places, rounded as when formatted
+    (as in bsv records, so lat/lon & elevation round trip exactly)
+    '''
+    return int('{:.{}f}'.format(value, places).replace('.', ''))
+
+def _readVarint(fileH):
+    '''
+    return varint read from file, None at end of file
+    '''
+    value = shift = 0
+    while True:
+        byte = fileH.read(1)
+        if not byte:
+            if shift:
+                raise RuntimeError('binary way-point file truncated')
+            return None
+        byte = ord(byte)
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value
+        shift += 7
+
+def _text(value):
+    '''
+    return utf-8 text encoded with length prefix (None gives 0)
+    '''
+    buf = bytearray()
+    if value is None:
+        _varint(0, buf)
+    else:
+        data = value.encode('utf-8') if isinstance(value, unicode) else value
+        _varint(len(data) + 1, buf)
+        buf.extend(data)
+    return buf
+
+def _readText(fileH):
+    '''
+    return text read with length prefix (utf-8 encoded str), None if none
+    '''
+    length = _readVarint(fileH)
+    if not length:
+        return None
+    return fileH.read(length - 1)
+
+def _num(value):
+    '''
+    return float32 header value as int if whole
+    '''
+    return int(value) if value == int(value) else value
+
+def isoTime(secs):
+    '''
+    return gpx timestamp for seconds since epoch
+    '''
+    return strftime('%Y-%m-%dT%H:%M:%SZ', gmtime(secs))
+
+def _decodeVarint(data, pos):
+    '''
+    return (varint decoded from bytearray data at pos, following pos)
+    '''
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def decodeBlock(data, count):
+    '''
+    return list of count (flags, lat, lon, ele, secs, east, north) fixed point int tuples
+    decoded from block data (fields missing from a way-point are None)
+    '''
+    values = list()
+    last = [0] * len(fieldBits)
+    pos = 0
+    for i in range(count):
+        flags, pos = _decodeVarint(data, pos)
+        point = [flags] + [None] * len(fieldBits)
+        for index, bit in enumerate(fieldBits):
+            if flags & bit:
+                value, pos = _decodeVarint(data, pos)
+                last[index] += (value >> 1) ^ -(value & 1)
+                point[index + 1] = last[index]
+        values.append(tuple(point))
+    return values
+
+class writer(object):
+    '''
+    binary way-point file writer, add() wayPoints (crhTrack.wayPoint) then close()
+    the header is written with the first block, so name & desc may be set until then
+    '''
+    def __init__(self, fileH, tolerT = 12, tolerL = 5, tolerV = 10, precision = 8, name = None, desc = None,
+            blockSize = blockPoints):
+        self.fileH = fileH
+        self.tolerT = tolerT
+        self.tolerL = tolerL
+        self.tolerV = tolerV
+        self.precision = precision
+        self.name = name
+        self.desc = desc
+        self.blockSize = blockSize
+        self.count = self.bytes = 0
+        self._headerDone = False
+        self._block = list()
+
+    def _header(self):
+        header = bytearray(struct.pack(headerFmt, magic, version, self.precision, 0,
+            self.tolerT, self.tolerL, self.tolerV))
+        header.extend(_text(self.name))
+        header.extend(_text(self.desc))
+        self.fileH.write(bytes(header))
+        self.bytes += len(header)
+        self._headerDone = True
+
+    def add(self, point):
+        '''
+        add wayPoint, writing a block once full
+        '''
+        self._block.append(point)
+        if len(self._block) >= self.blockSize:
+            self.flush()
+
+    def flush(self):
+        '''
+        write way-points added as a block
+        '''
+        if not self._headerDone:
+            self._header()
+        if not self._block:
+            return
+        body = bytearray()
+        last = [0] * len(fieldBits)
+        for point in self._block:
+            values = [None if point.lat is None or point.lon is None else _fixed(point.lat, 5),
+                None if point.lat is None or point.lon is None else _fixed(point.lon, 5),
+                None if point.ele is None else _fixed(point.ele, 1),
+                None if point.secs is None else int(point.secs),
+                None if point.east is None or point.north is None else int(round(point.east)),
+                None if point.east is None or point.north is None else int(round(point.north))]
+            flags = 0
+            for value, bit in zip(values, fieldBits):
+                if value is not None:
+                    flags |= bit
+            _varint(flags, body)
+            for index, value in enumerate(values):
+                if value is not None:
+                    _zigzag(value - last[index], body)
+                    last[index] = value
+        head = bytearray()
+        _varint(len(self._block), head)
+        _varint(len(body), head)
+        self.fileH.write(bytes(head + body))
+        self.bytes += len(head) + len(body)
+        self.count += len(self._block)
+        self._block = list()
+
+    def close(self):
+        '''
+        write remaining way-points & end of file marker (the file itself is not closed)
+        '''
+        self.flush()
+        self.fileH.write(b'\x00')
+        self.bytes += 1
+
+class reader(object):
+    '''
+    binary way-point file reader, header values available as attributes once created
+    '''
+    def __init__(self, fileH):
+        self.fileH = fileH
+        header = fileH.read(headerSize)
+        if len(header) < headerSize:
+            raise RuntimeError('not a binary way-point file (too short)')
+        (fileMagic, fileVersion, self.precision, flags, tolerT, tolerL, tolerV) = struct.unpack(headerFmt, header)
+        if fileMagic != magic or fileVersion != version:
+            raise RuntimeError('not a version {} binary way-point file'.format(version))
+        self.tolerT, self.tolerL, self.tolerV = _num(tolerT), _num(tolerL), _num(tolerV)
+        self.name = _readText(fileH)
+        self.desc = _readText(fileH)
+
+    def blockGen(self):
+        '''
+        yield list of (flags, lat, lon, ele, secs, east, north) fixed point int tuples for each block
+        '''
+        while True:
+            count = _readVarint(self.fileH)
+            if not count:   # end of file marker (or end of file)
+                return
+            length = _readVarint(self.fileH)
+            data = self.fileH.read(length)
+            if length is None or len(data) < length:
+                raise RuntimeError('binary way-point file truncated')
+            yield decodeBlock(bytearray(data), count)
+
+    def pointGen(self, precision = None):
+        '''
+        yield crhTrack.wayPoint for each way-point, ngr rebuilt at precision (default: header precision)
+        '''
+        precision = precision or self.precision
+        for block in self.blockGen():
+            for flags, lat, lon, ele, secs, east, north in block:
+                if lat is not None:
+                    lat = float(lat) / latLonScale
+                    lon = float(lon) / latLonScale
+                if ele is not None:
+                    ele = float(ele) / eleScale
+                ngr = 'n/a'
+                if east is not None:
+                    try:
+                        ngr = crhMapFast.osgb2ngr((east, north), precision)
+                    except RuntimeError:
+                        pass
+                yield crhTrack.wayPoint(lat, lon, ele, None if secs is None else isoTime(secs), secs,
+                    east, north, ngr)
+
+    def columns(self):
+        '''
+        return dict of float arrays (lat, lon, ele, secs, east, north) holding all way-points,
+        missing values being nan (eg: for numpy.frombuffer())
+        '''
+        names = ('lat', 'lon', 'ele', 'secs', 'east', 'north')
+        scales = (latLonScale, latLonScale, eleScale, 1, 1, 1)
+        cols = dict((name, array('d')) for name in names)
+        for block in self.blockGen():
+            for index, (name, scale) in enumerate(zip(names, scales)):
+                cols[name].extend([nan if point[index + 1] is None else float(point[index + 1]) / scale
+                    for point in block])
+        return cols
@@ -0,0 +1,223 @@
+# gpxMatch.py -- find duplicate & repeated walks across an archive of gpx files
+# v1.00 crh 19-oct-26 -- initial release
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# the archive is held as a track index file (see crhSimilar), built & updated in all mode:
+#   gpxMatch.py -i "d:/gpx/*.gpx" -A -I archive.idx     -- fingerprint new & changed gpx files
+#   gpxMatch.py -i d:/gpx/walk.gpx -I archive.idx       -- list the walks similar to walk.gpx
+#   gpxMatch.py -I archive.idx -d                       -- list all similar pairs of walks
+# only tracks sharing grid cells & start/end points with a walk are compared exactly (hausdorff
+# or discrete frechet distance between their downsampled paths), so a search does not read
+# the gpx files of the archive, nor compare every track with every other
+# output is bsv records (file|match|distance|share), distance in m & share the proportion of
+# grid cells the walks share
+# the program can also be imported, all state being held in the options object
+
+import argparse
+from sys import stdout, stderr, exit
+
+from crhDebug import *  # debug & messaging
+from crhFile import *   # file handling
+from crhString import * # string utilities
+import crhTimer         # timer
+import crhCompress      # compressed files
+import crhSimilar       # track fingerprints & similarity search
+
+## essential variables (defaults, see options class)
+progName = 'gpxMatch'
+quiet = False   # less output (quiet & verbose are not mutually exclusive)
+verbose = False # more output
+measure = 'hausdorff'   # exact comparison: hausdorff or frechet
+maxDist = crhSimilar.maxDist    # maximum distance (m) of similar walks
+minShare = crhSimilar.minShare  # minimum proportion of grid cells shared by candidate walks
+maxEnd = crhSimilar.maxEnd      # maximum distance (m) between start & end points (None: not checked)
+reverse = True  # walks in the opposite direction match
+matchHeader = 'file|match|distance|share'
+
+## define classes
+class options(object):
+    '''
+    matching options, initially the module defaults above
+    keyword arguments override the defaults (eg: options(measure = 'frechet', maxDist = 50))
+    '''
+    def __init__(self, **kwargs):
+        for name in ('quiet', 'verbose', 'measure', 'maxDist', 'minShare', 'maxEnd', 'reverse'):
+            setattr(self, name, globals()[name])
+        for name, value in kwargs.items():
+            if not hasattr(self, name):
+                raise TypeError('unknown gpxMatch option: {}'.format(name))
+            setattr(self, name, value)
+
+## define functions
+def setParser():
+    '''
+    set up argparser object & return it
+    '''
+    parse = argparse.ArgumentParser(description="find duplicate & repeated walks in an archive of gpx files")
+    parse.add_argument('-i', '--input', action="store", dest="infile",
+        help="gpx file to match (eg: d:\\gpx\\walk.gpx), or files to index with -A (eg: d:\\gpx\\*.gpx)")
+    parse.add_argument('-I', '--index', action="store", dest="indexfile", required=True,
+        help="track index file (eg: d:\\gpx\\archive.idx)")
+    mode = parse.add_mutually_exclusive_group()
+    mode.add_argument('-A', '--all', action="store_true", dest="allmode",
+        help="add all matching gpx files to the index (new & changed files only)")
+    mode.add_argument('-d', '--duplicates', action="store_true", dest="dupmode",
+        help="list all pairs of similar walks held in the index")
+    parse.add_argument('-m', '--measure', action="store", dest="measure", choices=crhSimilar.measures,
+        help="exact comparison measure (default: hausdorff)", default = measure)
+    parse.add_argument('-D', '--distance', action="store", dest="maxdist", type = float,
+        help="maximum distance (m) between similar walks", default = maxDist)
+    parse.add_argument('-s', '--share', action="store", dest="minshare", type = float,
+        help="minimum proportion of grid cells shared by candidate walks", default = minShare)
+    parse.add_argument('-e', '--ends', action="store", dest="maxend", type = float,
+        help="maximum distance (m) between start & end points (0: not checked)", default = maxEnd)
+    parse.add_argument('-f', '--forward', action="store_true", dest="forwardmode",
+        help="walks in the opposite direction do not match")
+    parse.add_argument('-q', '--quiet', action="store_true", dest="quietmode",
+        help="suppress some program messages")
+    parse.add_argument('-v', '--verbose', action="store_true", dest="verbosemode",
+        help="generate additional program messages")
+    return parse
+
+def loadIndex(indexFile, create = False):
+    '''
+    return track index read from index file (a new, empty, index if create & the file does not exist)
+    raises IOError if it cannot be read, RuntimeError if it is not an index file
+    '''
+    if create and not accessFile(indexFile, 'fOK'):
+        return crhSimilar.index()
+    return crhSimilar.index.load(indexFile)
+
+def indexFiles(fileglob, directory, idx, opts):
+    '''
+    add fingerprints of gpx files matching fileglob in directory to index, unless already current
+    returns (files added, files unchanged)
+    '''
+    added = unchanged = 0
+    for fileName in crhCompress.fileIter(fileglob, directory):
+        fileName = osPath(fileName)
+        if idx.current(fileName):
+            unchanged += 1
+            continue
+        try:
+            fp = crhSimilar.fingerprintFile(fileName, idx.cellSize)
+        except IOError as e:
+            statusErrMsg('error', 'indexFiles', 'unable to read gpx file: {}'.format(e))
+            continue
+        if fp is None:
+            statusErrMsg('warn', 'indexFiles', 'no way-points in gpx file: {}'.format(fileName), opts.quiet)
+            continue
+        idx.add(fp)
+        added += 1
+        if opts.verbose:
+            errMsg('indexed: {} ({} cells)'.format(fileName, len(fp.cells)), opts.quiet)
+    return added, unchanged
+
+def matchRecord(fileName, dist, share, other):
+    '''
+    return bsv output record for a match
+    '''
+    return '{}|{}|{:.1f}|{:.2f}'.format(fileName, other.file, dist, share)
+
+def matchFile(inputFile, idx, opts):
+    '''
+    return list of (distance, share, fingerprint) of walks in index similar to gpx input file
+    (the fingerprint held in the index used if current)
+    raises IOError if the gpx file cannot be read
+    '''
+    fp = idx.get(inputFile) if idx.current(inputFile) else None
+    if fp is None:
+        fp = crhSimilar.fingerprintFile(inputFile, idx.cellSize)
+    if fp is None:
+        return list()
+    return idx.search(fp, opts.measure, opts.maxDist, opts.minShare, opts.maxEnd, opts.reverse)
+
+def duplicates(idx, opts):
+    '''
+    yield (file, distance, share, fingerprint) for each pair of similar walks in index (once per pair)
+    '''
+    for fp in idx.prints:
+        if fp is None:
+            continue
+        for dist, share, other in idx.search(fp, opts.measure, opts.maxDist, opts.minShare, opts.maxEnd,
+                opts.reverse):
+            if fp.file < other.file:
+                yield fp.file, dist, share, other
+
+def setOptions(args):
+    '''
+    return options object set from parsed command line arguments, reporting them
+    '''
+    opts = options(quiet = args.quietmode, verbose = args.verbosemode, measure = args.measure,
+        maxDist = args.maxdist, minShare = args.minshare, maxEnd = args.maxend or None,
+        reverse = not args.forwardmode)
+    quiet = opts.quiet
+    if opts.verbose:
+        errMsg('verbose mode set', quiet)
+    if not args.allmode:
+        errMsg('{} distance within {}m, {:.0%} of grid cells shared'.format(opts.measure, opts.maxDist,
+            opts.minShare), quiet)
+        if opts.verbose:
+            if opts.maxEnd is None:
+                errMsg('start & end points not checked', quiet)
+            else:
+                errMsg('start & end points within {}m'.format(opts.maxEnd), quiet)
+    if not opts.reverse:
+        errMsg('forward mode set', quiet)
+        if opts.verbose: errMsg('walks in the opposite direction do not match', quiet)
+    return opts
+
+def main(argv = None):
+    '''
+    command line program: index or match gpx files as set by arguments (default: sys.argv)
+    '''
+    setProgName(progName)
+    errTMsg('{} -- find duplicate & repeated walks'.format(getProgName()), quiet)
+    args = setParser().parse_args(argv)
+    opts = setOptions(args)
+    indexFile = osPath(args.indexfile)
+    if not args.dupmode and not args.infile:
+        statusErrMsg('fatal', 'args', 'input file required (except with -d)')
+        exit(1)
+    errMsg('index file: {}'.format(indexFile), opts.quiet)
+    try:
+        idx = loadIndex(indexFile, args.allmode)
+    except (IOError, RuntimeError) as e:
+        statusErrMsg('fatal', 'main', 'unable to load index: {}'.format(e))
+        exit(1)
+    if opts.verbose:
+        errMsg('{} walks indexed'.format(len(idx)), opts.quiet)
+    try:
+        if args.allmode:
+            (inDrive, inPath, inName, inExt) = splitFileCmpnt(osPath(args.infile))
+            added, unchanged = indexFiles(inName + inExt, inDrive + inPath, idx, opts)
+            if added:
+                idx.save(indexFile)
+            errMsg('{} files added to index, {} unchanged ({} walks indexed)'.format(added, unchanged, len(idx)),
+                opts.quiet)
+        elif args.dupmode:
+            count = 0
+            msg(matchHeader)
+            for fileName, dist, share, other in duplicates(idx, opts):
+                msg(matchRecord(fileName, dist, share, other))
+                count += 1
+            errMsg(singural(count, ' similar pair', ' similar pairs', '\n', ' found'), opts.quiet)
+        else:
+            inputFile = osPath(args.infile)
+            found = matchFile(inputFile, idx, opts)
+            msg(matchHeader)
+            for dist, share, other in found:
+                msg(matchRecord(inputFile, dist, share, other))
+            errMsg(singural(len(found), ' similar walk', ' similar walks', '\n', ' found'), opts.quiet)
+    except IOError as e:
+        statusErrMsg('fatal', 'main', str(e))
+        exit(1)
+    errTMsg('{} ending normally ({:06.2f}sec)'.format(getProgName(), crhTimer.timer.stop()), opts.quiet)
+
+## main program
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,28 @@
 # v3.05 crh 20-jun-15 -- remove gpx class to library, significantly revamp program capability
 # v3.12 crh 05-sep-15 -- provide output file path based on input file path, also give absolute path option
 # v3.20 crh 16-jan-16 -- minor mods & setParser() added
+# v3.30 crh 19-oct-26 -- chunked processing (bounded memory) added
+# v3.40 crh 19-oct-26 -- follow mode for growing gpx files added
+# v3.50 crh 19-oct-26 -- statistics file & merge mode added
+# v3.60 crh 19-oct-26 -- result cache added
+# v3.70 crh 19-oct-26 -- importable: options & output objects replace module globals, main() added
+# v3.80 crh 19-oct-26 -- thread-safe: per-call crhGPX/crhTrack configuration
+# v3.90 crh 19-oct-26 -- compressed (.gz, .bz2, .xz, .zip) input & output files
+# v4.00 crh 19-oct-26 -- multiple ngr precisions (eg: -p l,m,h) from one projection
+# v4.10 crh 19-oct-26 -- scan mode (quick-look file summaries) added
+# v4.20 crh 19-oct-26 -- elevations replaced or checked from a local elevation grid (dem)
+# v4.30 crh 19-oct-26 -- clip to ngr square or lat/lon box
+# v4.40 crh 19-oct-26 -- batch progress & throughput reporting
+# v4.50 crh 19-oct-26 -- batch mode prefetching & background writing (--prefetch)
+# v4.60 crh 19-oct-26 -- per ngr square occupancy & dwell time rollups (--rollup)
+# v4.70 crh 19-oct-26 -- tracks, segments & routes processed separately, in parallel (--segments)
+# v4.71 crh 19-oct-26 -- batch mode skips files whose output file name is already used (route.gpx & route.gpx.gz)
+# v4.72 crh 19-oct-26 -- max delta values part of the result cache key
+# v4.73 crh 19-oct-26 -- chunk mode spool files & output closed whatever happens
+# v4.74 crh 19-oct-26 -- segment mode document summary takes the first segment's name & desc if none outside
+# v4.75 crh 19-oct-26 -- batch progress counts the way-points of whole file processing (& cached results)
+# v4.76 crh 19-oct-26 -- statistics file & batch totals written for every gpx processing mode
+# v4.77 crh 19-oct-26 -- merge mode reports statistics that cannot be combined (differing configuration)
 
 # written on a windows platform using python v2.7
 
@@ -35,9 +57,63 @@
 # together with the easting & northings (int value in m) & the 1/10/100m NGR
 # very close easting & northing values in adjacent records are treated as duplicates
 # if delta values required then deltaL & deltaH fields (m) appended
+# several precisions (eg: -p l,m,h) give an NGR field for each (ngr6|ngr8|ngr10 in the header record),
+# all formatted from the one easting & northing, the gpx data then being processed by crhTrack
+# as crhGPX formats a single precision
+#
+# compressed input & output files (eg: route.gpx.gz, see crhCompress) are read & written as streams,
+# compressed gpx data being processed by crhTrack as crhGPX only reads plain files
+#
+# the statistics file (--statsfile) & batch mode (-A) combined statistics need crhTrack's statistics
+# object, so whole file processing then uses crhTrack too (crhGPX only returning statistics text);
+# scan & merge modes produce no statistics to record, so a statistics file is refused with them
+#
+# gpx elevations can be replaced by (or, with --dem-check, compared with) values interpolated from
+# a local elevation grid in OSGB coordinates (--dem: crhGrid binary grid or ESRI ASCII grid file),
+# the gpx data then being processed by crhTrack, the grid being memory-mapped once & shared by all files
+#
+# scan mode (--scan) outputs a one line summary of each gpx file (way-point count, first & last time,
+# name, desc, bounding box & creator) for cataloguing archives, see crhScan,
+# the files are only tokenized, so the other output switches are ignored
+#
+# batch mode (-A) progress is reported every --progress seconds (files, way-points, bytes, rates & eta)
+# and/or appended to a --progress-file as bsv records, see crhProgress; way-points are counted
+# once each file is done, whole file processing by crhGPX taking the count from its route statistics,
+# a cached result holding the count (& serialised statistics) as a tagged last section (stripped before output)
+#
+# batch mode (-A) can overlap reading & writing with processing (--prefetch, see crhPipeline):
+# up to the given number of input files are read ahead (into the operating system cache) and output
+# files are written by a background thread, while the current file is processed; the files are
+# checked, processed & reported in the same order as without it, a write error still ending the run
+#
+# rollup mode (--rollup 4 for 1km squares, 6 for 100m squares...) adds a sparse bsv table to the output,
+# the dwell time, distance, visits & way-points of the retained way-points in each ngr square
+# (see crhRollup), the gpx data then being processed by crhTrack; in batch mode (-A) the tables
+# of all the files are combined, the combined table going to --rollup-file (or stdout)
+#
+# segment mode (--segments) processes each <trkseg> & <rte> of a gpx file separately (see crhSegment),
+# in --workers processes (0: one per cpu core), the output being each segment's heading, bsv records
+# & statistics, in document order, then the document summary (the segments' statistics combined);
+# xml output is not available in segment mode
+#
+# the program can also be imported & driven in-process, eg:
+#   opts = gpxRdngs.options(bsv = True, stats = True, precision = 10)
+#   gpxRdngs.processFile('route.gpx', opts, gpxRdngs.output(stream = sio))
+# which returns a fileResult (way-points processed & route statistics) or None,
+# all state is held in the options & output objects, the module level values being defaults only
+# & processFile() may be called from several threads at once with different options:
+# crhTrack (chunk & follow modes) is configured per track object, whereas crhGPX reads its
+# maxDelta values from module variables, so whole file processing holds gpxLock while they are set & used
 
 import argparse
+import os
 import re
+import tempfile
+import threading
+from collections import namedtuple
+from time import sleep
+from timeit import default_timer as clock
+from StringIO import StringIO
 from sys import stdout, stderr, exit
 
 from crhDebug import *  # debug & messaging
@@ -46,8 +122,19 @@ from crhString import * # string utilities
 import crhTimer         # timer
 from crhMap import *    # mapping utilities
 import crhGPX           # gpx class
+import crhTrack         # streaming gpx processing
+import crhMapFast       # fast mapping utilities
+import crhCache         # output cache
+import crhCompress      # compressed files
+import crhScan          # quick-look gpx summaries
+import crhGrid          # memory-mapped grids
+import crhClip          # clip areas
+import crhProgress      # progress reporting
+import crhPipeline      # prefetching & background writing
+import crhRollup        # ngr square rollups
+import crhSegment       # parallel segment processing
 
-## essential variables
+## essential variables (defaults, see options class)
 progName = 'gpxRdngs'
 compact = False  # generate compact (ie: not pretty) xml output (reduce output file size)
 quiet = False   # less output (quiet & verbose are not mutually exclusive)
@@ -61,24 +148,152 @@ auto = False    # output file name based on input file name (.txt extension)
 all = False     # process all *.gpx files in given directory
 delta = False   # include delta values in bsv records
 time = True     # process time data
-#tolerT = gpx.tolerT # gpx way-point delta time tolerance (sec)
-#tolerL = gpx.tolerL # bsv delta length tolerance (m)
-#tolerV = gpx.tolerV # cumulative height delta gain/loss tolerance (m)
 tolerZ = False  # set all tolerances to zero (ie, disable them) initially if true
 tolerT = 12 # minimum acceptable time difference between consecutive gpx way-points
 tolerL = 5  # minimum acceptable length difference between consecutive BSV way-points
 tolerV = 10 # minimum height difference between gpx way-points used in cumulative gain/loss
-inputFile = None
-outputFile = None
-outputH = None
-gpxData = None
-
+chunkSize = 0   # process way-points in windows of this size (0: whole file)
+follow = False  # tail growing gpx file, processing appended way-points only
+followInterval = 60 # seconds between route statistics updates in follow mode
+followPoll = 1.0    # seconds between checks for appended data in follow mode
+merge = False   # input file holds serialised statistics to be combined
+scan = False    # output one line summary of each gpx file only
+dem = None      # elevation grid (crhGrid.grid) replacing gpx elevations (None: not used)
+demCheck = False    # compare gpx elevations with the elevation grid rather than replace them
+clip = None     # clip area (crhClip.clip) way-points are restricted to (None: not used)
+statsFile = None    # append serialised statistics of each file processed
+progress = 0    # seconds between batch mode progress reports (0: none)
+progressFile = None # append batch mode progress records to this file
+prefetch = 0    # batch mode files read ahead & output blocks queued for writing (0: sequential)
+rollup = 0      # ngr precision of rollup squares (eg: 4 for 1km squares, 0: no rollup)
+rollupFile = None   # write (combined) rollup table to this file
+segments = False    # process each track segment & route separately
+workers = 1     # segment mode worker processes (0: one per cpu core)
+cacheDir = None     # result cache directory (None: no cache)
+cacheSize = 100     # result cache size limit (MB)
+compress = ''   # compression extension of auto-named output files ('': not compressed)
 precision = crhGPX.gpx.precision   # precision of ngr (6, 8 or 10 digits)
 # exceeding the following values generates warning/informational messages
 # overwrite initial values set in crhGPX (used instantiating a gpx object)...
-crhGPX.maxDeltaL = 400.0  # default: 400.0
-crhGPX.maxDeltaV = 30.0   # default: 30.0
-crhGPX.maxDeltaS = 250.0  # default: 250.0
+maxDeltaL = 400.0  # crhGPX default: 400.0
+maxDeltaV = 30.0   # crhGPX default: 30.0
+maxDeltaS = 250.0  # crhGPX default: 250.0
+gpxLock = threading.Lock()  # serialise use of crhGPX module configuration
+pointsLabel = 'GPX way-points processed'    # route statistics line counting the way-points
+resultTag = '\x00gpxRdngs:'    # marks the cached way-point count following the output sections
+fileResult = namedtuple('fileResult', 'points stats')   # processFile() result (stats None if not kept)
+
+## define classes
+class options(object):
+    '''
+    gpx processing options, initially the module defaults above
+    keyword arguments override the defaults (eg: options(bsv = True, precision = 10))
+    '''
+    def __init__(self, **kwargs):
+        for name in ('compact', 'quiet', 'verbose', 'stats', 'xml1', 'xml2', 'route', 'bsv', 'auto',
+                'all', 'delta', 'time', 'tolerT', 'tolerL', 'tolerV', 'chunkSize', 'follow',
+                'followInterval', 'followPoll', 'merge', 'scan', 'dem', 'demCheck', 'clip', 'statsFile', 'progress',
+                'progressFile', 'prefetch', 'rollup', 'rollupFile', 'segments', 'workers', 'compress', 'precision',
+                'maxDeltaL', 'maxDeltaV', 'maxDeltaS'):
+            setattr(self, name, globals()[name])
+        for name, value in kwargs.items():
+            if not hasattr(self, name):
+                raise TypeError('unknown gpxRdngs option: {}'.format(name))
+            setattr(self, name, value)
+
+class output(object):
+    '''
+    output destination: stream (default stdout) and/or file, the file opened on first write
+    '''
+    def __init__(self, outputFile = None, stream = None, verbose = False, quiet = False):
+        self.outputFile = outputFile
+        self.outputH = None
+        self.stream = stdout if stream is None else stream
+        self.verbose = verbose
+        self.quiet = quiet
+
+    def openOutFile(self):
+        '''
+        open output file for write (ie: overwrite) access,
+        if not already open
+        '''
+        if self.outputH is None:   # not open
+            self.outputH = crhCompress.openOutput(self.outputFile, 'w')
+            if self.outputH is None:
+                raise IOError('error opening output file {}'.format(self.outputFile))
+            statusErrMsg('info', 'openOutFile()', 'output file opened: {}'.format(self.outputFile), self.quiet)
+
+    def closeOutFile(self):
+        '''
+        close output file, if open
+        '''
+        if self.outputH is not None:
+            self.outputH.close()
+            self.outputH = None
+
+    def printStrIO(self, sio):
+        '''
+        write contents of sio to stream and/or file
+        '''
+        self.writeStr(sio.getvalue())
+        self.endStr()
+        sio.close()
+
+    def writeStr(self, text):
+        '''
+        write text to stream and/or file, as printStrIO() but without ending the output section
+        '''
+        if self.outputFile is None or self.verbose:
+            self.stream.write(text)
+        if self.outputFile is not None:
+            self.openOutFile()
+            self.outputH.write(text)
+
+    def endStr(self):
+        '''
+        end output section started by writeStr(), as printStrIO() does
+        '''
+        if self.outputFile is None or self.verbose:
+            self.stream.write('\n\n')
+        if self.outputFile is not None:
+            self.openOutFile()
+            self.outputH.write('\n')
+
+    def flush(self):
+        '''
+        flush stream & file (if open)
+        '''
+        if self.outputH is not None:
+            self.outputH.flush()
+        self.stream.flush()
+
+class spooledOutput(output):
+    '''
+    output whose file writes are queued to a background writer (crhPipeline.writer),
+    the stream still being written directly
+    '''
+    def __init__(self, outputFile, writer, verbose = False, quiet = False):
+        output.__init__(self, outputFile, verbose = verbose, quiet = quiet)
+        self.writer = writer
+
+    def writeStr(self, text):
+        if self.outputFile is None or self.verbose:
+            self.stream.write(text)
+        if self.outputFile is not None:
+            self.writer.write(self.outputFile, text)
+
+    def endStr(self):
+        if self.outputFile is None or self.verbose:
+            self.stream.write('\n\n')
+        if self.outputFile is not None:
+            self.writer.write(self.outputFile, '\n')
+
+    def closeOutFile(self):
+        if self.outputFile is not None:
+            self.writer.end(self.outputFile)
+
+    def flush(self):
+        self.stream.flush()
 
 ## define functions
 def setParser():
@@ -115,7 +330,8 @@ def setParser():
     parse.add_argument('-t', '--time', action="store_true", dest="timemode",
         help="ignore gpx time data")
     parse.add_argument('-p', '--precision', action="store", dest="precisionmode",
-        help="set national grid reference precision", choices=['l','m','h'], default='m')
+        help="set national grid reference precision: l, m or h (eg: l,m,h for a field per precision)",
+        default='m')
     parse.add_argument('-q', '--quiet', action="store_true", dest="quietmode",
         help="suppress some program messages")
     parse.add_argument('-v', '--verbose', action="store_true", dest="verbosemode",
@@ -131,278 +347,870 @@ def setParser():
         default = tolerV, type = int)
     parse.add_argument('-Z', '--zerotoler', action="store_true", dest="zerotoler",
         help="set all tolerances to zero initially")
+    parse.add_argument('-C', '--chunk-size', action="store", dest="chunksize",
+        help="process way-points in windows of given size (bounded memory)",
+        default = chunkSize, type = int)
+    parse.add_argument('-F', '--follow', action="store_true", dest="followmode",
+        help="follow growing gpx file, processing appended way-points (ctrl-c to stop)")
+    parse.add_argument('-I', '--interval', action="store", dest="interval",
+        help="seconds between route statistics updates in follow mode",
+        default = followInterval, type = int)
+    parse.add_argument('-S', '--statsfile', action="store", dest="statsfile",
+        help="append serialised route statistics of each file to given file")
+    parse.add_argument('-m', '--merge', action="store_true", dest="mergemode",
+        help="combine serialised route statistics held in input file")
+    parse.add_argument('--scan', action="store_true", dest="scanmode",
+        help="output one line summary of each gpx file (quick-look, no full processing)")
+    parse.add_argument('--dem', action="store", dest="demfile",
+        help="replace gpx elevations with values from elevation grid file (.grd or ESRI ASCII .asc)")
+    parse.add_argument('--dem-check', action="store_true", dest="demcheck",
+        help="compare gpx elevations with the elevation grid (--dem) rather than replace them")
+    clipArea = parse.add_mutually_exclusive_group()
+    clipArea.add_argument('--clip-ngr', action="store", dest="clipngr",
+        help="only process way-points inside given national grid square (eg: SK27 or SK2070)")
+    clipArea.add_argument('--clip-bbox', action="store", dest="clipbbox",
+        help="only process way-points inside given lat/lon box (min lat,min lon,max lat,max lon)")
+    parse.add_argument('--progress', action="store", dest="progress",
+        help="report batch mode (-A) progress every given number of seconds", type = float, default = progress)
+    parse.add_argument('--progress-file', action="store", dest="progressfile",
+        help="append batch mode (-A) progress records to given file (eg: for a job scheduler)")
+    parse.add_argument('--prefetch', action="store", dest="prefetch",
+        help="batch mode (-A): read given number of files ahead & write output in background (0: sequential)",
+        type = int, default = prefetch)
+    parse.add_argument('--rollup', action="store", dest="rollup", type = int, choices = crhRollup.rollupDigits,
+        help="output dwell time, distance & visits per ngr square of given precision (eg: 4 for 1km squares)")
+    parse.add_argument('--rollup-file', action="store", dest="rollupfile",
+        help="write rollup table (combined over all files with -A) to given file")
+    parse.add_argument('--segments', action="store_true", dest="segmentmode",
+        help="process each track segment & route separately, then summarise the document")
+    parse.add_argument('--workers', action="store", dest="workers", type = int, default = workers,
+        help="worker processes used in segment mode (0: one per cpu core)")
+    parse.add_argument('-K', '--cache', action="store", dest="cachedir",
+        help="serve repeated requests from result cache in given directory")
+    parse.add_argument('--cache-size', action="store", dest="cachesize",
+        help="result cache size limit (MB), least recently used results evicted",
+        default = cacheSize, type = int)
+    parse.add_argument('-z', '--compress', action="store", dest="compressmode",
+        help="compress auto-named (-a & -A) output files", choices=['gz','bz2','xz','zip'])
     return parse
 
-def openOutFile(outputF = None):
+
+def recordStats(trkStats, opts, batchStats = None):
     '''
-    open output file for write (ie: overwrite) access,
-    if not already open
+    append serialised statistics to opts.statsFile (if set)
+    return batchStats combined with trkStats
     '''
-    global outputH
-    if outputF is None:
-        outputF = outputFile
-    if outputH is None:   # not open
-        outputH = openFile(outputF, 'w')
-        if outputH is None:
-            statusErrMsg('fatal', 'openOutFile()', 'error opening output file {}'.format(outputF))
-            exit(1)
-        else:
-            statusErrMsg('info', 'openOutFile()', 'output file opened: {}'.format(outputF), quiet)
+    if opts.statsFile is not None:
+        with open(opts.statsFile, 'a') as f:
+            f.write(trkStats.dumps() + '\n')
+    return batchStats.merge(trkStats) if batchStats else trkStats
 
-def closeOutFile():
+def writeRollup(rollupTotal, opts):
     '''
-    close output file, if open
+    write (combined) rollup table to opts.rollupFile (compressed as its extension says), or stdout
+    raises IOError if the file cannot be written
     '''
-    global outputH
-    if outputH is not None:
-        outputH.close()
-        outputH = None
+    text = rollupTotal.genTable().getvalue()
+    if opts.rollupFile is None:
+        msg(text)
+        return
+    f = crhCompress.openOutput(opts.rollupFile)
+    if f is None:
+        raise IOError('error opening rollup file {}'.format(opts.rollupFile))
+    try:
+        f.write(text)
+    finally:
+        f.close()
+    errMsg('rollup table written: {} ({} squares)'.format(opts.rollupFile, len(rollupTotal.cells)), opts.quiet)
 
-def printStrIO(sio):
+def mergeStatsfile(inputFile, opts, out):
     '''
-    write contents of sio to stdout and/or file
+    combine the serialised statistics (one per line) held in input file
+    returns the combined statistics (None if none found or they cannot be combined)
     '''
-    global outputH
-    if outputFile is None:
-        print sio.getvalue()
-        msg('')
+    try:
+        total = crhTrack.mergeStats(crhTrack.stats.loads(line) for line in crhCompress.lineGen(inputFile)
+            if line.strip())
+    except ValueError as e:  # unreadable, or differing configuration
+        statusErrMsg('error', 'main', 'unable to combine statistics in file: {} ({})'.format(inputFile, e))
+        total = None
     else:
-        if verbose:
-            print sio.getvalue()
-            msg('')
-            openOutFile()
-            outputH.write(sio.getvalue())
+        if total is None:
+            statusErrMsg('warn', 'main', 'no statistics in file: {}'.format(inputFile))
         else:
-            openOutFile()
-            outputH.write(sio.getvalue())
-        outputH.write('\n')
-    sio.close()
-
-def processInputfile(inputFile):
-    '''
-    process gpx input file
-    '''
-    gpxData = crhGPX.gpx(inputFile, time, delta, tolerT = tolerT, tolerV = tolerV, tolerL = tolerL, precision = precision)
-    if gpxData.validData():
-        if xml1:
-            printStrIO(gpxData.genXML(not compact, bsv = True, track = not route))
-        if xml2:
-            printStrIO(gpxData.genXML(not compact, bsv = False))
-        if bsv:
-            printStrIO(gpxData.genBSV())
-        if stats or ((not xml1) and (not xml2) and (not bsv)):  # always do something!
-            printStrIO(gpxData.genStats())
-        closeOutFile()
+            out.printStrIO(total.genStats())
+    out.closeOutFile()
+    return total
+
+def statsKept(opts):
+    '''
+    return True if route statistics objects are needed (statistics file or batch mode combined statistics)
+    '''
+    return opts.statsFile is not None or (opts.all and opts.stats)
+
+def trackArgs(opts):
+    '''
+    return dict of crhTrack.track keyword arguments set from options
+    '''
+    return dict(time = opts.time, delta = opts.delta, tolerT = opts.tolerT, tolerV = opts.tolerV,
+        tolerL = opts.tolerL, precision = opts.precision, quiet = opts.quiet, verbose = opts.verbose,
+        maxDeltaL = opts.maxDeltaL, maxDeltaV = opts.maxDeltaV, maxDeltaS = opts.maxDeltaS,
+        dem = opts.dem, demCheck = opts.demCheck, clip = opts.clip)
+
+def newTrack(opts):
+    '''
+    return crhTrack.track object set up from options
+    '''
+    return crhTrack.track(**trackArgs(opts))
+
+def gpxClass(opts):
+    '''
+    return crhGPX.gpx subclass with quiet & verbose class values set from options,
+    leaving crhGPX.gpx itself unchanged
+    '''
+    return type('gpx', (crhGPX.gpx,), {'quiet': opts.quiet, 'verbose': opts.verbose})
+
+def statsPoints(text):
+    '''
+    return count of way-points processed given in route statistics text (0 if not found)
+    '''
+    for line in text.splitlines():
+        label, sep, value = line.partition(':')
+        if label.strip() == pointsLabel:
+            try:
+                return int(value)
+            except ValueError:
+                break
+    return 0
+
+def genSections(inputFile, opts):
+    '''
+    process gpx input file, return (list of output section strings, count of way-points processed,
+    route statistics), the statistics being None if the data is processed by crhGPX, None if invalid data
+    '''
+    if opts.segments:
+        return segmentSections(inputFile, opts)
+    if crhCompress.compressed(inputFile) or crhTrack.multiPrecision(opts.precision) or opts.dem is not None \
+            or opts.clip is not None or opts.rollup or statsKept(opts):
+        return trackSections(inputFile, opts)
+    with gpxLock:   # crhGPX maxDelta values are module variables, used until output generated
+        crhGPX.maxDeltaL = opts.maxDeltaL
+        crhGPX.maxDeltaV = opts.maxDeltaV
+        crhGPX.maxDeltaS = opts.maxDeltaS
+        return _genSections(gpxClass(opts)(inputFile, opts.time, opts.delta, tolerT = opts.tolerT,
+            tolerV = opts.tolerV, tolerL = opts.tolerL, precision = opts.precision), opts)
+
+def _genSections(gpxData, opts):
+    '''
+    return (list of output section strings, count of way-points processed, None) generated from gpx object,
+    None if invalid data
+    '''
+    if not gpxData.validData():
+        return None
+    sections = list()
+    if opts.xml1:
+        sections.append(gpxData.genXML(not opts.compact, bsv = True, track = not opts.route))
+    if opts.xml2:
+        sections.append(gpxData.genXML(not opts.compact, bsv = False))
+    if opts.bsv:
+        sections.append(gpxData.genBSV())
+    statsText = gpxData.genStats()  # after the bsv records, which it counts
+    points = statsPoints(statsText.getvalue())
+    if opts.stats or ((not opts.xml1) and (not opts.xml2) and (not opts.bsv)):  # always do something!
+        sections.append(statsText)
     else:
-        statusErrMsg('warn', 'main', 'unable to process gpx file: {}'.format(inputFile))
+        statsText.close()
+    texts = list()
+    for sio in sections:
+        texts.append(sio.getvalue())
+        sio.close()
+    return texts, points, None
+
+def sectionDefs(trk, opts):
+    '''
+    return list of (head, rows, tail) functions generating the xml & bsv output sections of track trk
+    rows(points, records) takes retained way-points & their bsv (point, deltaL, deltaV) records
+    '''
+    pretty = not opts.compact
+    sections = list()
+    if opts.xml1:
+        sections.append((lambda: trk.xmlHead(pretty, not opts.route),
+            lambda pts, recs: trk.xmlRows([rec[0] for rec in recs], pretty, not opts.route),
+            lambda: trk.xmlTail(pretty, not opts.route)))
+    if opts.xml2:
+        sections.append((lambda: trk.xmlHead(pretty),
+            lambda pts, recs: trk.xmlRows(pts, pretty),
+            lambda: trk.xmlTail(pretty)))
+    if opts.bsv:
+        sections.append((trk.bsvHead, lambda pts, recs: trk.bsvRows(recs), lambda: ''))
+    return sections
+
+def trackSections(inputFile, opts):
+    '''
+    process gpx input file with crhTrack (eg: compressed input, multiple ngr precisions or rollup),
+    return (list of output section strings, way-points processed, route statistics) as genSections(),
+    None if no way-points
+    '''
+    trk = newTrack(opts)
+    with crhCompress.openInput(inputFile) as f:
+        points = list(trk.pointGen(f))
+    if not points:
+        return None
+    records = trk.bsvFilter(points) if (opts.xml1 or opts.bsv) else None
+    texts = [head() + rows(points, records) + tail() for head, rows, tail in sectionDefs(trk, opts)]
+    if opts.rollup:
+        squares = crhRollup.rollup(opts.rollup)
+        squares.add(points)
+        texts.append(squares.genTable().getvalue())
+    if opts.stats or not texts:  # always do something!
+        texts.append(trk.genStats().getvalue())
+    return texts, trk.stats.processed, trk.stats
+
+def segmentSections(inputFile, opts):
+    '''
+    process each track segment & route of gpx input file separately (in opts.workers processes),
+    return (list of output section strings, way-points processed, route statistics): the sections being
+    each segment's heading, bsv records & statistics, then the document summary (& rollup table),
+    the statistics the segments' combined, None if no segments
+    '''
+    split = crhSegment.splitter()
+    texts = list()
+    total = squares = None
+    with crhCompress.openInput(inputFile) as f:
+        for res in crhSegment.resultGen(split.segmentGen(f), trackArgs(opts), opts.bsv, opts.rollup,
+                opts.workers):
+            text = 'Segment {}: {}\n'.format(res.segment.index, crhSegment.label(res.segment))
+            if res.bsv is not None:
+                text += res.bsv
+            if opts.stats or res.bsv is None:
+                text += res.stats.genStats().getvalue()
+            texts.append(text)
+            total = res.stats if total is None else total.merge(res.stats)
+            if res.squares is not None:
+                squares = res.squares if squares is None else squares.merge(res.squares)
+    if total is None:
+        return None
+    if split.name is not None:  # else the first segment's (merge), as crhGPX
+        total.name = split.name
+    if split.desc is not None:
+        total.desc = split.desc
+    if split.waypoints and opts.verbose:
+        errMsg(singural(split.waypoints, ' way-point', ' way-points', '\n', ' outside tracks & routes ignored'),
+            opts.quiet)
+    texts.append('Document summary          : {} segments ({} trk, {} rte)\n'.format(split.segments,
+        split.tracks, split.routes) + total.genStats().getvalue())
+    if squares is not None:
+        texts.append(squares.genTable().getvalue())
+    return texts, total.processed, total
+
+def processInputfile(inputFile, opts, out, resultCache = None, rollupTotal = None):
+    '''
+    process gpx input file, serving the output from the result cache when possible
+    the file's rollup table (if any) is added to rollupTotal (crhRollup.rollup, if given)
+    returns fileResult (None if the gpx data could not be processed)
+    '''
+    sections = key = trkStats = None
+    points = 0
+    if resultCache is not None:
+        key = resultCache.key(inputFile, tolerT = opts.tolerT, tolerL = opts.tolerL, tolerV = opts.tolerV,
+            precision = opts.precision, time = opts.time, delta = opts.delta, compact = opts.compact,
+            maxDeltaL = opts.maxDeltaL, maxDeltaV = opts.maxDeltaV, maxDeltaS = opts.maxDeltaS,
+            route = opts.route, xml1 = opts.xml1, xml2 = opts.xml2, bsv = opts.bsv, stats = opts.stats,
+            dem = None if opts.dem is None else (opts.dem.fileName, os.path.getmtime(opts.dem.fileName)),
+            demCheck = opts.demCheck, clip = None if opts.clip is None else opts.clip.spec, rollup = opts.rollup,
+            segments = opts.segments, statsKept = statsKept(opts))
+        sections = resultCache.get(key)
+        if sections is not None:
+            if sections and sections[-1].startswith(resultTag):
+                points, sep, trkStats = sections.pop()[len(resultTag):].partition('|')
+                points = int(points)
+                trkStats = crhTrack.stats.loads(trkStats) if trkStats else None
+            if opts.verbose:
+                errMsg('output served from cache: {}'.format(inputFile), opts.quiet)
+    if sections is None:
+        res = genSections(inputFile, opts)
+        if res is None:
+            statusErrMsg('warn', 'main', 'unable to process gpx file: {}'.format(inputFile))
+            return None
+        sections, points, trkStats = res
+        if key is not None:
+            resultCache.put(key, sections + ['{}{}|{}'.format(resultTag, points,
+                '' if trkStats is None else trkStats.dumps())])
+    for text in sections:
+        out.printStrIO(StringIO(text))
+        if rollupTotal is not None and crhRollup.isTable(text):
+            rollupTotal.merge(crhRollup.loads(text))
+    out.closeOutFile()
+    return fileResult(points, trkStats)
+
+def processChunkedfile(inputFile, opts, out, rollupTotal = None):
+    '''
+    process gpx input file in windows of opts.chunkSize retained way-points
+    output sections after the first are spooled to temporary files,
+    so the output is identical to that of processInputfile()
+    the file's rollup (if any) is added to rollupTotal (crhRollup.rollup, if given)
+    returns the route statistics (None if the gpx data could not be processed)
+    '''
+    trk = newTrack(opts)
+    squares = crhRollup.rollup(opts.rollup) if opts.rollup else None
+    sections = sectionDefs(trk, opts)
+    spools = list()
+    try:
+        spools.extend([tempfile.TemporaryFile() for section in sections[1:]])
+        sinks = [out.writeStr] + [spool.write for spool in spools]
+        windowCount = 0
+        with crhCompress.openInput(inputFile) as f:
+            for window in trk.windowGen(f, opts.chunkSize):
+                records = trk.bsvFilter(window) if (opts.xml1 or opts.bsv) else None
+                if squares is not None:
+                    squares.add(window)
+                for (head, rows, tail), sink in zip(sections, sinks):
+                    if not windowCount:
+                        sink(head())
+                    sink(rows(window, records))
+                windowCount += 1
+        if not windowCount:
+            statusErrMsg('warn', 'main', 'unable to process gpx file: {}'.format(inputFile))
+            return None
+        if opts.verbose:
+            errMsg('{} way-point windows processed'.format(windowCount), opts.quiet)
+        for (head, rows, tail), sink in zip(sections, sinks):
+            sink(tail())
+        if sections:
+            out.endStr()
+        for spool in spools:
+            spool.seek(0)
+            for data in iter(lambda: spool.read(crhTrack.blockSize), ''):
+                out.writeStr(data)
+            out.endStr()
+        if squares is not None:
+            out.printStrIO(squares.genTable())
+            if rollupTotal is not None:
+                rollupTotal.merge(squares)
+        if opts.stats or not (sections or squares):  # always do something!
+            out.printStrIO(trk.genStats())
+        return trk.stats
+    finally:
+        for spool in spools:
+            spool.close()
+        out.closeOutFile()
+
+def followInputfile(inputFile, opts, out):
+    '''
+    follow growing gpx input file until its closing </gpx> tag is seen (or ctrl-c),
+    only appended data is parsed, retained way-points are appended as bsv records
+    & route statistics are updated incrementally, a summary going to stderr every opts.followInterval seconds
+    returns the route statistics
+    raises IOError for a compressed gpx file (a compressed stream cannot be followed)
+    '''
+    if crhCompress.compressed(inputFile):
+        raise IOError('follow mode needs an uncompressed gpx file: {}'.format(inputFile))
+    trk = newTrack(opts)
+    if opts.bsv:
+        out.writeStr(trk.bsvHead())
+    nextStats = clock() + opts.followInterval
+    try:
+        with open(inputFile, 'rb') as f:
+            while not trk.reader.complete:
+                data = f.read(crhTrack.blockSize)
+                if data:
+                    points = trk.feed(data)
+                    if opts.bsv and points:
+                        out.writeStr(trk.bsvRows(trk.bsvFilter(points)))
+                        out.flush()
+                    if len(data) == crhTrack.blockSize:
+                        continue    # more data probably waiting
+                if clock() >= nextStats:
+                    errTMsg('route statistics update...', opts.quiet)
+                    errMsg(trk.genStats().getvalue(), opts.quiet)
+                    nextStats = clock() + opts.followInterval
+                sleep(opts.followPoll)
+    except KeyboardInterrupt:
+        statusErrMsg('info', 'followInputfile()', 'follow mode interrupted', opts.quiet)
+    if opts.bsv:
+        out.endStr()
+    if opts.stats or not opts.bsv:
+        out.printStrIO(trk.genStats())
+    out.closeOutFile()
+    return trk.stats
+
+def scanFiles(inputFiles, opts, out):
+    '''
+    write bsv summary record (see crhScan) of each gpx file in inputFiles to out
+    returns count of files scanned
+    '''
+    fileCount = 0
+    out.writeStr(crhScan.scanHeader + '\n')
+    for inputFile in inputFiles:
+        try:
+            out.writeStr(crhScan.scanRow(crhScan.scanFile(inputFile)) + '\n')
+        except IOError as e:
+            statusErrMsg('error', 'scanFiles()', 'unable to scan file: {} ({})'.format(inputFile, e))
+            continue
+        fileCount += 1
+    out.endStr()
+    out.closeOutFile()
+    return fileCount
+
+def processFile(inputFile, opts, out, resultCache = None, rollupTotal = None):
+    '''
+    process a single gpx (or statistics) input file as set by opts, writing to out
+    the file's rollup (if any) is added to rollupTotal (crhRollup.rollup, if given)
+    returns fileResult of the count of way-points processed & the route statistics (stats None if
+    processed by crhGPX), None for a statistics file or if the gpx data could not be processed
+    '''
+    if opts.merge:
+        mergeStatsfile(inputFile, opts, out)
+        return None
+    if opts.follow:
+        trkStats = followInputfile(inputFile, opts, out)
+    elif opts.chunkSize:
+        trkStats = processChunkedfile(inputFile, opts, out, rollupTotal)
+    else:
+        return processInputfile(inputFile, opts, out, resultCache, rollupTotal)
+    return None if trkStats is None else fileResult(trkStats.processed, trkStats)
+
+def processBatch(fileglob, directory, opts, resultCache = None, rollupTotal = None):
+    '''
+    process all files matching fileglob (or compressed files matching it) in directory,
+    each to an output file with .txt extension (plus opts.compress), files whose output file name is
+    already used by an earlier file (eg: route.gpx.gz after route.gpx) being skipped
+    the rollups of the files (if any) are added to rollupTotal (crhRollup.rollup, if given)
+    returns (count of files processed, route statistics combined over streamed files)
+    '''
+    fileCount = 0
+    batchStats = None
+    outputFiles = set()
+    inputFiles = [osPath(filename) for filename in crhCompress.fileIter(fileglob, directory)]
+    reporter = None
+    if opts.progress or opts.progressFile is not None:
+        reporter = crhProgress.reporter('batch progress', len(inputFiles),
+            sum([crhProgress.fileSize(f) for f in inputFiles]), opts.progress or crhProgress.interval,
+            opts.progressFile, opts.quiet, bool(opts.progress))
+    fileWriter = None
+    if opts.prefetch > 0:
+        inputFiles = crhPipeline.prefetcher(inputFiles, opts.prefetch)
+        fileWriter = crhPipeline.writer(lambda fileName: crhCompress.openOutput(fileName, 'w'), opts.prefetch,
+            opts.quiet)
+    for inputFile in inputFiles:
+        res = None
+        try:
+            (inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
+            outputFile = osPath(crhCompress.autoName(inputFile, '.txt', opts.compress))
+            if inputFile == outputFile:
+                statusErrMsg("warn", "args", "input and output file names identical")
+                continue
+            if outputFile in outputFiles:
+                statusErrMsg("warn", "args", "output file already written by another input file, skipped: {}".format(
+                    inputFile))
+                continue
+            outputFiles.add(outputFile)
+            if opts.verbose:
+                if not accessFile(outputFile, 'fOK'):
+                    statusErrMsg("info", "args", "file does not exist (3): {}".format(outputFile), opts.quiet)
+                else:
+                    if not accessFile(outputFile, 'wOK'):
+                        statusErrMsg("error", "args", "file not writeable: {}".format(outputFile))
+                        continue
+                    statusErrMsg("warn", "args", "overwriting file: {}".format(outputFile), opts.quiet)
+            if not accessFile(inputFile, 'fOK'):
+                raise IOError('file does not exist (4): {}'.format(inputFile))
+            elif not accessFile(inputFile, 'rOK'):
+                statusErrMsg('error', 'args', 'file cannot be opened for read access: {}'.format(inputFile))
+                continue
+            errMsg('input file : {}'.format(inputFile), opts.quiet)
+            errMsg('output file: {}'.format(outputFile), opts.quiet)
+            if fileWriter is None:
+                out = output(outputFile, verbose = opts.verbose, quiet = opts.quiet)
+            else:
+                fileWriter.check()  # earlier write error ends the run, as when writing directly
+                out = spooledOutput(outputFile, fileWriter, verbose = opts.verbose, quiet = opts.quiet)
+            res = processFile(inputFile, opts, out, resultCache, rollupTotal)
+            if res is not None and res.stats is not None:
+                batchStats = recordStats(res.stats, opts, batchStats)
+            fileCount += 1
+        finally:    # skipped files count as done too
+            if reporter is not None:
+                reporter.fileDone(0 if res is None else res.points, crhProgress.fileSize(inputFile))
+    if fileWriter is not None:
+        fileWriter.close()
+    if reporter is not None:
+        reporter.done()
+    return fileCount, batchStats
+
+def setOptions(args):
+    '''
+    return options object set from parsed command line arguments, reporting them
+    '''
+    opts = options()
+    quiet = opts.quiet = args.quietmode
+    verbose = opts.verbose = args.verbosemode
+    opts.xml1 = args.xmlmode1
+    opts.xml2 = args.xmlmode2
+    opts.route = args.routemode
+    opts.bsv = args.bsvmode
+    opts.stats = args.statsmode
+    opts.auto = args.automode
+    opts.all = args.allmode
+    opts.compact = args.compactmode
+    opts.delta = args.deltamode
+    opts.time = not args.timemode
+    opts.tolerT = args.ttmode
+    opts.tolerL = args.ltmode
+    opts.tolerV = args.htmode
+    opts.chunkSize = args.chunksize
+    opts.follow = args.followmode
+    opts.followInterval = args.interval
+    opts.merge = args.mergemode
+    opts.scan = args.scanmode
+    opts.demCheck = args.demcheck
+    if args.statsfile:
+        opts.statsFile = osPath(args.statsfile)
+    opts.progress = args.progress
+    opts.prefetch = args.prefetch
+    opts.rollup = args.rollup or 0
+    opts.segments = args.segmentmode
+    opts.workers = args.workers
+    if args.rollupfile:
+        opts.rollupFile = osPath(args.rollupfile)
+    if args.progressfile:
+        opts.progressFile = osPath(args.progressfile)
+    if args.compressmode:
+        opts.compress = '.' + args.compressmode
+    compact = opts.compact
 
-## main program
-setProgName(progName)
-errTMsg('{} -- process gpx data file'.format(getProgName()), quiet)
-
-## process arguments
-parser = setParser()
-args = parser.parse_args()
-quiet = args.quietmode
-
-if quiet:
-    crhGPX.gpx.quiet = True
-verbose = args.verbosemode
-xml1 = args.xmlmode1
-xml2 = args.xmlmode2
-route = args.routemode
-bsv = args.bsvmode
-stats = args.statsmode
-auto = args.automode
-all = args.allmode
-compact = args.compactmode
-delta = args.deltamode
-time = not args.timemode
-tolerT = args.ttmode
-tolerL = args.ltmode
-tolerV = args.htmode
-tolerZ = args.zerotoler
-
-if verbose:
-    errMsg('verbose mode set', quiet)
-    crhGPX.gpx.verbose = True
-if xml1: 
-    errMsg('xml mode set (bsv records)', quiet)
     if verbose:
-        if compact:
-            errMsg('output compact xml markup for bsv records', quiet)
-        else:
-            errMsg('output pretty xml markup for bsv records', quiet)
-    if route:
-        errMsg('xml route mode set (bsv records)', quiet)
+        errMsg('verbose mode set', quiet)
+    if opts.xml1:
+        errMsg('xml mode set (bsv records)', quiet)
         if verbose:
             if compact:
-                errMsg('output compact route gpx xml markup', quiet)
+                errMsg('output compact xml markup for bsv records', quiet)
             else:
-                errMsg('output pretty route gpx xml markup', quiet)
-    else:
+                errMsg('output pretty xml markup for bsv records', quiet)
+        if opts.route:
+            errMsg('xml route mode set (bsv records)', quiet)
+            if verbose:
+                if compact:
+                    errMsg('output compact route gpx xml markup', quiet)
+                else:
+                    errMsg('output pretty route gpx xml markup', quiet)
+        else:
+            if verbose:
+                if compact:
+                    errMsg('output compact track gpx xml markup', quiet)
+                else:
+                    errMsg('output pretty track gpx xml markup', quiet)
+    elif opts.xml2:
+        errMsg('xml mode set (gpx file)', quiet)
         if verbose:
             if compact:
-                errMsg('output compact track gpx xml markup', quiet)
+                errMsg('output compact xml markup for gpx file', quiet)
             else:
-                errMsg('output pretty track gpx xml markup', quiet)
-elif xml2:
-    errMsg('xml mode set (gpx file)', quiet)
-    if verbose:
-        if compact:
-            errMsg('output compact xml markup for gpx file', quiet)
-        else:
-            errMsg('output pretty xml markup for gpx file', quiet)
-    if route:
-        if compact:
+                errMsg('output pretty xml markup for gpx file', quiet)
+        if opts.route:
             errMsg('xml route mode ignored (gpx file)', quiet)
-        else:
-            errMsg('xml route mode ignored (gpx file)', quiet)
-        if verbose:
-            errMsg('output will be as used in gpx file', quiet)
-if stats:
-    errMsg('statistics mode set', quiet)
-    if verbose: errMsg('output route statistics', quiet)
-if bsv:
-    errMsg('bsv mode set', quiet)
-    if verbose: errMsg('output bsv records', quiet)
-if delta and bsv:
-    errMsg('delta values mode set', quiet)
-    if verbose: errMsg('output delta fields in bsv records', quiet)
-elif delta:
-    statusErrMsg('warn', 'args', 'delta switch ignored (no bsv switch specified)', quiet)
-    delta = False
-    if verbose: errMsg('delta mode only applies if bsv records generated', quiet)
-if not time:
-    errMsg('ignore time mode set', quiet)
-    if verbose: errMsg('do not process gpx time data', quiet)
-if tolerT:
-    errMsg('gpx way-point time delta tolerance: {} sec'.format(tolerT), quiet)
-    if verbose: errMsg('way-point time delta mode discards closer adjacent readings', quiet)
-else:
-    errMsg('way-point time delta tolerance disabled', quiet)
-    if verbose: errMsg('do not discard gpx way-point readings', quiet)
-if tolerZ:
-    tolerL = 0
-    tolerT = 0
-    tolerV = 0
-    statusErrMsg('info', 'args', 'all tolerance values set to 0 (disabled)', quiet)
-    if verbose: errMsg('can be overruled by setting individual tolerance values', quiet)
-if tolerL and delta and bsv:
-    tolerL = 0
-    statusErrMsg('warn', 'args', 'delta values mode active: BSV length delta mode disabled', quiet)
-    if verbose: errMsg('bsv length delta mode incompatible with delta values mode', quiet)
-elif tolerL and bsv:
-    errMsg('bsv length delta tolerance: {}m'.format(tolerL), quiet)
-    if verbose: errMsg('bsv length delta mode discards duplicate bsv records', quiet)
-elif tolerL:    # ineffective: bsv mode not set
-    pass
-elif bsv:
-    errMsg('bsv length delta tolerance disabled'.format(tolerL))
-    if verbose: errMsg('do not discard bsv readings', quiet)
-if tolerV:
-    errMsg('bsv cumulative height gain/loss tolerance: {}m'.format(tolerV), quiet)
-    if verbose: errMsg('bsv cumulative height gain/loss mode ignores smaller values', quiet)
-else:
-    errMsg('cumulative height gain/loss tolerance disabled')
-    if verbose: errMsg('do not igore any bsv cumulative height gain/loss values', quiet)
-if args.precisionmode == 'l':
-    precision = 6
-    errMsg('low precision set', quiet)
-    if verbose: errMsg('national grid reference precision is 100m', quiet)
-elif args.precisionmode == 'h':
-    precision = 10
-    errMsg('high precision set', quiet)
-    if verbose: errMsg('national grid reference precision is 1m', quiet)
-else:
-    errMsg('medium precision set (default)', quiet)
-    if verbose: errMsg('national grid reference precision is 10m', quiet)
-
-inputFile = osPath(args.infile)
-(inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
-if inExt == '': # assume .gpx file, make it so
-    statusErrMsg('info', 'args', 'assume input file {} has .gpx extension'.format(inName), quiet)
-    inExt= '.gpx'
-inputFile = osPath(inDrive + inPath + '/' + inName + inExt)
-if all:
-    fileglob = inName + inExt
-    errMsg('all mode (process all {} files) triggered'.format(fileglob), quiet)
-    if verbose: errMsg('process all {} files in {}'.format(fileglob, inDrive + inPath), quiet)
-    # note that output file derived from input param so may vary in case from input file name
-else:   # test inputFile
-    if not accessFile(inputFile, 'fOK'):
-        statusErrMsg("fatal", "args", "file does not exist (1): {}".format(inputFile))
-        exit(1)
-    elif not accessFile(inputFile, 'rOK'):
-        statusErrMsg('fatal', 'args', 'file cannot be opened for read access: {}'.format(bsvFile))
+            if verbose:
+                errMsg('output will be as used in gpx file', quiet)
+    if opts.stats:
+        errMsg('statistics mode set', quiet)
+        if verbose: errMsg('output route statistics', quiet)
+    if opts.bsv:
+        errMsg('bsv mode set', quiet)
+        if verbose: errMsg('output bsv records', quiet)
+    if opts.delta and opts.bsv:
+        errMsg('delta values mode set', quiet)
+        if verbose: errMsg('output delta fields in bsv records', quiet)
+    elif opts.delta:
+        statusErrMsg('warn', 'args', 'delta switch ignored (no bsv switch specified)', quiet)
+        opts.delta = False
+        if verbose: errMsg('delta mode only applies if bsv records generated', quiet)
+    if not opts.time:
+        errMsg('ignore time mode set', quiet)
+        if verbose: errMsg('do not process gpx time data', quiet)
+    if opts.tolerT:
+        errMsg('gpx way-point time delta tolerance: {} sec'.format(opts.tolerT), quiet)
+        if verbose: errMsg('way-point time delta mode discards closer adjacent readings', quiet)
+    else:
+        errMsg('way-point time delta tolerance disabled', quiet)
+        if verbose: errMsg('do not discard gpx way-point readings', quiet)
+    if args.zerotoler:
+        opts.tolerL = 0
+        opts.tolerT = 0
+        opts.tolerV = 0
+        statusErrMsg('info', 'args', 'all tolerance values set to 0 (disabled)', quiet)
+        if verbose: errMsg('can be overruled by setting individual tolerance values', quiet)
+    if opts.tolerL and opts.delta and opts.bsv:
+        opts.tolerL = 0
+        statusErrMsg('warn', 'args', 'delta values mode active: BSV length delta mode disabled', quiet)
+        if verbose: errMsg('bsv length delta mode incompatible with delta values mode', quiet)
+    elif opts.tolerL and opts.bsv:
+        errMsg('bsv length delta tolerance: {}m'.format(opts.tolerL), quiet)
+        if verbose: errMsg('bsv length delta mode discards duplicate bsv records', quiet)
+    elif opts.tolerL:    # ineffective: bsv mode not set
+        pass
+    elif opts.bsv:
+        errMsg('bsv length delta tolerance disabled')
+        if verbose: errMsg('do not discard bsv readings', quiet)
+    if opts.tolerV:
+        errMsg('bsv cumulative height gain/loss tolerance: {}m'.format(opts.tolerV), quiet)
+        if verbose: errMsg('bsv cumulative height gain/loss mode ignores smaller values', quiet)
+    else:
+        errMsg('cumulative height gain/loss tolerance disabled')
+        if verbose: errMsg('do not igore any bsv cumulative height gain/loss values', quiet)
+    try:
+        precisions = crhMapFast.ngrPrecisions(args.precisionmode)
+    except ValueError as e:
+        statusErrMsg('fatal', 'args', str(e))
         exit(1)
-    errMsg('input file: {}'.format(inputFile), quiet)
-if auto:
-    errMsg('auto mode (output file name) triggered', quiet)
-    if verbose: errMsg('output file derived from input file name', quiet)
-    # note that output file derived from input param so may vary in case from input file name
-    (outDrive, outPath, outName, outExt) = splitFileCmpnt(inputFile)
-    outputFile = osPath(outDrive + outPath + '/' + outName + '.txt')
-elif args.absoutfile:
-    outputFile = osPath(args.absoutfile)
-    (outDrive, outPath, outName, outExt) = splitFileCmpnt(outputFile)
-    if outPath[-1] == '/' or outPath[-1] == '\\':
-        outputFile = osPath(outDrive + outPath + outName + outExt)
+    if len(precisions) > 1:
+        opts.precision = precisions
+        errMsg('multiple precisions set: {} digits'.format(crhTrack.precisionText(precisions)), quiet)
+        if verbose: errMsg('national grid reference field output for each precision', quiet)
+    elif precisions == (6,):
+        opts.precision = 6
+        errMsg('low precision set', quiet)
+        if verbose: errMsg('national grid reference precision is 100m', quiet)
+    elif precisions == (10,):
+        opts.precision = 10
+        errMsg('high precision set', quiet)
+        if verbose: errMsg('national grid reference precision is 1m', quiet)
     else:
-        outputFile = osPath(outDrive + outPath + '/' + outName + outExt)
-    
-elif args.outfile:
-    outputFile = osPath(args.outfile)
-    (outDrive, outPath, outName, outExt) = splitFileCmpnt(outputFile)
-    (inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
-    outputFile = osPath(inDrive + inPath + '/' + outName + outExt)
-if auto or args.outfile or args.absoutfile:
-    errMsg('output file: {}'.format(outputFile), quiet)
-    if inputFile == outputFile:
-        statusErrMsg("fatal", "args", "input and output file names identical")
+        errMsg('medium precision set (default)', quiet)
+        if verbose: errMsg('national grid reference precision is 10m', quiet)
+    if opts.chunkSize < 0:
+        statusErrMsg('fatal', 'args', 'chunk size must not be negative: {}'.format(opts.chunkSize))
         exit(1)
-    if verbose:
-        if not accessFile(outputFile, 'fOK'):
-            statusErrMsg("info", "args", "file does not exist (2): {}".format(outputFile), quiet)
+    elif opts.chunkSize:
+        errMsg('chunk mode set: {} way-points per window'.format(opts.chunkSize), quiet)
+        if verbose: errMsg('memory use bounded by window size, not file length', quiet)
+    if opts.workers < 0:
+        statusErrMsg('fatal', 'args', 'worker count must not be negative: {}'.format(opts.workers))
+        exit(1)
+    if opts.segments:
+        errMsg('segment mode set: {} workers'.format(opts.workers or 'cpu count'), quiet)
+        if verbose: errMsg('each track segment & route processed separately, then summarised', quiet)
+        if opts.xml1 or opts.xml2:
+            opts.xml1 = opts.xml2 = False
+            statusErrMsg('warn', 'args', 'xml switches ignored (segment mode)', quiet)
+        if opts.chunkSize:
+            opts.chunkSize = 0
+            statusErrMsg('warn', 'args', 'chunk size ignored (segment mode)', quiet)
+    elif opts.workers != workers:
+        statusErrMsg('warn', 'args', 'workers switch ignored (segment mode only)', quiet)
+    if opts.merge:
+        errMsg('merge mode set', quiet)
+        if verbose: errMsg('combine serialised statistics held in input file', quiet)
+        if opts.follow or opts.chunkSize:
+            opts.follow = False
+            opts.chunkSize = 0
+            statusErrMsg('warn', 'args', 'follow & chunk size switches ignored (merge mode)', quiet)
+    if args.demfile:
+        try:
+            opts.dem = crhGrid.elevationGrid(osPath(args.demfile))
+        except (IOError, RuntimeError) as e:
+            statusErrMsg('fatal', 'args', 'unable to use elevation grid: {}'.format(e))
+            exit(1)
+        errMsg('elevation grid: {} ({})'.format(opts.dem.fileName, 'check mode' if opts.demCheck else 'replace mode'),
+            quiet)
+        if verbose:
+            if opts.demCheck:
+                errMsg('gpx elevations compared with elevation grid values', quiet)
+            else:
+                errMsg('gpx elevations replaced by elevation grid values', quiet)
+    elif opts.demCheck:
+        opts.demCheck = False
+        statusErrMsg('warn', 'args', 'dem check switch ignored (no elevation grid specified)', quiet)
+    if args.clipngr or args.clipbbox:
+        try:
+            opts.clip = crhClip.fromNgr(args.clipngr) if args.clipngr else crhClip.fromBox(args.clipbbox)
+        except ValueError as e:
+            statusErrMsg('fatal', 'args', 'unable to use clip area: {}'.format(e))
+            exit(1)
+        errMsg('clip mode set: {}'.format(opts.clip.spec), quiet)
+        if verbose: errMsg('only way-points inside clip area processed', quiet)
+    if opts.rollup:
+        errMsg('rollup mode set: {} digit ngr squares'.format(opts.rollup), quiet)
+        if verbose: errMsg('output dwell time, distance & visits per ngr square', quiet)
+        if opts.merge or opts.follow:
+            opts.rollup = 0
+            statusErrMsg('warn', 'args', 'rollup switch ignored ({} mode)'.format('merge' if opts.merge else
+                'follow'), quiet)
+    if opts.rollupFile is not None:
+        if opts.rollup:
+            errMsg('rollup file: {}'.format(opts.rollupFile), quiet)
         else:
-            if not accessFile(outputFile, 'wOK'):
-                statusErrMsg("fatal", "args", "file not writeable: {}".format(outputFile))
-                exit(1)
-            statusErrMsg("warn", "args", "overwriting file: {}".format(outputFile), quiet)
+            opts.rollupFile = None
+            statusErrMsg('warn', 'args', 'rollup file switch ignored (no rollup)', quiet)
+    if opts.scan:
+        errMsg('scan mode set', quiet)
+        if verbose: errMsg('output one line summary of each gpx file', quiet)
+        if opts.xml1 or opts.xml2 or opts.bsv or opts.stats or opts.chunkSize or opts.follow or opts.merge \
+                or opts.rollup or opts.segments:
+            opts.xml1 = opts.xml2 = opts.bsv = opts.stats = opts.follow = opts.merge = opts.segments = False
+            opts.chunkSize = opts.rollup = 0
+            opts.rollupFile = None
+            statusErrMsg('warn', 'args', 'output & processing mode switches ignored (scan mode)', quiet)
+        if opts.all and verbose:
+            errMsg('summary records of all files output together (stdout)', quiet)
+    if opts.statsFile is not None:
+        errMsg('statistics file: {}'.format(opts.statsFile), quiet)
+        if opts.scan or opts.merge:
+            statusErrMsg('fatal', 'args', 'no statistics to write to statistics file ({} mode)'.format('scan' if
+                opts.scan else 'merge'))
+            exit(1)
+        if verbose: errMsg('whole file processing by crhTrack, for its statistics', quiet)
+    if opts.follow:
+        errMsg('follow mode set: statistics every {} sec'.format(opts.followInterval), quiet)
+        if verbose: errMsg('only way-points appended to gpx file are processed', quiet)
+        if opts.xml1 or opts.xml2:
+            opts.xml1 = opts.xml2 = False
+            statusErrMsg('warn', 'args', 'xml switches ignored (follow mode)', quiet)
+        if opts.all:
+            statusErrMsg('fatal', 'args', 'follow mode applies to a single gpx file')
+            exit(1)
+        if opts.chunkSize:
+            opts.chunkSize = 0
+            statusErrMsg('warn', 'args', 'chunk size ignored (follow mode)', quiet)
+        if opts.segments:
+            opts.segments = False
+            statusErrMsg('warn', 'args', 'segments switch ignored (follow mode)', quiet)
+    if opts.progress or opts.progressFile is not None:
+        if opts.progress:
+            errMsg('progress mode set: report every {} sec'.format(opts.progress), quiet)
+        if opts.progressFile is not None:
+            errMsg('progress file: {}'.format(opts.progressFile), quiet)
+        if not opts.all or opts.scan:
+            opts.progress = 0
+            opts.progressFile = None
+            statusErrMsg('warn', 'args', 'progress switches ignored (batch mode only)', quiet)
+    if opts.prefetch < 0:
+        statusErrMsg('fatal', 'args', 'prefetch depth must not be negative: {}'.format(opts.prefetch))
+        exit(1)
+    if opts.prefetch:
+        errMsg('prefetch mode set: {} files ahead'.format(opts.prefetch), quiet)
+        if verbose: errMsg('input files read ahead & output files written in background', quiet)
+        if not opts.all or opts.scan:
+            opts.prefetch = 0
+            statusErrMsg('warn', 'args', 'prefetch switch ignored (batch mode only)', quiet)
+    if opts.compress:
+        errMsg('compress mode set: {}'.format(opts.compress), quiet)
+        if verbose: errMsg('auto-named output files compressed', quiet)
+        if not (opts.auto or opts.all):
+            statusErrMsg('warn', 'args', 'compress switch ignored (output file not auto-named)', quiet)
+    return opts
 
-## process gpx file(s)
-if all: # process multiple files in directory
-    fileCount = 0
-    for filename in getFileIter(fileglob, inDrive + inPath,):
-        inputFile = osPath(filename)
-        (inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
-        (outDrive, outPath, outName, outExt) = (inDrive, inPath, inName, inExt)
-        outputFile = osPath(outDrive + outPath + '/' + outName + '.txt')
+def setFiles(args, opts):
+    '''
+    set & check input & output file names from parsed command line arguments
+    returns (input file, output file, input directory, input file glob)
+    '''
+    quiet = opts.quiet
+    verbose = opts.verbose
+    outputFile = None
+    inputFile = osPath(args.infile)
+    (inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
+    if inExt == '' and opts.merge:   # statistics file has no assumed extension
+        pass
+    elif inExt == '': # assume .gpx file, make it so
+        statusErrMsg('info', 'args', 'assume input file {} has .gpx extension'.format(inName), quiet)
+        inExt= '.gpx'
+    inputFile = osPath(inDrive + inPath + '/' + inName + inExt)
+    fileglob = inName + inExt
+    if opts.all:
+        errMsg('all mode (process all {} files) triggered'.format(fileglob), quiet)
+        if verbose: errMsg('process all {} files in {}'.format(fileglob, inDrive + inPath), quiet)
+        # note that output file derived from input param so may vary in case from input file name
+    else:   # test inputFile
+        if not accessFile(inputFile, 'fOK'):
+            statusErrMsg("fatal", "args", "file does not exist (1): {}".format(inputFile))
+            exit(1)
+        elif not accessFile(inputFile, 'rOK'):
+            statusErrMsg('fatal', 'args', 'file cannot be opened for read access: {}'.format(inputFile))
+            exit(1)
+        errMsg('input file: {}'.format(inputFile), quiet)
+    if opts.auto:
+        errMsg('auto mode (output file name) triggered', quiet)
+        if verbose: errMsg('output file derived from input file name', quiet)
+        # note that output file derived from input param so may vary in case from input file name
+        outputFile = osPath(crhCompress.autoName(inputFile, '.txt', opts.compress))
+    elif args.absoutfile:
+        outputFile = osPath(args.absoutfile)
+        (outDrive, outPath, outName, outExt) = splitFileCmpnt(outputFile)
+        if outPath[-1] == '/' or outPath[-1] == '\\':
+            outputFile = osPath(outDrive + outPath + outName + outExt)
+        else:
+            outputFile = osPath(outDrive + outPath + '/' + outName + outExt)
+    elif args.outfile:
+        outputFile = osPath(args.outfile)
+        (outDrive, outPath, outName, outExt) = splitFileCmpnt(outputFile)
+        outputFile = osPath(inDrive + inPath + '/' + outName + outExt)
+    if outputFile is not None:
+        errMsg('output file: {}'.format(outputFile), quiet)
         if inputFile == outputFile:
-            statusErrMsg("warn", "args", "input and output file names identical")
-            continue
+            statusErrMsg("fatal", "args", "input and output file names identical")
+            exit(1)
         if verbose:
             if not accessFile(outputFile, 'fOK'):
-                statusErrMsg("info", "args", "file does not exist (3): {}".format(outputFile), quiet)
+                statusErrMsg("info", "args", "file does not exist (2): {}".format(outputFile), quiet)
             else:
                 if not accessFile(outputFile, 'wOK'):
-                    statusErrMsg("error", "args", "file not writeable: {}".format(outputFile))
-                    continue
+                    statusErrMsg("fatal", "args", "file not writeable: {}".format(outputFile))
+                    exit(1)
                 statusErrMsg("warn", "args", "overwriting file: {}".format(outputFile), quiet)
-        if not accessFile(inputFile, 'fOK'):
-            statusErrMsg("fatal", "args", "file does not exist (4): {}".format(inputFile))
-            exit(1)
-        elif not accessFile(inputFile, 'rOK'):
-            statusErrMsg('error', 'args', 'file cannot be opened for read access: {}'.format(bsvFile))
-            continue
-        errMsg('input file : {}'.format(inputFile), quiet)
-        errMsg('output file: {}'.format(outputFile), quiet)
-        processInputfile(inputFile)
-        fileCount += 1
-else:   # process single gpx file
-    processInputfile(inputFile)
+    return inputFile, outputFile, inDrive + inPath, fileglob
 
-## tidy up
-if all:
-    errMsg(singural(fileCount, ' file', ' files', '\n', ' processed'), quiet)
-errTMsg('{} ending normally ({:06.2f}sec)'.format(getProgName(), crhTimer.timer.stop()), quiet)
+def main(argv = None):
+    '''
+    command line program: process gpx file(s) as set by arguments (default: sys.argv)
+    '''
+    setProgName(progName)
+    errTMsg('{} -- process gpx data file'.format(getProgName()), quiet)
+
+    ## process arguments
+    args = setParser().parse_args(argv)
+    opts = setOptions(args)
+    resultCache = None
+    if args.cachedir:
+        errMsg('result cache: {} ({}MB)'.format(osPath(args.cachedir), args.cachesize), opts.quiet)
+        if opts.verbose: errMsg('repeated requests served from cache (whole file processing only)', opts.quiet)
+        resultCache = crhCache.cache(osPath(args.cachedir), args.cachesize * 1024 * 1024)
+    inputFile, outputFile, inDir, fileglob = setFiles(args, opts)
+    rollupTotal = None
+    if opts.rollup and (opts.all or opts.rollupFile is not None):
+        rollupTotal = crhRollup.rollup(opts.rollup)
+
+    ## process gpx file(s)
+    try:
+        if opts.scan:   # summarise file(s)
+            inputFiles = [osPath(f) for f in crhCompress.fileIter(fileglob, inDir)] if opts.all else [inputFile]
+            fileCount = scanFiles(inputFiles, opts, output(outputFile, verbose = opts.verbose, quiet = opts.quiet))
+            batchStats = None
+        elif opts.all: # process multiple files in directory
+            fileCount, batchStats = processBatch(fileglob, inDir, opts, resultCache, rollupTotal)
+        else:   # process single file
+            res = processFile(inputFile, opts, output(outputFile, verbose = opts.verbose, quiet = opts.quiet),
+                resultCache, rollupTotal)
+            if res is not None and res.stats is not None:
+                recordStats(res.stats, opts)
+        if rollupTotal is not None:
+            if opts.all and opts.rollupFile is None:
+                errMsg('combined rollup table...', opts.quiet)
+            writeRollup(rollupTotal, opts)
+    except IOError as e:
+        statusErrMsg('fatal', 'main', str(e))
+        exit(1)
+
+    ## tidy up
+    if opts.all:
+        errMsg(singural(fileCount, ' file', ' files', '\n', ' processed'), opts.quiet)
+        if resultCache is not None and opts.verbose:
+            errMsg('result cache: {} hits, {} misses'.format(resultCache.hits, resultCache.misses), opts.quiet)
+        if batchStats is not None and batchStats.parts > 1 and opts.stats:
+            errMsg('combined route statistics...', opts.quiet)
+            msg(batchStats.genStats().getvalue())
+    errTMsg('{} ending normally ({:06.2f}sec)'.format(getProgName(), crhTimer.timer.stop()), opts.quiet)
+
+## main program
+if __name__ == '__main__':
+    main()
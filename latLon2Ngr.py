@@ -2,23 +2,52 @@
 # v0.95 crh 28-dec-15 -- under development
 # v1.02 crh 31-dec-15 -- intial release
 # v1.10 crh 16-jan-16 -- minor mods & setParser() added
+# v1.20 crh 19-oct-26 -- importable: options object replaces module globals, main() added
+# v1.30 crh 19-oct-26 -- compressed (.gz, .bz2, .xz, .zip) input & output files
+# v1.40 crh 19-oct-26 -- multiple ngr precisions (eg: -p l,m,h) from one projection
+# v1.50 crh 19-oct-26 -- clip to ngr square or lat/lon box
+# v1.60 crh 19-oct-26 -- progress & throughput reporting for long files
+# v1.70 crh 19-oct-26 -- fast start-up for single reading conversions (deferred imports)
 
 # written on a windows platform using python v2.7
 
 #!/usr/local/bin/python
 
-import argparse
+## notes
+# the program can also be imported & driven in-process, eg:
+#   opts = latLon2Ngr.options(precision = 10, extend = True)
+#   eastWest, ngr = latLon2Ngr.convertLatLon((53.3399, -1.7774), opts.precision)
+#   records, lineTtl, ignoreTtl = latLon2Ngr.processInputFile('in.bsv', opts)
+# all state is held in the options object, the module level values being defaults only
+#
+# compressed input & output files (eg: readings.bsv.gz, see crhCompress) are read & written as streams
+#
+# several ngr precisions (eg: -p l,m,h, or options(precision = (6, 8, 10))) give an ngr field for each,
+# formatted by crhMapFast.osgb2ngrMulti() from the one easting & northing
+#
+# a clip area (--clip-ngr or --clip-bbox, or options(clip = crhClip.fromNgr('SK27'))) drops file records
+# outside it, the lat/lon box pre-test being applied before the reading is converted
+#
+# progress through a long input file is reported every --progress seconds (records, bytes, rates & eta)
+# and/or appended to a --progress-file as bsv records, see crhProgress (bytes & eta for plain files only)
+#
+# single reading conversions (eg: -l 53.3399,-1.7774, with -q, -v, -b, -e or -p) are parsed by
+# parseSingle() without argparse, & the file handling modules (crhFile, crhString, crhCompress,
+# crhProgress, csv) are only imported by the functions using them, so a one-off lookup only loads the
+# messaging & mapping modules; mapCheck.py checks the start-up time of these conversions against a budget
+
 import re
-import csv
+import sys
 from sys import stdout, stderr, exit
 
 from crhDebug import *  # debug & messaging
-from crhFile import *   # file handling
-from crhString import * # string utilities
 import crhTimer         # timer
 import crhMap           # mapping utilities
+import crhMapFast       # fast mapping utilities
+import crhClip          # clip areas
+# argparse, csv, crhFile, crhString, crhCompress & crhProgress are imported when used (see notes)
 
-## essential variables
+## essential variables (defaults, see options class)
 progName = 'latLon2Ngr'
 crhMap.fatalException = False   # handle invalid lat/lon values
 brief = False   # generate reduced output data
@@ -27,13 +56,46 @@ quiet = False   # less output (quiet & verbose are not mutually exclusive)
 verbose = False # more output
 bsv = True      # generate bar separated value records
 auto = False    # output file name based on input file name (.txt extension)
+compress = ''   # compression extension of auto-named output file ('': not compressed)
 autoExt = '.txt'
-inputFile = None
-outputFile = None
-outputH = None
 precision = 8   # ngr precision (default: medium precision)
 startField = 1  # file record start field for lat/lon values (default: 1)
-lineTtl = ignoreTtl = 0
+clip = None     # clip area (crhClip.clip) file records are restricted to (None: not used)
+progress = 0    # seconds between input file progress reports (0: none)
+progressFile = None # append input file progress records to this file
+singleFlags = {'-q': 'quietmode', '--quiet': 'quietmode', '-v': 'verbosemode', '--verbose': 'verbosemode',
+    '-b': 'briefmode', '--brief': 'briefmode', '-e': 'extendmode', '--extend': 'extendmode'}
+singleValues = {'-l': 'latlon', '--latlon': 'latlon', '-p': 'precisionmode', '--precision': 'precisionmode'}
+
+## define classes
+class options(object):
+    '''
+    conversion options, initially the module defaults above
+    keyword arguments override the defaults (eg: options(extend = True, precision = 10))
+    '''
+    def __init__(self, **kwargs):
+        for name in ('brief', 'extend', 'quiet', 'verbose', 'bsv', 'auto', 'compress', 'precision',
+                'startField', 'clip', 'progress', 'progressFile'):
+            setattr(self, name, globals()[name])
+        for name, value in kwargs.items():
+            if not hasattr(self, name):
+                raise TypeError('unknown latLon2Ngr option: {}'.format(name))
+            setattr(self, name, value)
+
+class singleArgs(object):
+    '''
+    parsed arguments of a single reading conversion (see parseSingle), setParser() defaults otherwise
+    '''
+    def __init__(self, **kwargs):
+        self.infile = self.latlon = ''
+        self.outfile = self.absoutfile = self.compressmode = self.startfield = None
+        self.clipngr = self.clipbbox = self.progressfile = None
+        self.automode = self.briefmode = self.extendmode = self.csvmode = False
+        self.quietmode = self.verbosemode = False
+        self.precisionmode = 'm'
+        self.progress = progress
+        for name, value in kwargs.items():
+            setattr(self, name, value)
 
 ## define functions
 def tuple2csv(tpl):
@@ -61,6 +123,7 @@ def setParser():
     '''
     set up argparser object & return it
     '''
+    import argparse
     parse = argparse.ArgumentParser(description="convert lat/long readings to NGR")
     inputMode = parse.add_mutually_exclusive_group(required = True) # use either -i or -l
     inputMode.add_argument('-i', '--input', action="store", dest="infile",
@@ -74,6 +137,8 @@ def setParser():
         help="full output filename path (eg: d:\\out.txt)")
     outfile.add_argument('-a', '--auto', action="store_true", dest="automode",
         help="use output file derived from input file name")
+    parse.add_argument('-z', '--compress', action="store", dest="compressmode",
+        help="compress auto-named (-a) output file", choices=['gz','bz2','xz','zip'])
     outputLevel = parse.add_mutually_exclusive_group() # use either one or none of -b & -e
     outputLevel.add_argument('-b', '--brief', action="store_true", dest="briefmode",
         help="brief output data generated")
@@ -84,47 +149,80 @@ def setParser():
     parse.add_argument('-s', '--start', action="store", dest="startfield", type=int,
         help="file record start field (lat)")
     parse.add_argument('-p', '--precision', action="store", dest="precisionmode",
-        help="set national grid reference precision", choices=['l','m','h'], default='m')
+        help="set national grid reference precision: l, m or h (eg: l,m,h for a field per precision)",
+        default='m')
+    clipArea = parse.add_mutually_exclusive_group()
+    clipArea.add_argument('--clip-ngr', action="store", dest="clipngr",
+        help="only output readings inside given national grid square (eg: SK27 or SK2070)")
+    clipArea.add_argument('--clip-bbox', action="store", dest="clipbbox",
+        help="only output readings inside given lat/lon box (min lat,min lon,max lat,max lon)")
+    parse.add_argument('--progress', action="store", dest="progress", type=float, default=progress,
+        help="report input file progress every given number of seconds")
+    parse.add_argument('--progress-file', action="store", dest="progressfile",
+        help="append input file progress records to given file (eg: for a job scheduler)")
     parse.add_argument('-q', '--quiet', action="store_true", dest="quietmode",
         help="suppress some program messages")
     parse.add_argument('-v', '--verbose', action="store_true", dest="verbosemode",
         help="generate additional program messages")
     return parse
 
-def setInputFile():
+def parseSingle(argv = None):
     '''
-    set & check input file
+    return singleArgs for a single reading conversion (eg: -l 53.3399,-1.7774 -q) without argparse,
+    None for any other arguments (including errors & help), which are left to setParser()
     '''
-    global inputFile
+    argv = list(sys.argv[1:] if argv is None else argv)
+    values = dict()
+    while argv:
+        arg = argv.pop(0)
+        if arg in singleFlags and singleFlags[arg] not in values:
+            values[singleFlags[arg]] = True
+        elif arg in singleValues and singleValues[arg] not in values and argv and not argv[0].startswith('-'):
+            values[singleValues[arg]] = argv.pop(0)
+        else:
+            return None
+    if 'latlon' not in values or ('briefmode' in values and 'extendmode' in values):
+        return None
+    return singleArgs(**values)
+
+def setInputFile(args, opts):
+    '''
+    set & check input file, return it
+    '''
+    from crhFile import osPath, splitFileCmpnt, accessFile
     inputFile = osPath(args.infile)
     (inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
     if inExt == '': # no extension given so give it one
-        if bsv:
-            statusErrMsg('info', 'args', 'assume input file {} has .bsv extension'.format(inName), quiet)
+        if opts.bsv:
+            statusErrMsg('info', 'args', 'assume input file {} has .bsv extension'.format(inName), opts.quiet)
             inExt= '.bsv'
         else:
-            statusErrMsg('info', 'args', 'assume input file {} has .csv extension'.format(inName), quiet)
+            statusErrMsg('info', 'args', 'assume input file {} has .csv extension'.format(inName), opts.quiet)
             inExt= '.csv'
     inputFile = osPath(inDrive + inPath + '/' + inName + inExt)
     if not accessFile(inputFile, 'fOK'):
         statusErrMsg("fatal", "args", "file does not exist: {}".format(inputFile))
         exit(1)
     elif not accessFile(inputFile, 'rOK'):
-        statusErrMsg('fatal', 'args', 'file cannot be opened for read access: {}'.format(bsvFile))
+        statusErrMsg('fatal', 'args', 'file cannot be opened for read access: {}'.format(inputFile))
         exit(1)
-    errMsg('input file: {}'.format(inputFile), quiet)
+    errMsg('input file: {}'.format(inputFile), opts.quiet)
+    return inputFile
 
-def setOutputFile():
+def setOutputFile(args, opts, inputFile):
     '''
-    set & check output file
+    set & check output file, return it (None if not specified)
     '''
-    global outputFile
-    if auto:
+    from crhFile import osPath, splitFileCmpnt, accessFile
+    import crhCompress
+    quiet = opts.quiet
+    verbose = opts.verbose
+    outputFile = None
+    if opts.auto:
         errMsg('auto mode (output file name) triggered', quiet)
         if verbose: errMsg('output file derived from input file name', quiet)
         # note that output file derived from input param so may vary in case from input file name
-        (outDrive, outPath, outName, outExt) = splitFileCmpnt(inputFile)
-        outputFile = osPath(outDrive + outPath + '/' + outName + autoExt)
+        outputFile = osPath(crhCompress.autoName(inputFile, autoExt, opts.compress))
     elif args.absoutfile:
         outputFile = osPath(args.absoutfile)
         (outDrive, outPath, outName, outExt) = splitFileCmpnt(outputFile)
@@ -137,7 +235,7 @@ def setOutputFile():
         (outDrive, outPath, outName, outExt) = splitFileCmpnt(outputFile)
         (inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
         outputFile = osPath(inDrive + inPath + '/' + outName + outExt)
-    if auto or args.outfile or args.absoutfile:
+    if outputFile is not None:
         errMsg('output file: {}'.format(outputFile), quiet)
         if inputFile == outputFile:
             statusErrMsg("fatal", "args", "input and output file names identical")
@@ -152,185 +250,296 @@ def setOutputFile():
                 statusErrMsg("warn", "args", "overwriting file: {}".format(outputFile), quiet)
     elif verbose:
         errMsg('no output file specified', quiet)
+    return outputFile
+
+def multiPrecision(precision):
+    '''
+    return True if precision is a sequence of ngr precisions rather than a single one
+    '''
+    return not isinstance(precision, (int, long))
+
+def convertLatLon(latLon, precision = precision):
+    '''
+    convert (lat, lon) to osgb (east, west) & ngr
+    returns tuple of east, west tuple & ngr (None if invalid),
+    ngr being a tuple of ngr values if precision is a sequence of precisions
+    '''
+    eastWest = crhMap.wgs2osgb(latLon)
+    try:
+        if multiPrecision(precision):
+            ngr = crhMapFast.osgb2ngrMulti(eastWest, precision)
+        else:
+            ngr = crhMap.osgb2ngr(eastWest, precision)
+    except RuntimeError:
+        ngr = None
+    return eastWest, ngr
 
-def processInputFile(inputFile, lonField = 0):
+def ngrFields(ngr, precision = precision):
+    '''
+    return list of ngr output field values for ngr returned by convertLatLon() ('n/a' if invalid)
+    '''
+    count = len(precision) if multiPrecision(precision) else 1
+    if ngr is None:
+        return ['n/a'] * count
+    return list(ngr) if multiPrecision(precision) else [ngr]
+
+def processInputFile(inputFile, opts, lonField = None):
     '''
     process lat/lon input file
     assumed in csv or bsv format
     extracts fields lonField & lonfield +1 to calculate east, west & ngr values
+    (lonField defaults to opts.startField)
     returns tuple of tuples, total line count and ignored line count
     actual elements in tuples depends on which of brief, standard (default) or extended is set
+    lines outside opts.clip (if set) are dropped, neither output nor counted as ignored
+    raises RuntimeError if input file neither bsv nor csv
     '''
-    lineCount = ignoreCount = 0
-    lineLst = list()
+    import csv
+    import crhCompress
+    import crhProgress
+    from crhString import singural
+    if lonField is None:
+        lonField = opts.startField
+    lineCount = ignoreCount = clipCount = 0
     currentLineList = list()
     processedLineLst = list()
-    latLonLst = list()
-    inputLst = list()
-    bsvInput = True
-    for line in fileLineGen(inputFile): # crude bsv/csv check
+    sepChar = '|'
+    for line in crhCompress.lineGen(inputFile): # crude bsv/csv check
         bsvInput = '|' in line
         if not bsvInput:
             if not ',' in line:
-                statusErrMsg('fatal', 'processInputFile', 'unable to process input file: {}'.format(inputFile))
-                exit(1)
+                raise RuntimeError('unable to process input file: {}'.format(inputFile))
         if bsvInput:
-            errMsg('bsv input file...', quiet)
+            errMsg('bsv input file...', opts.quiet)
             sepChar = '|'
         else:
-            errMsg('csv input file...', quiet)
+            errMsg('csv input file...', opts.quiet)
             sepChar = ','
         break
-    with open(inputFile, 'rb') as f:
+    with crhCompress.openInput(inputFile) as f:
+        reporter = None
+        if opts.progress or opts.progressFile is not None:
+            plain = not crhCompress.compressed(inputFile)  # compressed position not known
+            reporter = crhProgress.reporter('progress', None, crhProgress.fileSize(inputFile) if plain else None,
+                opts.progress or crhProgress.interval, opts.progressFile, opts.quiet, bool(opts.progress),
+                f.tell if plain else None)
         inputReader = csv.reader(f, delimiter = sepChar)
         for lineLst in inputReader:
             lineCount += 1
+            if reporter is not None:
+                reporter.point()
             lineTpl = tuple(lineLst)
-            if not brief:
+            if not opts.brief:
                 currentLineList = lineLst
-            if len(lineTpl) > startField:
+            if len(lineTpl) > opts.startField:
                 latLon = [float(lineTpl[lonField - 1]), float(lineTpl[lonField])]
-                eastWest = crhMap.wgs2osgb(latLon)
-                try:
-                    ngr = crhMap.osgb2ngr(eastWest, precision)
-                except RuntimeError as re:
-                    if verbose:
-                        errMsg('NGR >>>> Invalid input (line {})!'.format(lineCount), quiet)
-                    ngr = 'n/a'
-                if extend:
-                    currentLineList.extend([str(eastWest[0]), str(eastWest[1]), ngr])
-                elif brief:
-                    currentLineList = [lineTpl[lonField - 1], lineTpl[lonField], ngr]
+                if opts.clip is not None and not opts.clip.preTest(latLon[0], latLon[1]):
+                    clipCount += 1
+                    continue
+                eastWest, ngr = convertLatLon(latLon, opts.precision)
+                if opts.clip is not None and not opts.clip.contains(eastWest[0], eastWest[1]):
+                    clipCount += 1
+                    continue
+                if ngr is None:
+                    if opts.verbose:
+                        errMsg('NGR >>>> Invalid input (line {})!'.format(lineCount), opts.quiet)
+                fields = ngrFields(ngr, opts.precision)
+                if opts.extend:
+                    currentLineList.extend([str(eastWest[0]), str(eastWest[1])] + fields)
+                elif opts.brief:
+                    currentLineList = [lineTpl[lonField - 1], lineTpl[lonField]] + fields
                 else:
-                    currentLineList.append(ngr)
+                    currentLineList.extend(fields)
                 processedLineLst.append(tuple(currentLineList))
             else:
                 ignoreCount += 1
                 continue
+        if reporter is not None:
+            reporter.done()
+    if opts.clip is not None:
+        errMsg(singural(clipCount, ' file line', ' file lines', '', ' clipped'), opts.quiet)
     return tuple(processedLineLst), lineCount, ignoreCount
 
-def processOutputFile(lineLst):
+def formatRecord(line, bsv = bsv):
+    '''
+    return bsv (or csv) string generated from tuple of string values
+    '''
+    if bsv:
+        return tuple2bsv(line)
+    return tuple2csv(line)
+
+def processOutputFile(lineLst, outputFile, opts):
     '''
     put contents of lineLst into output file
+    raises IOError if output file cannot be opened
     '''
-    global outputH
-    outputH = openFile(outputFile, 'wt')
+    import crhCompress
+    outputH = crhCompress.openOutput(outputFile, 'wt')
     if outputH is None:
-        statusErrMsg('fatal', 'processOutputFile()', 'error opening output file {}'.format(outputFile))
-        exit(1)
-    else:
-        statusErrMsg('info', 'processOutputFile()', 'output file opened: {}'.format(outputFile), quiet)
+        raise IOError('error opening output file {}'.format(outputFile))
+    statusErrMsg('info', 'processOutputFile()', 'output file opened: {}'.format(outputFile), opts.quiet)
     for line in lineLst:
-        if bsv:
-            outputH.write(tuple2bsv(line) + '\n')
-        else:
-            outputH.write(tuple2csv(line) + '\n')
+        outputH.write(formatRecord(line, opts.bsv) + '\n')
     outputH.close()
-    outputH = None
 
-## main program
-setProgName(progName)
-errTMsg('{} -- process latitude, longitude data to provide OS NGR data'.format(getProgName()), quiet)
-
-## process arguments
-parser = setParser()
-args = parser.parse_args()
-quiet = args.quietmode
-verbose = args.verbosemode
-brief = args.briefmode
-extend = args.extendmode
-auto = args.automode
-
-if verbose:
-    errMsg('verbose mode set', quiet)
-if args.csvmode and args.infile != '':
-    bsv = False
-    errMsg('csv mode set', quiet)
-    if verbose:
-        errMsg('output csv records', quiet)
-elif args.infile != '':
-    errMsg('bsv mode set (default)', quiet)
-    if verbose:
-        errMsg('output bsv records', quiet)
-if brief:
-    errMsg('brief mode set', quiet)
+def setOptions(args):
+    '''
+    return options object set from parsed command line arguments, reporting them
+    '''
+    opts = options(quiet = args.quietmode, verbose = args.verbosemode, brief = args.briefmode,
+        extend = args.extendmode, auto = args.automode)
+    quiet = opts.quiet
+    verbose = opts.verbose
     if verbose:
-        errMsg('output limited field records', quiet)
-elif extend:
-    errMsg('extended mode set', quiet)
+        errMsg('verbose mode set', quiet)
+    if args.csvmode and args.infile != '':
+        opts.bsv = False
+        errMsg('csv mode set', quiet)
+        if verbose:
+            errMsg('output csv records', quiet)
+    elif args.infile != '':
+        errMsg('bsv mode set (default)', quiet)
+        if verbose:
+            errMsg('output bsv records', quiet)
+    if opts.brief:
+        errMsg('brief mode set', quiet)
+        if verbose:
+            errMsg('output limited field records', quiet)
+    elif opts.extend:
+        errMsg('extended mode set', quiet)
+        if verbose:
+            errMsg('output extended field records', quiet)
+    elif verbose:
+        errMsg('output default field records', quiet)
+    if args.startfield:
+        opts.startField = args.startfield
+        errMsg('start field set', quiet)
     if verbose:
-        errMsg('output extended field records', quiet)
-elif verbose:
-    errMsg('output default field records', quiet)
-if args.startfield:
-    startField = args.startfield
-    errMsg('start field set', quiet)
-if verbose:
-    if startField == 1:
-        errMsg('file record start field for lat/lon values is 1 (default)', quiet)
+        if opts.startField == 1:
+            errMsg('file record start field for lat/lon values is 1 (default)', quiet)
+        else:
+            errMsg('file record start field for lat/lon values is {}'.format(opts.startField), quiet)
+    try:
+        precisions = crhMapFast.ngrPrecisions(args.precisionmode)
+    except ValueError as e:
+        statusErrMsg('fatal', 'args', str(e))
+        exit(1)
+    if len(precisions) > 1:
+        opts.precision = precisions
+        errMsg('multiple ngr precisions set: {} digits'.format(', '.join([str(p) for p in precisions])), quiet)
+        if verbose:
+            errMsg('national grid reference field output for each precision', quiet)
+    elif precisions == (6,):
+        opts.precision = 6
+        errMsg('low ngr precision set', quiet)
+        if verbose:
+            errMsg('national grid reference precision is 100m', quiet)
+    elif precisions == (10,):
+        opts.precision = 10
+        errMsg('high ngr precision set', quiet)
+        if verbose:
+            errMsg('national grid reference precision is 1m', quiet)
     else:
-        errMsg('file record start field for lat/lon values is {}'.format(startField), quiet)
-if args.precisionmode == 'l':
-    precision = 6
-    errMsg('low ngr precision set', quiet)
-    if verbose:
-        errMsg('national grid reference precision is 100m', quiet)
-elif args.precisionmode == 'h':
-    precision = 10
-    errMsg('high ngr precision set', quiet)
-    if verbose:
-        errMsg('national grid reference precision is 1m', quiet)
-else:
-    errMsg('medium ngr precision set (default)', quiet)
-    if verbose:
-        errMsg('national grid reference precision is 10m', quiet)
-if args.infile != '':   # input file (i) argument provided
-    setInputFile()
-    setOutputFile()
+        errMsg('medium ngr precision set (default)', quiet)
+        if verbose:
+            errMsg('national grid reference precision is 10m', quiet)
+    if args.clipngr or args.clipbbox:
+        try:
+            opts.clip = crhClip.fromNgr(args.clipngr) if args.clipngr else crhClip.fromBox(args.clipbbox)
+        except ValueError as e:
+            statusErrMsg('fatal', 'args', 'unable to use clip area: {}'.format(e))
+            exit(1)
+        errMsg('clip mode set: {}'.format(opts.clip.spec), quiet)
+        if verbose:
+            errMsg('only readings inside clip area output', quiet)
+    opts.progress = args.progress
+    if args.progressfile:
+        from crhFile import osPath
+        opts.progressFile = osPath(args.progressfile)
+    if opts.progress or opts.progressFile is not None:
+        if args.infile == '':
+            opts.progress = 0
+            opts.progressFile = None
+            statusErrMsg('warn', 'args', 'progress switches ignored (input file only)', quiet)
+        else:
+            if opts.progress:
+                errMsg('progress mode set: report every {} sec'.format(opts.progress), quiet)
+            if opts.progressFile is not None:
+                errMsg('progress file: {}'.format(opts.progressFile), quiet)
+    if args.compressmode:
+        opts.compress = '.' + args.compressmode
+        errMsg('compress mode set: {}'.format(opts.compress), quiet)
+        if not opts.auto:
+            statusErrMsg('warn', 'args', 'compress switch ignored (output file not auto-named)', quiet)
+    return opts
 
-## process data
-errMsg('')
+def main(argv = None):
+    '''
+    command line program: convert lat/lon reading or file as set by arguments (default: sys.argv)
+    '''
+    setProgName(progName)
+    errTMsg('{} -- process latitude, longitude data to provide OS NGR data'.format(getProgName()), quiet)
+
+    ## process arguments
+    args = parseSingle(argv) or setParser().parse_args(argv)
+    opts = setOptions(args)
+    inputFile = outputFile = None
+    if args.infile != '':   # input file (i) argument provided
+        inputFile = setInputFile(args, opts)
+        outputFile = setOutputFile(args, opts, inputFile)
 
-if args.latlon != '':   # lat/lon (l) argument provided
-    errMsg('single lat/log reading provided...', quiet)
-    latLon = args.latlon.split('|')
-    if len(latLon) == 1:    # not bsv record
-        latLon = args.latlon.split(',')
-        if len(latLon) == 1:    # not csv record either
-            statusErrMsg('fatal', 'args', 'lat/lon value must be either a csv or bsv pair: {}'.format(args.latlon))
+    ## process data
+    errMsg('')
+
+    if args.latlon != '':   # lat/lon (l) argument provided
+        errMsg('single lat/log reading provided...', opts.quiet)
+        latLon = args.latlon.split('|')
+        if len(latLon) == 1:    # not bsv record
+            latLon = args.latlon.split(',')
+            if len(latLon) == 1:    # not csv record either
+                statusErrMsg('fatal', 'args', 'lat/lon value must be either a csv or bsv pair: {}'.format(args.latlon))
+                exit(1)
+        latLon = tuple([float(latLon[0]), float(latLon[1])])
+        errMsg('Lat, Lon   >>>> {}'.format(latLon))
+        eastWest, ngr = convertLatLon(latLon, opts.precision)
+        msg('East, West >>>> {}'.format(eastWest), opts.quiet)
+        if opts.clip is not None and not (opts.clip.preTest(latLon[0], latLon[1])
+                and opts.clip.contains(eastWest[0], eastWest[1])):
+            msg('NGR        >>>> Outside clip area!')
+        elif ngr is not None:
+            msg('NGR        >>>> {}'.format(', '.join(ngrFields(ngr, opts.precision))))
+        else:
+            msg('NGR        >>>> Invalid input!')
+    else:   # input file argument provided
+        try:
+            processed, lineTtl, ignoreTtl = processInputFile(inputFile, opts)
+        except RuntimeError as e:
+            statusErrMsg('fatal', 'processInputFile', str(e))
             exit(1)
-    latLon = tuple([float(latLon[0]), float(latLon[1])])
-    errMsg('Lat, Lon   >>>> {}'.format(latLon))
-    eastWest = crhMap.wgs2osgb(latLon)
-    msg('East, West >>>> {}'.format(eastWest), quiet)
-    try:
-        ngr = crhMap.osgb2ngr(eastWest, precision)
-        msg('NGR        >>>> {}'.format(ngr))
-    except RuntimeError as re:
-        msg('NGR        >>>> Invalid input!')
-else:   # input file argument provided
-    processed, lineTtl, ignoreTtl = processInputFile(inputFile, startField)
-    if outputFile is None:
-        msg('\n>>>>no output file specified...')
-        for line in processed:
-            if bsv:
-                msg(tuple2bsv(line))
-            else:
-                msg(tuple2csv(line))
-    else:   # output to stdErr (possibly) & then to file
-        if verbose: # output to stdErr
-            errMsg('')
+        if outputFile is None:
+            msg('\n>>>>no output file specified...')
             for line in processed:
-                if bsv:
-                    errMsg(tuple2bsv(line))
-                else:
-                    errMsg(tuple2csv(line))
-        processOutputFile(processed)    # output to file
+                msg(formatRecord(line, opts.bsv))
+        else:   # output to stdErr (possibly) & then to file
+            if opts.verbose: # output to stdErr
+                errMsg('')
+                for line in processed:
+                    errMsg(formatRecord(line, opts.bsv))
+            try:
+                processOutputFile(processed, outputFile, opts)    # output to file
+            except IOError as e:
+                statusErrMsg('fatal', 'processOutputFile()', str(e))
+                exit(1)
 
-## tidy up
-if args.infile != '':
-    errMsg(singural(lineTtl, ' file line', ' file lines', '\n', ' processed'), quiet)
-    if ignoreTtl:
-        errMsg(singural(lineTtl, ' file line', ' file lines', '\n', ' ingored'), quiet)
-errMsg('')
-errTMsg('{} ending normally ({:06.2f}sec)'.format(getProgName(), crhTimer.timer.stop()), quiet)
+    ## tidy up
+    if args.infile != '':
+        from crhString import singural
+        errMsg(singural(lineTtl, ' file line', ' file lines', '\n', ' processed'), opts.quiet)
+        if ignoreTtl:
+            errMsg(singural(lineTtl, ' file line', ' file lines', '\n', ' ingored'), opts.quiet)
+    errMsg('')
+    errTMsg('{} ending normally ({:06.2f}sec)'.format(getProgName(), crhTimer.timer.stop()), opts.quiet)
+
+## main program
+if __name__ == '__main__':
+    main()
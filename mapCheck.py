@@ -0,0 +1,675 @@
+# mapCheck.py -- accuracy & speed regression check of crhMapFast against crhMap
+# v1.00 crh 19-oct-26 -- initial release
+# v1.10 crh 19-oct-26 -- grid mode (shift grid) checks added
+# v1.20 crh 19-oct-26 -- concurrency check added
+# v1.30 crh 19-oct-26 -- multi-precision ngr check added
+# v1.40 crh 19-oct-26 -- elevation grid (dem) check added
+# v1.50 crh 19-oct-26 -- start-up budget check of single value conversions added
+# v1.60 crh 19-oct-26 -- crhTrack statistics checked against crhGPX reference output
+# v1.70 crh 19-oct-26 -- crhTrack statistics serialisation round trip check (non-ascii name)
+# v1.80 crh 19-oct-26 -- ngr2osgb round trip check, speed paths must be faster than their reference
+# v1.90 crh 19-oct-26 -- rollup square check at every precision (including HU & HP squares)
+# v1.91 crh 19-oct-26 -- speed-up only a pass criterion for paths with a wide margin (cache & grid mode)
+# v1.92 crh 19-oct-26 -- statistics merge check (differing configuration refused)
+# v1.93 crh 19-oct-26 -- grid mode array variants checked (numpy only)
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# each fast path is run alongside its scalar crhMap reference over the same sample points:
+#   dense grid of points covering the national grid extent (or the equivalent lat/lon box)
+#   random points over the same area
+#   edge case points either side of the national grid boundaries
+# differences are reported in metres (easting/northing results) or ngr digits (ngr results),
+# as the maximum & 50/95/99 percentile values, together with the speed-up of the fast path
+# accuracy is the pass criterion, the speed-up (each path timed as the fastest of timingRuns runs) is
+# only reported, except for the paths gated on it, whose gain is far above timing noise (the cached
+# & batched grid mode conversions), which must reach the minimum speed-up over their reference;
+# paths checked against a test helper rather than a slower reference (round trips, the planar dem)
+# report no speed-up; the cached wgs2osgb path is timed from an empty cache over
+# samples each repeated restRepeats times, as the way-points of a track at rest (its only use), &
+# wgs2osgbList outside grid mode is not checked, being a plain loop over crhMap.wgs2osgb
+# ngr2osgb is checked by a round trip from fast path ngrs, giving the south west corner of the ngr square
+# a reference & fast path must agree on which points are invalid (RuntimeError raised)
+# multi-precision ngr formatting (100m, 10m & 1m at once) is checked against a scalar call per precision
+# elevation grid sampling is checked with a planar surface written as an ESRI ASCII grid & converted by
+# crhGrid, bilinear interpolation of a plane being exact
+# grid mode batch conversions are checked against the same conversions made one point at a time,
+# & the osgb -> wgs grid inversion against a wgs -> osgb -> wgs round trip; with numpy the array
+# variants are checked the same way (nan results compared as invalid points)
+# (the synthetic shift grid synthOSTN.grd is used unless another grid file is given)
+# the concurrency check runs the fast paths & differently configured crhTrack tracks
+# (precision, tolerances & max delta values) over the same samples from a pool of threads,
+# in shuffled order, & every result must be identical to that of running the job on its own
+# the start-up check times single value conversions by the command line scripts (fastest of startupRuns
+# runs, less the start-up time of the bare interpreter) against the budget, & has each conversion
+# list the deferredModules it loaded (none should be: they are only needed for file processing)
+# the reference check feeds referenceGpx to crhTrack, whole & in small blocks, & compares the statistics
+# with those in referenceOutput (gpxRdngs -x -b -s output made with crhGPX): only the referenceFields,
+# which do not depend on the wgs -> osgb conversion, are compared (distance & duplicate BSVs do)
+# the round trip check serialises the statistics of a synthetic track with a non-ascii name & desc
+# (crhTrack.stats dumps() & loads()), & the statistics text of the copy must be identical
+# the rollup check bins rollupPoints (from the south of the grid to its HU & HP squares) at every
+# rollup precision, with & without numpy (if installed): each square must be that of the ngr of its
+# way-points, & the table text must read back (loads) unchanged
+# the program exits with status 1 if any path exceeds its tolerance (or a gated path misses the minimum speed-up),
+# any threaded result differs,
+# any rollup square is wrong, any reference statistic differs, the statistics round trip fails, or any conversion exceeds the start-up budget or loads a deferred module
+
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import argparse
+import math
+import random
+import timeit
+import time
+from multiprocessing.pool import ThreadPool
+from sys import stdout, stderr, exit
+
+from crhDebug import *  # debug & messaging
+import crhTimer         # timer
+import crhMap           # mapping utilities
+import crhMapFast       # fast mapping utilities
+import crhGrid          # memory-mapped grids
+import crhTrack         # streaming gpx processing
+import crhRollup        # ngr square rollups
+
+## essential variables
+progName = 'mapCheck'
+crhMap.fatalException = False   # handle invalid values
+quiet = False   # less output (quiet & verbose are not mutually exclusive)
+verbose = False # more output
+randomCount = 10000 # number of random sample points
+gridStep = 10   # dense grid sample spacing (km)
+seed = 1        # random number seed (repeatable samples)
+tolerM = 0.001  # maximum acceptable easting/northing difference (m)
+tolerD = 0      # maximum acceptable ngr difference (least significant digits)
+multiPrecisions = (6, 8, 10)    # precisions checked by the multi-precision ngr path
+precision = 10  # ngr precision used for ngr paths
+minSpeedUp = 2.0    # minimum speed-up of gated paths over their reference (0: not checked)
+restRepeats = 4     # times each sample is repeated for the cached path (way-points at rest)
+timingRuns = 3      # runs timed per path (fastest taken)
+threadCount = 4 # worker threads used by concurrency check (0: not checked)
+threadRounds = 3    # times each job is run by concurrency check
+trackLength = 2000  # way-points in synthetic track used by concurrency check
+scriptDir = os.path.dirname(os.path.abspath(__file__))
+gridFile = os.path.join(scriptDir, 'synthOSTN.grd')
+startupBudget = 0.1 # maximum start-up time (sec) of a single value conversion, over the bare interpreter (0: not checked)
+startupRuns = 5     # runs timed per conversion (fastest taken)
+startupCases = (('ngrLatLon', '-l', '53.3399,-1.7774'), ('ngrLatLon', '-n', 'SK1491882580'),
+    ('latLon2Ngr', '-l', '53.3399,-1.7774'))
+deferredModules = ('argparse', 'csv', 'crhCompress', 'crhProgress', 'crhGrid', 'numpy', 'gzip', 'zipfile')
+rollupPoints = ((100000, 10000), (100001, 10000), (440000, 130000), (440000, 1130000),  # SV, SU, HU
+    (440000, 1130000), (460003, 1210007), (699999, 1299999), (440000, 130000))  # HU, HP, corner, SU
+referenceGpx = os.path.join(scriptDir, '150807sm-grouseInn.gpx')
+referenceOutput = os.path.join(scriptDir, 'fullOutput.txt')
+referenceBlocks = (0, 100, 3)   # block sizes the reference gpx is fed in (0: whole file)
+roundTripName = 'Caf\xc3\xa9 \xe2\x80\x93 Grouse Inn'    # utf-8, as read from gpx
+roundTripDesc = 'Ta\xc3\xb0 \xc3\xbe\xc3\xa1'
+referenceFields = ('GPX way-points processed', 'Way-points discarded (t)', 'Way-points retained',
+    'Max vertical delta', 'Max time delta', 'Height increments ignored', 'Adjusted height gain',
+    'Adjusted height loss', 'Start way-point elevation', 'End way-point elevation', 'High way-point elevation',
+    'Low way-point elevation', 'Net height gain', 'Start timestamp', 'End timestamp', 'Elapsed time (H:M:S)')
+latMin, latMax = 49.8, 60.9 # lat/lon box covering the national grid
+lonMin, lonMax = -8.7, 1.9
+failCount = 0
+
+## define functions
+def setParser():
+    '''
+    set up argparser object & return it
+    '''
+    parse = argparse.ArgumentParser(description="check crhMapFast accuracy & speed against crhMap")
+    parse.add_argument('-n', '--random', action="store", dest="randomcount", type=int,
+        help="number of random sample points", default=randomCount)
+    parse.add_argument('-g', '--grid', action="store", dest="gridstep", type=int,
+        help="dense grid sample spacing (km)", default=gridStep)
+    parse.add_argument('-S', '--seed', action="store", dest="seed", type=int,
+        help="random number seed", default=seed)
+    parse.add_argument('-m', '--metres', action="store", dest="tolerm", type=float,
+        help="easting/northing tolerance (m)", default=tolerM)
+    parse.add_argument('-d', '--digits', action="store", dest="tolerd", type=int,
+        help="ngr tolerance (least significant digits)", default=tolerD)
+    parse.add_argument('-p', '--precision', action="store", dest="precisionmode",
+        help="set national grid reference precision", choices=['l','m','h'], default='h')
+    parse.add_argument('-G', '--gridfile', action="store", dest="gridfile",
+        help="shift grid file for grid mode checks", default=gridFile)
+    parse.add_argument('-u', '--speed-up', action="store", dest="speedup", type=float,
+        help="minimum speed-up of cache & grid mode paths (0: no check)", default=minSpeedUp)
+    parse.add_argument('-T', '--threads', action="store", dest="threadcount", type=int,
+        help="worker threads for concurrency check (0: no check)", default=threadCount)
+    parse.add_argument('-B', '--budget', action="store", dest="budget", type=float,
+        help="start-up budget (sec) of single value conversions (0: no check)", default=startupBudget)
+    parse.add_argument('-q', '--quiet', action="store_true", dest="quietmode",
+        help="suppress some program messages")
+    parse.add_argument('-v', '--verbose', action="store_true", dest="verbosemode",
+        help="generate additional program messages")
+    return parse
+
+def osgbSamples():
+    '''
+    return list of (easting, northing) sample points, including edge cases
+    '''
+    step = gridStep * 1000
+    samples = [(e, n) for e in range(step // 2, crhMapFast.gridMaxE, step)
+        for n in range(step // 2, crhMapFast.gridMaxN, step)]
+    samples.extend([(random.randint(0, crhMapFast.gridMaxE - 1), random.randint(0, crhMapFast.gridMaxN - 1))
+        for i in range(randomCount)])
+    edgeE = (-1, 0, 1, 99999, 100000, crhMapFast.gridMaxE - 1, crhMapFast.gridMaxE)
+    edgeN = (-1, 0, 1, 99999, 100000, crhMapFast.gridMaxN - 1, crhMapFast.gridMaxN)
+    samples.extend([(e, n) for e in edgeE for n in edgeN])
+    return samples
+
+def latLonSamples():
+    '''
+    return list of (lat, lon) sample points, including points beyond the national grid
+    '''
+    step = gridStep / 111.0 # approx degrees
+    samples = list()
+    lat = latMin
+    while lat <= latMax:
+        lon = lonMin
+        while lon <= lonMax:
+            samples.append((lat, lon))
+            lon += step
+        lat += step
+    samples.extend([(random.uniform(latMin, latMax), random.uniform(lonMin, lonMax))
+        for i in range(randomCount)])
+    samples.extend([(latMin - 0.5, lonMin - 0.5), (latMax + 0.5, lonMax + 0.5),
+        (latMin, lonMax), (latMax, lonMin)])
+    return samples
+
+def callEach(func, values):
+    '''
+    return list of func(value) results, None where RuntimeError raised
+    '''
+    results = list()
+    for value in values:
+        try:
+            results.append(func(value))
+        except RuntimeError:
+            results.append(None)
+    return results
+
+def cachedWgs2osgb(latLons):
+    '''
+    return crhMapFast.wgs2osgbCached results for latLons, starting from an empty cache
+    '''
+    crhMapFast._wgs2osgbCache.clear()
+    return callEach(crhMapFast.wgs2osgbCached, latLons)
+
+def arrayPairs(arrays):
+    '''
+    return list of value pairs from a pair of arrays (crhMapFast array variants), None where nan
+    '''
+    return [None if math.isnan(a) else (a, b) for a, b in zip(arrays[0].tolist(), arrays[1].tolist())]
+
+def squareCorner(eastNorth):
+    '''
+    return south west corner of the ngr square (of the check's precision) holding (easting, northing),
+    None if outside the national grid
+    '''
+    if not (0 <= eastNorth[0] < crhMapFast.gridMaxE and 0 <= eastNorth[1] < crhMapFast.gridMaxN):
+        return None
+    size = 10 ** (5 - precision // 2)
+    return (eastNorth[0] - eastNorth[0] % size, eastNorth[1] - eastNorth[1] % size)
+
+def latLonDiff(ref, fast):
+    '''
+    return approximate distance (m) between two (lat, lon) results
+    '''
+    dLat = (ref[0] - fast[0]) * 111320.0
+    dLon = (ref[1] - fast[1]) * 111320.0 * math.cos(math.radians(ref[0]))
+    return math.hypot(dLat, dLon)
+
+def metreDiff(ref, fast):
+    '''
+    return distance (m) between two (easting, northing) results
+    '''
+    return math.hypot(float(ref[0]) - float(fast[0]), float(ref[1]) - float(fast[1]))
+
+def digitDiff(ref, fast):
+    '''
+    return difference of two ngr strings in least significant digits (inf if squares differ)
+    '''
+    if ref[:2] != fast[:2] or len(ref) != len(fast):
+        return float('inf')
+    half = (len(ref) - 2) // 2
+    if half == 0:
+        return 0
+    return max(abs(int(ref[2:2 + half]) - int(fast[2:2 + half])),
+        abs(int(ref[2 + half:]) - int(fast[2 + half:])))
+
+def multiDigitDiff(ref, fast):
+    '''
+    return largest difference of corresponding ngr strings in two tuples of ngr strings
+    '''
+    if len(ref) != len(fast):
+        return float('inf')
+    return max([digitDiff(r, f) for r, f in zip(ref, fast)])
+
+def planeEle(eastNorth):
+    '''
+    return elevation (m) of the planar surface used to check elevation grids
+    '''
+    return 100.0 + 0.0005 * eastNorth[0] + 0.0002 * eastNorth[1]
+
+def writePlaneDem(fileName, cellSize = 10000.0):
+    '''
+    write planar surface covering the national grid as ESRI ASCII grid file (cell centres on the grid lines)
+    '''
+    columns = int(700000 / cellSize) + 1
+    rows = int(1300000 / cellSize) + 1
+    with open(fileName, 'w') as f:
+        f.write('ncols {}\nnrows {}\nxllcorner {}\nyllcorner {}\ncellsize {}\nNODATA_value -9999\n'.format(
+            columns, rows, -cellSize / 2, -cellSize / 2, cellSize))
+        for row in reversed(range(rows)):   # north to south
+            f.write(' '.join(['{:.4f}'.format(planeEle((col * cellSize, row * cellSize)))
+                for col in range(columns)]) + '\n')
+
+def sampleDem(demGrid, eastNorths):
+    '''
+    return list of elevations sampled from elevation grid, None outside it
+    '''
+    values = demGrid.sample([en[0] for en in eastNorths], [en[1] for en in eastNorths])[0]
+    return [None if value is None or math.isnan(value) else float(value) for value in values]
+
+def percentile(sortedValues, pct):
+    '''
+    return nearest rank percentile of already sorted values
+    '''
+    if not sortedValues:
+        return 0.0
+    rank = int(math.ceil(pct / 100.0 * len(sortedValues))) - 1
+    return sortedValues[max(rank, 0)]
+
+def bestTime(func, samples):
+    '''
+    return (fastest time of timingRuns runs of func over samples, results of the last run)
+    '''
+    best = None
+    for i in range(timingRuns):
+        startT = timeit.default_timer()
+        results = func(samples)
+        elapsedT = timeit.default_timer() - startT
+        best = elapsedT if best is None else min(best, elapsedT)
+    return best, results
+
+def checkPath(name, refFunc, fastFunc, samples, diffFunc, toler, units, speed = 'report'):
+    '''
+    run reference & fast path over samples, report differences & speed-up
+    speed is 'report' (speed-up reported), 'gate' (reported & checked) or None (not reported)
+    returns True if within tolerance (& if gated, at least the minimum speed-up)
+    '''
+    refT, refResults = bestTime(refFunc, samples)
+    fastT, fastResults = bestTime(fastFunc, samples)
+    diffs = list()
+    raiseCount = 0
+    for sample, ref, fast in zip(samples, refResults, fastResults):
+        if ref is None or fast is None:
+            if (ref is None) != (fast is None):
+                raiseCount += 1
+                if verbose:
+                    errMsg('{}: invalid point mismatch at {} ({} / {})'.format(name, sample, ref, fast), quiet)
+            continue
+        diffs.append(diffFunc(ref, fast))
+    diffs.sort()
+    maxDiff = diffs[-1] if diffs else 0.0
+    speedUp = refT / fastT if fastT else float('inf')
+    speedChecked = speed == 'gate' and minSpeedUp > 0
+    passed = maxDiff <= toler and raiseCount == 0 and (not speedChecked or speedUp >= minSpeedUp)
+    speedText = '' if speed is None else 'speed-up {:>6.2f}x {}'.format(speedUp,
+        '(min {:.2f}x)'.format(minSpeedUp) if speedChecked else '')
+    msg('{:<16}: {:>7} points  max {:>9.4f}{u}  p50 {:>9.4f}{u}  p95 {:>9.4f}{u}  p99 {:>9.4f}{u}  '
+        'invalid mismatches {:>3}  {:<28}  {}'.format(name, len(samples), maxDiff,
+        percentile(diffs, 50), percentile(diffs, 95), percentile(diffs, 99), raiseCount, speedText,
+        'ok' if passed else 'FAIL', u = units))
+    return passed
+
+def synthGpx(count):
+    '''
+    return gpx text for a synthetic track of count way-points wandering from a random start,
+    one way-point every 5 sec
+    '''
+    lat, lon = random.uniform(51.0, 56.0), random.uniform(-4.0, -1.0)
+    rows = ['<?xml version="1.0" encoding="ASCII"?>\n<gpx><trk><name>mapCheck</name><trkseg>\n']
+    for i in range(count):
+        lat += random.uniform(-0.0002, 0.0003)
+        lon += random.uniform(-0.0002, 0.0003)
+        rows.append('<trkpt lat="{:.6f}" lon="{:.6f}"><ele>{:.1f}</ele><time>{}</time></trkpt>\n'.format(lat, lon,
+            300.0 + 150.0 * math.sin(i / 150.0) + random.uniform(-4.0, 4.0),
+            time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1438934400 + 5 * i))))
+    rows.append('</trkseg></trk></gpx>\n')
+    return ''.join(rows)
+
+def trackJob(gpxText, config):
+    '''
+    return bsv & statistics text for gpx text fed in blocks to a crhTrack.track set up by config
+    '''
+    trk = crhTrack.track(delta = True, quiet = True, **config)
+    text = trk.bsvHead()
+    for start in range(0, len(gpxText), 4096):
+        text += trk.bsvRows(trk.bsvFilter(trk.feed(gpxText[start:start + 4096])))
+    return text + trk.genStats().getvalue()
+
+def checkThreads(jobs, reset = None):
+    '''
+    run each (name, function) job on its own, then all of them threadRounds times at once
+    from a pool of threadCount threads in shuffled order, calling reset() in between (if given)
+    returns True if every threaded result is identical to the result of running the job on its own
+    '''
+    expected = dict((name, func()) for name, func in jobs)
+    if reset is not None:
+        reset()
+    work = list(jobs) * threadRounds
+    random.shuffle(work)
+    pool = ThreadPool(threadCount)
+    startT = timeit.default_timer()
+    try:
+        results = pool.map(lambda job: (job[0], job[1]()), work)
+    finally:
+        pool.close()
+        pool.join()
+    elapsedT = timeit.default_timer() - startT
+    mismatches = sorted(set(name for name, result in results if result != expected[name]))
+    for name in mismatches:
+        errMsg('concurrency: threaded result differs: {}'.format(name), quiet)
+    passed = not mismatches
+    msg('{:<16}: {:>7} jobs   {:>3} threads  {:>3} configurations  mismatches {:>3}  {:>6.2f}sec  {}'.format(
+        'concurrency', len(work), threadCount, len(jobs), len(mismatches), elapsedT, 'ok' if passed else 'FAIL'))
+    return passed
+
+def statsFields(text):
+    '''
+    return dict of statistics text values by label (label : value lines, labels may hold colons)
+    '''
+    fields = dict()
+    for line in text.splitlines():
+        label, sep, value = line.partition(' :')
+        if sep and label.strip() in referenceFields:
+            fields[label.strip()] = value.strip()
+    return fields
+
+def checkRollup(digits, vectorised):
+    '''
+    bin rollupPoints (one way-point a minute) at ngr precision digits, vectorised (numpy) or not
+    returns True if every square is that of its way-points' ngr & the table text reads back unchanged
+    '''
+    points = [crhTrack.wayPoint(None, None, None, None, 60.0 * i, east, north, None)
+        for i, (east, north) in enumerate(rollupPoints)]
+    saved = crhRollup.numpy
+    if not vectorised:
+        crhRollup.numpy = None
+    try:
+        squares = crhRollup.rollup(digits)
+        squares.add(points[:3])     # two windows, the last way-point carried over
+        squares.add(points[3:])
+    finally:
+        crhRollup.numpy = saved
+    expected = dict()
+    for east, north in rollupPoints:
+        ngr = crhMapFast.osgb2ngr((east, north), digits)
+        expected[ngr] = expected.get(ngr, 0) + 1
+    rows = squares.rows()
+    found = dict((ngr, points) for ngr, east, north, dwell, distance, visits, points in rows)
+    corners = all([crhMapFast.osgb2ngr((east, north), digits) == ngr for ngr, east, north in
+        [row[:3] for row in rows]])
+    table = squares.genTable().getvalue()
+    passed = found == expected and corners and crhRollup.loads(table).genTable().getvalue() == table
+    msg('{:<16}: {:>7} points  {:>2} digits  {:<10}  {:>3} squares  {}'.format('rollup', len(points), digits,
+        'numpy' if vectorised else 'python', len(rows), 'ok' if passed else 'FAIL'))
+    return passed
+
+def checkReference(blockSize):
+    '''
+    feed reference gpx to crhTrack in blocks of blockSize (0: whole file), & compare its statistics with
+    the reference output's
+    returns True if every reference field is the same
+    '''
+    with open(referenceGpx) as fileH:
+        gpxText = fileH.read()
+    with open(referenceOutput) as fileH:
+        expected = statsFields(fileH.read())
+    trk = crhTrack.track(quiet = True, tolerT = 12, tolerL = 5, tolerV = 10, precision = 8,
+        maxDeltaL = 400.0, maxDeltaV = 30.0, maxDeltaS = 250.0)
+    size = blockSize or len(gpxText)
+    for start in range(0, len(gpxText), size):
+        trk.bsvFilter(trk.feed(gpxText[start:start + size]))
+    found = statsFields(trk.genStats().getvalue())
+    mismatches = [label for label in referenceFields if found.get(label) != expected.get(label)]
+    for label in mismatches:
+        errMsg('reference: {}: {} (expected {})'.format(label, found.get(label), expected.get(label)), quiet)
+    passed = not mismatches and len(expected) == len(referenceFields)
+    msg('{:<16}: {:>7} bytes  blocks of {:>7}  {:>3} fields  mismatches {:>3}  {}'.format(
+        'reference', len(gpxText), size, len(referenceFields), len(mismatches), 'ok' if passed else 'FAIL'))
+    return passed
+
+def checkRoundTrip(gpxText):
+    '''
+    serialise statistics of gpx text (dumps) & read them back (loads)
+    returns True if the statistics text of the copy is identical (& of the same type)
+    '''
+    trk = crhTrack.track(quiet = True)
+    trk.bsvFilter(trk.feed(gpxText))
+    trk.stats.name, trk.stats.desc = roundTripName, roundTripDesc
+    expected = trk.genStats().getvalue()
+    try:
+        found = crhTrack.stats.loads(trk.stats.dumps()).genStats().getvalue()
+    except (UnicodeError, ValueError) as e:
+        errMsg('round trip: {}'.format(e), quiet)
+        found = None
+    passed = found == expected and type(found) is type(expected)
+    msg('{:<16}: {:>7} bytes  name {!r}  {}'.format('round trip', len(expected), roundTripName,
+        'ok' if passed else 'FAIL'))
+    return passed
+
+def checkMerge(gpxText):
+    '''
+    merge statistics of gpx text with those of the same track in two parts, & with those of a track
+    of differing tolerance
+    returns True if the halves combine to the whole & the differing configuration raises ValueError
+    '''
+    whole = crhTrack.track(quiet = True)
+    whole.bsvFilter(whole.feed(gpxText))
+    lines = gpxText.splitlines(True)
+    parts = list()
+    for text in (''.join(lines[:len(lines) // 2]), ''.join(lines[len(lines) // 2:])):
+        trk = crhTrack.track(quiet = True)
+        trk.feed(text)
+        parts.append(trk.stats)
+    merged = parts[0].merge(parts[1])
+    counts = merged.processed == whole.stats.processed and merged.parts == 2
+    other = crhTrack.track(quiet = True, tolerV = whole.stats.tolerV + 1)
+    other.feed(gpxText)
+    try:
+        whole.stats.merge(other.stats)
+        refused = False
+    except ValueError as e:
+        refused = 'tolerV' in str(e)
+    passed = counts and refused
+    msg('{:<16}: {:>7} points  parts {:>2}  differing tolerV {}  {}'.format('merge', merged.processed,
+        merged.parts, 'refused' if refused else 'MERGED', 'ok' if passed else 'FAIL'))
+    return passed
+
+def runTime(command, runs = startupRuns):
+    '''
+    return fastest wall clock time (sec) of runs of command (argument list), output discarded
+    '''
+    best = None
+    with open(os.devnull, 'w') as devNull:
+        for i in range(runs):
+            startT = timeit.default_timer()
+            subprocess.call(command, stdout = devNull, stderr = devNull)
+            elapsedT = timeit.default_timer() - startT
+            best = elapsedT if best is None else min(best, elapsedT)
+    return best
+
+def loadedModules(script, args):
+    '''
+    return list of deferredModules loaded by script's main() run with args in a fresh interpreter,
+    None if it did not run to completion
+    '''
+    code = ('import sys; sys.path.insert(0, {!r}); sys.argv = {!r}; import {s}; {s}.main(); '
+        'sys.stdout.write("\\nmodules:" + ",".join([m for m in {!r} if sys.modules.get(m)]) + "\\n")').format(
+        scriptDir, [script] + args, deferredModules, s = script)
+    with open(os.devnull, 'w') as devNull:
+        output = subprocess.Popen([sys.executable, '-c', code], stdout = subprocess.PIPE,
+            stderr = devNull).communicate()[0]
+    for line in output.splitlines():
+        if line.startswith('modules:'):
+            return [name for name in line[len('modules:'):].split(',') if name]
+    return None
+
+def checkStartup(script, switch, value, baseT):
+    '''
+    time single value conversion by script, less the bare interpreter start-up time baseT,
+    & list the deferred modules it loads
+    returns True if within the start-up budget & no deferred module loaded
+    '''
+    args = [switch, value, '-q']
+    elapsedT = runTime([sys.executable, os.path.join(scriptDir, script + '.py')] + args) - baseT
+    loaded = loadedModules(script, args)
+    passed = elapsedT <= startupBudget and loaded == list()
+    msg('{:<16}: {:<10} {:<3}  {:>7.1f}ms  python {:>6.1f}ms  budget {:>5.0f}ms  deferred modules loaded: {}  {}'.format(
+        'startup', script, switch, elapsedT * 1000, baseT * 1000, startupBudget * 1000,
+        'n/a' if loaded is None else ', '.join(loaded) or 'none', 'ok' if passed else 'FAIL'))
+    return passed
+
+## main program
+setProgName(progName)
+errTMsg('{} -- check fast mapping conversions against crhMap'.format(getProgName()), quiet)
+
+## process arguments
+parser = setParser()
+args = parser.parse_args()
+quiet = args.quietmode
+verbose = args.verbosemode
+randomCount = args.randomcount
+gridStep = max(args.gridstep, 1)
+seed = args.seed
+tolerM = args.tolerm
+tolerD = args.tolerd
+gridFile = args.gridfile
+threadCount = max(args.threadcount, 0)
+startupBudget = max(args.budget, 0)
+minSpeedUp = max(args.speedup, 0)
+if args.precisionmode == 'l':
+    precision = 6
+elif args.precisionmode == 'm':
+    precision = 8
+if verbose:
+    errMsg('verbose mode set', quiet)
+    errMsg('{} random points, {}km grid spacing, seed {}'.format(randomCount, gridStep, seed), quiet)
+    errMsg('tolerances: {}m, {} ngr digits ({} digit precision)'.format(tolerM, tolerD, precision), quiet)
+
+## run checks
+random.seed(seed)
+osgbPts = osgbSamples()
+latLonPts = latLonSamples()
+errMsg('')
+
+scalarWgs2osgb = lambda pts: callEach(crhMap.wgs2osgb, pts)
+scalarOsgb2ngr = lambda pts: callEach(lambda en: crhMap.osgb2ngr(en, precision), pts)
+restPts = [pt for pt in latLonPts for i in range(restRepeats)]
+paths = (
+    ('wgs2osgbCached', scalarWgs2osgb, cachedWgs2osgb, restPts, metreDiff, tolerM, 'm', 'gate'),
+    ('osgb2ngr', scalarOsgb2ngr, lambda pts: crhMapFast.osgb2ngrList(pts, precision),
+        osgbPts, digitDiff, tolerD, 'd'),
+    ('osgb2ngr(w2o)', lambda pts: scalarOsgb2ngr(scalarWgs2osgb(pts)),
+        lambda pts: crhMapFast.osgb2ngrList(crhMapFast.wgs2osgbList(pts), precision),
+        latLonPts, digitDiff, tolerD, 'd'),
+    ('osgb2ngrMulti', lambda pts: callEach(lambda en: tuple([crhMap.osgb2ngr(en, p) for p in multiPrecisions]), pts),
+        lambda pts: callEach(lambda en: crhMapFast.osgb2ngrMulti(en, multiPrecisions), pts),
+        osgbPts, multiDigitDiff, tolerD, 'd'),
+    ('ngr2osgb', lambda pts: [squareCorner(en) for en in pts],
+        lambda pts: callEach(lambda en: crhMap.ngr2osgb(crhMapFast.osgb2ngr(en, precision)), pts),
+        osgbPts, metreDiff, tolerM, 'm', None),
+    )
+if os.path.exists(gridFile):
+    shiftGrid = crhGrid.grid(gridFile)
+    gridPts = lambda pts: [None if en is None else pt for pt, en in zip(pts, crhMapFast.wgs2osgbList(pts, shiftGrid))]
+    paths += (
+        ('wgs2osgb(grid)', lambda pts: callEach(lambda ll: crhMapFast.wgs2osgb(ll, shiftGrid), pts),
+            lambda pts: crhMapFast.wgs2osgbList(pts, shiftGrid), latLonPts, metreDiff, tolerM, 'm', 'gate'),
+        ('osgb2wgs(grid)', lambda pts: callEach(lambda en: crhMapFast.osgb2wgs(en, shiftGrid), pts),
+            lambda pts: crhMapFast.osgb2wgsList(pts, shiftGrid), osgbPts, latLonDiff, tolerM, 'm', 'gate'),
+        ('grid round trip', gridPts,
+            lambda pts: crhMapFast.osgb2wgsList([en or (-1, -1) for en in crhMapFast.wgs2osgbList(pts, shiftGrid)],
+            shiftGrid), latLonPts, latLonDiff, tolerM, 'm', None),
+        )
+    if crhGrid.numpy is not None:
+        paths += (
+            ('wgs2osgbArray', lambda pts: callEach(lambda ll: crhMapFast.wgs2osgb(ll, shiftGrid), pts),
+                lambda pts: arrayPairs(crhMapFast.wgs2osgbArray(pts, shiftGrid)), latLonPts, metreDiff, tolerM, 'm'),
+            ('osgb2wgsArray', lambda pts: callEach(lambda en: crhMapFast.osgb2wgs(en, shiftGrid), pts),
+                lambda pts: arrayPairs(crhMapFast.osgb2wgsArray(pts, shiftGrid)), osgbPts, latLonDiff, tolerM, 'm'),
+            )
+    if verbose:
+        errMsg('grid mode checks: {} (numpy {})'.format(gridFile, 'used' if crhGrid.numpy else 'not available'), quiet)
+else:
+    statusErrMsg('warn', 'main', 'shift grid file not found, grid mode not checked: {}'.format(gridFile), quiet)
+demDir = tempfile.mkdtemp()
+try:
+    demFile = os.path.join(demDir, 'plane' + crhGrid.asciiExt)
+    writePlaneDem(demFile)
+    demGrid = crhGrid.elevationGrid(demFile)
+    paths += (
+        ('dem(asc plane)', lambda pts: [planeEle(en) if 0 <= en[0] <= 700000 and 0 <= en[1] <= 1300000 else None
+            for en in pts], lambda pts: sampleDem(demGrid, pts), osgbPts, lambda ref, fast: abs(ref - fast), tolerM, 'm',
+            None),
+        )
+    for path in paths:
+        if not checkPath(*path):
+            failCount += 1
+    demGrid.close()
+finally:
+    shutil.rmtree(demDir)
+if threadCount:
+    gpxText = synthGpx(trackLength)
+    jobs = [('osgb2ngrList({})'.format(p), lambda p = p: crhMapFast.osgb2ngrList(osgbPts, p)) for p in (6, 8, 10)]
+    jobs.append(('wgs2osgbCached', lambda: callEach(crhMapFast.wgs2osgbCached, latLonPts)))
+    jobs.extend([('track({})'.format(i), lambda config = config: trackJob(gpxText, config)) for i, config in enumerate((
+        dict(precision = 6),
+        dict(precision = 10, tolerT = 0, tolerL = 0, tolerV = 0),
+        dict(precision = 8, tolerT = 30, tolerL = 20, tolerV = 3, maxDeltaL = 50.0, maxDeltaV = 5.0, maxDeltaS = 10.0),
+        dict(precision = 10, time = False, tolerL = 1, tolerV = 25),
+        dict(precision = multiPrecisions),
+        ))])
+    reset = None
+    if os.path.exists(gridFile):
+        jobs.append(('wgs2osgbList(grid)', lambda: crhMapFast.wgs2osgbList(latLonPts, shiftGrid)))
+        jobs.append(('osgb2wgsList(grid)', lambda: crhMapFast.osgb2wgsList(osgbPts, shiftGrid)))
+        reset = shiftGrid.close # threads race to map the grid again
+    if not checkThreads(jobs, reset):
+        failCount += 1
+for digits in crhRollup.rollupDigits:
+    for vectorised in (False, True) if crhRollup.numpy is not None else (False,):
+        if not checkRollup(digits, vectorised):
+            failCount += 1
+if os.path.exists(referenceGpx) and os.path.exists(referenceOutput):
+    for blockSize in referenceBlocks:
+        if not checkReference(blockSize):
+            failCount += 1
+else:
+    statusErrMsg('warn', 'main', 'reference files not found, reference not checked: {}'.format(referenceOutput), quiet)
+if not checkRoundTrip(synthGpx(trackLength)):
+    failCount += 1
+if not checkMerge(synthGpx(trackLength)):
+    failCount += 1
+if startupBudget:
+    baseT = runTime([sys.executable, '-c', 'pass'])
+    for script, switch, value in startupCases:
+        if not checkStartup(script, switch, value, baseT):
+            failCount += 1
+
+## tidy up
+errMsg('')
+if failCount:
+    statusErrMsg('fatal', 'main', '{} check(s) failed'.format(failCount))
+    exit(1)
+errTMsg('{} ending normally ({:06.2f}sec)'.format(getProgName(), crhTimer.timer.stop()), quiet)
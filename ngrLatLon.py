@@ -1,27 +1,54 @@
 # ngrLatLon.py -- convert lat/long readings to NGR, or vice versa
 # v0.95 crh 07-jan-16 -- under development, based on latLon2Ngr
 # v1.00 crh 15-jan-16 -- initial release
+# v1.10 crh 19-oct-26 -- importable: options object replaces module globals, main() added
+# v1.20 crh 19-oct-26 -- compressed (.gz, .bz2, .xz, .zip) input & output files
+# v1.30 crh 19-oct-26 -- multiple ngr precisions (eg: -p l,m,h) from one projection
+# v1.40 crh 19-oct-26 -- clip to ngr square or lat/lon box
+# v1.50 crh 19-oct-26 -- fast start-up for single value conversions (deferred imports)
 
 # written on a windows platform using python v2.7
 
 #!/usr/local/bin/python
 
+## notes
+# the program can also be imported & driven in-process, eg:
+#   opts = ngrLatLon.options(precision = 10)
+#   latLon = ngrLatLon.convertNgr('SK1491882580')
+#   records, lineTtl, ignoreTtl, ngrInput = ngrLatLon.processInputFile('in.txt', opts)
+# all state is held in the options object, the module level values being defaults only
+#
+# compressed input & output files (eg: readings.bsv.gz, see crhCompress) are read & written as streams
+#
+# several ngr precisions (eg: -p l,m,h, or options(precision = (6, 8, 10))) give an ngr field for each,
+# formatted by crhMapFast.osgb2ngrMulti() from the one easting & northing
+#
+# a clip area (--clip-ngr or --clip-bbox, or options(clip = crhClip.fromNgr('SK27'))) drops file records
+# outside it: lat/lon readings are pre-tested against its lat/lon box before they are converted, & ngr
+# values are tested against an ngr square before they are converted (against a lat/lon box after)
+# file records that cannot be converted are output as n/a values, as without a clip area
+#
+# single value conversions (eg: -l 53.3399,-1.7774 or -n SK1491882580, with -q, -v, -e or -p) are
+# parsed by parseSingle() without argparse, & the file handling modules (crhFile, crhString, crhCompress,
+# csv) are only imported by the functions using them, so a one-off lookup only loads the messaging &
+# mapping modules; mapCheck.py checks the start-up time of these conversions against a budget
+
 
 #### add code to use extend argument
 #### by appending input value to output
 
-import argparse
 import re
-import csv
+import sys
 from sys import stdout, stderr, exit
 
 from crhDebug import *  # debug & messaging
-from crhFile import *   # file handling
-from crhString import * # string utilities
 import crhTimer         # timer
 import crhMap           # mapping utilities
+import crhMapFast       # fast mapping utilities
+import crhClip          # clip areas
+# argparse, csv, crhFile, crhString & crhCompress are imported when used (see notes)
 
-## essential variables
+## essential variables (defaults, see options class)
 progName = 'ngrLatLon'
 crhMap.fatalException = False   # handle invalid lat/lon values
 extend = False  # generate extended output data
@@ -29,14 +56,41 @@ quiet = False   # less output (quiet & verbose are not mutually exclusive)
 verbose = False # more output
 bsv = True      # generate bar separated value records, or csv records if false
 auto = False    # output file name based on input file name (.txt extension)
-inputFile = None
-outputFile = None
-outputH = None
+compress = ''   # compression extension of auto-named output file ('': not compressed)
 precision = 8   # output ngr precision (default: medium precision)
-lineTtl = ignoreTtl = 0
-ngr2LatLon = None   # set True or False when processing input file
+clip = None     # clip area (crhClip.clip) file records are restricted to (None: not used)
 
 gridRef  = re.compile(r'^[A-Za-z]{2}(\d{4}|\d{6}|\d{8}|\d{10})$')
+singleFlags = {'-q': 'quietmode', '--quiet': 'quietmode', '-v': 'verbosemode', '--verbose': 'verbosemode',
+    '-e': 'extendmode', '--extend': 'extendmode'}
+singleValues = {'-l': 'latlon', '--latlon': 'latlon', '-n': 'ngr', '--ngr': 'ngr',
+    '-p': 'precisionmode', '--precision': 'precisionmode'}
+
+## define classes
+class options(object):
+    '''
+    conversion options, initially the module defaults above
+    keyword arguments override the defaults (eg: options(extend = True, precision = 10))
+    '''
+    def __init__(self, **kwargs):
+        for name in ('extend', 'quiet', 'verbose', 'bsv', 'auto', 'compress', 'precision', 'clip'):
+            setattr(self, name, globals()[name])
+        for name, value in kwargs.items():
+            if not hasattr(self, name):
+                raise TypeError('unknown ngrLatLon option: {}'.format(name))
+            setattr(self, name, value)
+
+class singleArgs(object):
+    '''
+    parsed arguments of a single value conversion (see parseSingle), setParser() defaults otherwise
+    '''
+    def __init__(self, **kwargs):
+        self.infile = self.latlon = self.ngr = ''
+        self.outfile = self.absoutfile = self.compressmode = self.clipngr = self.clipbbox = None
+        self.automode = self.extendmode = self.csvmode = self.quietmode = self.verbosemode = False
+        self.precisionmode = 'm'
+        for name, value in kwargs.items():
+            setattr(self, name, value)
 
 ## define functions
 def tuple2csv(tpl):
@@ -64,6 +118,7 @@ def setParser():
     '''
     set up argparser object & return it
     '''
+    import argparse
     parse = argparse.ArgumentParser(description="convert lat/long readings to NGR, or vice versa")
     inputMode = parse.add_mutually_exclusive_group(required = True) # use either -i or -l
     inputMode.add_argument('-i', '--input', action = "store", dest = "infile",
@@ -79,48 +134,79 @@ def setParser():
         help="full output filename path (eg: d:\\out.txt)")
     outfile.add_argument('-a', '--auto', action = "store_true", dest = "automode",
         help="use output file derived from input file name")
+    parse.add_argument('-z', '--compress', action="store", dest="compressmode",
+        help="compress auto-named (-a) output file", choices=['gz','bz2','xz','zip'])
     parse.add_argument('-e', '--extend', action="store_true", dest="extendmode",
         help="extended output data generated")
     parse.add_argument('-c', '--csv', action = "store_true", dest = "csvmode",
         help="generate csv output records (default: bsv records)")
     parse.add_argument('-p', '--precision', action = "store", dest = "precisionmode",
-        help="set output national grid reference precision", choices = ['l','m','h'], default = 'm')
+        help="set output national grid reference precision: l, m or h (eg: l,m,h for a field per precision)",
+        default = 'm')
+    clipArea = parse.add_mutually_exclusive_group()
+    clipArea.add_argument('--clip-ngr', action="store", dest="clipngr",
+        help="only output records inside given national grid square (eg: SK27 or SK2070)")
+    clipArea.add_argument('--clip-bbox', action="store", dest="clipbbox",
+        help="only output records inside given lat/lon box (min lat,min lon,max lat,max lon)")
     parse.add_argument('-q', '--quiet', action = "store_true", dest = "quietmode",
         help="suppress some program messages")
     parse.add_argument('-v', '--verbose', action = "store_true", dest = "verbosemode",
         help = "generate additional program messages")
     return parse
 
-def setInputFile():
+def parseSingle(argv = None):
+    '''
+    return singleArgs for a single value conversion (eg: -l 53.3399,-1.7774 -q) without argparse,
+    None for any other arguments (including errors & help), which are left to setParser()
     '''
-    set & check input file
+    argv = list(sys.argv[1:] if argv is None else argv)
+    values = dict()
+    while argv:
+        arg = argv.pop(0)
+        if arg in singleFlags and singleFlags[arg] not in values:
+            values[singleFlags[arg]] = True
+        elif arg in singleValues and singleValues[arg] not in values and argv and not argv[0].startswith('-'):
+            values[singleValues[arg]] = argv.pop(0)
+        else:
+            return None
+    if ('latlon' in values) == ('ngr' in values):   # one of -l or -n required
+        return None
+    return singleArgs(**values)
+
+def setInputFile(args, opts):
     '''
-    global inputFile
+    set & check input file, return it
+    '''
+    from crhFile import osPath, splitFileCmpnt, accessFile
     inputFile = osPath(args.infile)
     (inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
     if inExt == '': # no extension given
-        statusErrMsg('fatal', 'args', 'input file {} has no extension'.format(inName), quiet)
+        statusErrMsg('fatal', 'args', 'input file {} has no extension'.format(inName), opts.quiet)
         exit(1)
     inputFile = osPath(inDrive + inPath + '/' + inName + inExt)
     if not accessFile(inputFile, 'fOK'):
         statusErrMsg("fatal", "args", "file does not exist: {}".format(inputFile))
         exit(1)
     elif not accessFile(inputFile, 'rOK'):
-        statusErrMsg('fatal', 'args', 'file cannot be opened for read access: {}'.format(bsvFile))
+        statusErrMsg('fatal', 'args', 'file cannot be opened for read access: {}'.format(inputFile))
         exit(1)
-    errMsg('input file: {}'.format(inputFile), quiet)
+    errMsg('input file: {}'.format(inputFile), opts.quiet)
+    return inputFile
 
-def setOutputFile():
+def setOutputFile(args, opts, inputFile):
     '''
-    set & check output file
+    set & check output file, return it (None if not specified)
     '''
-    global outputFile
-    if auto:
+    from crhFile import osPath, splitFileCmpnt, accessFile
+    import crhCompress
+    quiet = opts.quiet
+    verbose = opts.verbose
+    outputFile = None
+    if opts.auto:
         errMsg('auto mode (output file name) triggered', quiet)
         if verbose: errMsg('output file derived from input file name', quiet)
         # note that output file derived from input param so may vary in case from input file name
-        (outDrive, outPath, outName, outExt) = splitFileCmpnt(inputFile)
-        outputFile = osPath(outDrive + outPath + '/' + outName + '.txt')
+        outputFile = osPath(crhCompress.autoName(inputFile, '.txt', opts.compress))
     elif args.absoutfile:
         outputFile = osPath(args.absoutfile)
         (outDrive, outPath, outName, outExt) = splitFileCmpnt(outputFile)
@@ -133,7 +219,7 @@ def setOutputFile():
         (outDrive, outPath, outName, outExt) = splitFileCmpnt(outputFile)
         (inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
         outputFile = osPath(inDrive + inPath + '/' + outName + outExt)
-    if auto or args.outfile or args.absoutfile:
+    if outputFile is not None:
         errMsg('output file: {}'.format(outputFile), quiet)
         if inputFile == outputFile:
             statusErrMsg("fatal", "args", "input and output file names identical")
@@ -148,236 +234,337 @@ def setOutputFile():
                 statusErrMsg("warn", "args", "overwriting file: {}".format(outputFile), quiet)
     elif verbose:
         errMsg('no output file specified', quiet)
+    return outputFile
+
+def multiPrecision(precision):
+    '''
+    return True if precision is a sequence of ngr precisions rather than a single one
+    '''
+    return not isinstance(precision, (int, long))
+
+def convertLatLon(latLon, precision = precision):
+    '''
+    convert (lat, lon) to osgb (east, west) & ngr
+    returns tuple of east, west tuple & ngr (None if invalid),
+    ngr being a tuple of ngr values if precision is a sequence of precisions
+    '''
+    eastWest = crhMap.wgs2osgb(latLon)
+    try:
+        if multiPrecision(precision):
+            ngr = crhMapFast.osgb2ngrMulti(eastWest, precision)
+        else:
+            ngr = crhMap.osgb2ngr(eastWest, precision)
+    except RuntimeError:
+        ngr = None
+    return eastWest, ngr
+
+def ngrFields(ngr, precision = precision):
+    '''
+    return list of ngr output field values for ngr returned by convertLatLon() ('n/a' if invalid)
+    '''
+    count = len(precision) if multiPrecision(precision) else 1
+    if ngr is None:
+        return ['n/a'] * count
+    return list(ngr) if multiPrecision(precision) else [ngr]
+
+def convertNgr(ngr):
+    '''
+    convert ngr to (lat, lon), None if invalid
+    '''
+    if not gridRef.match(ngr) or not crhMap.validNGR(ngr):
+        return None
+    return crhMap.osgb2wgs(ngr)
+
+def insideClip(clipArea, latLon = None, eastWest = None, ngr = None):
+    '''
+    return True if a reading is inside clip area (crhClip.clip), given its (lat, lon),
+    its (east, west) or its ngr (tested against the south west corner of the square it gives)
+    '''
+    if latLon is not None and not clipArea.preTest(latLon[0], latLon[1]):
+        return False
+    if ngr is not None:
+        eastWest = crhClip.ngrSquare(ngr)[:2]
+    return eastWest is None or clipArea.contains(eastWest[0], eastWest[1])
 
-def processInputFile(inputFile):
+def processInputFile(inputFile, opts):
     '''
     determine whether lat/lon or ngr input file & process it
     assumed in csv or bsv format for lat/lon values
-    returns tuple of lat/long values tuples or tuple of ngr values, total line count and ignored line count
+    returns tuple of lat/long values tuples or tuple of ngr values, total line count, ignored line count
+    and whether ngr values given in input file
     actual elements in tuples depends on whether ngr or lat/long values given in input file
+    lines outside opts.clip (if set) are dropped, neither output nor counted as ignored
+    raises RuntimeError if lat/lon input file neither bsv nor csv
     '''
-    global ngr2LatLon
-    lineCount = ignoreCount = 0
-    lineLst = list()
+    import csv
+    import crhCompress
+    from crhString import singural
+    lineCount = ignoreCount = clipCount = 0
     currentLineLst = list()
-    bsvInput = True
-    for line in fileLineGen(inputFile): # crude ngr or lat/lon bsv/csv check
+    ngr2LatLon = False
+    sepChar = '|'
+    for line in crhCompress.lineGen(inputFile): # crude ngr or lat/lon bsv/csv check
         if gridRef.match(line):
             ngr2LatLon = True
-            errMsg('ngr input file...', quiet)
+            errMsg('ngr input file...', opts.quiet)
         else:
-            ngr2LatLon = False
             bsvInput = '|' in line
             if not bsvInput:
                 if not ',' in line:
-                    statusErrMsg('fatal', 'processInputFile', 'unable to process input file: {}'.format(inputFile))
-                    exit(1)
+                    raise RuntimeError('unable to process input file: {}'.format(inputFile))
             if bsvInput:
-                errMsg('lat/lon input file (bsv)...', quiet)
+                errMsg('lat/lon input file (bsv)...', opts.quiet)
                 sepChar = '|'
             else:
-                errMsg('lat/lon input file (csv)...', quiet)
+                errMsg('lat/lon input file (csv)...', opts.quiet)
                 sepChar = ','
         break
     if ngr2LatLon:  # process the ngr input file
-        for line in fileLineGen(inputFile):
+        for line in crhCompress.lineGen(inputFile):
             lineCount += 1
             if gridRef.match(line):
-                if crhMap.validNGR(line):
-                    latLonTpl = crhMap.osgb2wgs(line)
-                    if extend:
+                if opts.clip is not None and crhMap.validNGR(line) and not insideClip(opts.clip, ngr = line):
+                    clipCount += 1
+                    continue
+                latLonTpl = convertNgr(line)
+                if latLonTpl is not None and opts.clip is not None and not insideClip(opts.clip, latLonTpl):
+                    clipCount += 1
+                    continue
+                if latLonTpl is not None:
+                    if opts.extend:
                         latLonTpl = (line, str(latLonTpl[0]), str(latLonTpl[1]))
                     else:
                         latLonTpl = (str(latLonTpl[0]), str(latLonTpl[1]))
                 else:
-                    if verbose:
-                        errMsg('East, West >>>> Invalid input ({})'.format(lineCount), quiet)
-                    if extend:
+                    if opts.verbose:
+                        errMsg('East, West >>>> Invalid input ({})'.format(lineCount), opts.quiet)
+                    if opts.extend:
                         latLonTpl = (line, 'n/a', 'n/a')
                     else:
                         latLonTpl = ('n/a', 'n/a')
             else:
                 ignoreCount += 1
-                if extend:
+                if opts.extend:
                     latLonTpl = (line, 'n/a', 'n/a')
                 else:
                     latLonTpl = ('n/a', 'n/a')
             currentLineLst.append(latLonTpl)
     else:   # process the lan/lon input file
-        with open(inputFile, 'rb') as f:
+        with crhCompress.openInput(inputFile) as f:
             inputReader = csv.reader(f, delimiter = sepChar)
             for lineLst in inputReader:
                 lineCount += 1
                 if len(lineLst) == 2:
-                    latLonLst = [float(lineLst[0]), float(lineLst[1])]
-                    eastWest = crhMap.wgs2osgb(latLonLst)
-                    try:
-                        outputNgr = crhMap.osgb2ngr(eastWest, precision)
-                    except RuntimeError as re:
-                        if verbose:
-                            errMsg('invalid input (line {}): {}'.format(lineCount, str(lineLst), quiet))
-                        outputNgr = 'n/a'
-                    if extend:
-                        currentLineLst.append((lineLst[0], lineLst[1], outputNgr))
+                    latLon = [float(lineLst[0]), float(lineLst[1])]
+                    if opts.clip is not None and not insideClip(opts.clip, latLon):
+                        clipCount += 1
+                        continue
+                    eastWest, outputNgr = convertLatLon(latLon, opts.precision)
+                    if opts.clip is not None and not insideClip(opts.clip, eastWest = eastWest):
+                        clipCount += 1
+                        continue
+                    if outputNgr is None:
+                        if opts.verbose:
+                            errMsg('invalid input (line {}): {}'.format(lineCount, str(lineLst)), opts.quiet)
+                    if opts.extend:
+                        currentLineLst.append(tuple([lineLst[0], lineLst[1]] + ngrFields(outputNgr, opts.precision)))
                     else:
-                        currentLineLst.append((outputNgr,))
+                        currentLineLst.append(tuple(ngrFields(outputNgr, opts.precision)))
                 else:
                     ignoreCount += 1
-                    errMsg('invalid input (line {}): {}'.format(lineCount, str(lineLst), quiet))
-                    if extend:
-                        lineLst.append('n/a')
-                        currentLineLst.append(tuple(lineLst))
+                    errMsg('invalid input (line {}): {}'.format(lineCount, str(lineLst)), opts.quiet)
+                    if opts.extend:
+                        currentLineLst.append(tuple(lineLst + ngrFields(None, opts.precision)))
                     else:
-                        currentLineLst.append(('n/a',))
-    return tuple(currentLineLst), lineCount, ignoreCount
+                        currentLineLst.append(tuple(ngrFields(None, opts.precision)))
+    if opts.clip is not None:
+        errMsg(singural(clipCount, ' file line', ' file lines', '', ' clipped'), opts.quiet)
+    return tuple(currentLineLst), lineCount, ignoreCount, ngr2LatLon
 
-def processOutputFile(outputLineLst):
+def formatRecord(line, ngr2LatLon, opts):
+    '''
+    return output string for tuple of values: single ngr value, or bsv (or csv) record
+    '''
+    if not ngr2LatLon and not opts.extend and len(line) == 1:
+        return line[0]
+    elif opts.bsv:
+        return tuple2bsv(line)
+    return tuple2csv(line)
+
+def processOutputFile(outputLineLst, outputFile, opts):
     '''
     put contents of outputLineLst into output file
+    raises IOError if output file cannot be opened
     '''
-    global outputH, outputFile, bsv
-    outputH = openFile(outputFile, 'wt')
+    import crhCompress
+    outputH = crhCompress.openOutput(outputFile, 'wt')
     if outputH is None:
-        statusErrMsg('fatal', 'processOutputFile()', 'error opening output file {}'.format(outputFile))
-        exit(1)
-    else:
-        statusErrMsg('info', 'processOutputFile()', 'output file opened: {}'.format(outputFile), quiet)
+        raise IOError('error opening output file {}'.format(outputFile))
+    statusErrMsg('info', 'processOutputFile()', 'output file opened: {}'.format(outputFile), opts.quiet)
     for line in outputLineLst:
-        if bsv:
+        if opts.bsv:
             outputH.write(tuple2bsv(line) + '\n')
         else:
             outputH.write(tuple2csv(line) + '\n')
     outputH.close()
-    outputH = None
 
-## main program
-setProgName(progName)
-errTMsg('{} -- process latitude, longitude data to provide OS NGR data, or vice versa'.format(getProgName()), quiet)
-
-## process arguments
-parser = setParser()
-args = parser.parse_args()
-quiet = args.quietmode
-errTMsg('{} -- convert latitude, longitude data to OS NGR data, or vice versa'.format(getProgName()), quiet)
-verbose = args.verbosemode
-extend = args.extendmode
-auto = args.automode
-
-if verbose:
-    errMsg('verbose mode set', quiet)
-if args.csvmode and args.infile != '':
-    bsv = False
-    errMsg('csv mode set', quiet)
-    if verbose:
-        errMsg('output csv records', quiet)
-elif args.infile != '':
-    errMsg('bsv mode set (default)', quiet)
-    if verbose:
-        errMsg('output bsv records', quiet)
-if extend:
-    errMsg('extended mode set', quiet)
-    if verbose:
-        errMsg('output extended field records', quiet)
-elif verbose:
-    errMsg('output default field records', quiet)
-if args.ngr == '' and args.precisionmode == 'l':
-    precision = 6
-    errMsg('low ngr precision set', quiet)
-    if verbose:
-        errMsg('output national grid reference precision is 100m', quiet)
-elif args.ngr == '' and args.precisionmode == 'h':
-    precision = 10
-    errMsg('high ngr precision set', quiet)
-    if verbose:
-        errMsg('output national grid reference precision is 1m', quiet)
-elif args.ngr == '':
-    errMsg('medium ngr precision set (default)', quiet)
-    if verbose:
-        errMsg('output national grid reference precision is 10m', quiet)
-else:
-    errMsg('ngr precision ignored', quiet)
-    if verbose:
-        errMsg('ngr precision applies to ngr output only', quiet)
-if args.infile != '':   # input file (i) argument provided
-    setInputFile()
-    setOutputFile()
-elif args.automode or args.absoutfile or args.outfile:
-    errMsg('output file arguments ignored', quiet)
+def setOptions(args):
+    '''
+    return options object set from parsed command line arguments, reporting them
+    '''
+    opts = options(quiet = args.quietmode, verbose = args.verbosemode, extend = args.extendmode,
+        auto = args.automode)
+    quiet = opts.quiet
+    verbose = opts.verbose
     if verbose:
-        errMsg('output sent to screen (stdout)', quiet)    
-
-## process data
-errMsg('')
-
-if args.latlon != '':   # lat/lon (l) argument provided
-    errMsg('single lat/lon reading provided...', quiet)
-    latLon = args.latlon.split('|')
-    if len(latLon) == 1:    # not bsv record
-        latLon = args.latlon.split(',')
-        if len(latLon) == 1:    # not csv record either
-            statusErrMsg('fatal', 'args', 'lat/lon value must be either a csv or bsv pair: {}'.format(args.latlon))
-            exit(1)
-    latLon = tuple([float(latLon[0]), float(latLon[1])])
-    msg('Lat, Lon   >>>> {}'.format(latLon))
-    eastWest = crhMap.wgs2osgb(latLon)
-    msg('East, West >>>> {}'.format(eastWest), quiet)
-    try:
-        outputNgr = crhMap.osgb2ngr(eastWest, precision)
-        msg('NGR        >>>> {}'.format(outputNgr))
-    except RuntimeError as re:
-        msg('NGR        >>>> Invalid input!')
-elif args.ngr != '':   # ngr (n) argument provided
-    errMsg('single ngr provided...', quiet)
-    ngr = args.ngr
-    msg('NGR          >>>> {}'.format(ngr))
+        errMsg('verbose mode set', quiet)
+    if args.csvmode and args.infile != '':
+        opts.bsv = False
+        errMsg('csv mode set', quiet)
+        if verbose:
+            errMsg('output csv records', quiet)
+    elif args.infile != '':
+        errMsg('bsv mode set (default)', quiet)
+        if verbose:
+            errMsg('output bsv records', quiet)
+    if opts.extend:
+        errMsg('extended mode set', quiet)
+        if verbose:
+            errMsg('output extended field records', quiet)
+    elif verbose:
+        errMsg('output default field records', quiet)
     try:
-        eastWest = crhMap.ngr2osgb(ngr)
-        msg('East, West   >>>> {}'.format(eastWest), quiet)
-    except RuntimeError as re:
-        msg('East, West   >>>> Invalid input!')
-        eastWest = None
-    if eastWest is not None:
-        outputLatLon = crhMap.osgb2wgs(ngr)
-        msg('Lat, Lon     >>>> {}'.format(outputLatLon))
-else:   # input file argument provided
-    processed, lineTtl, ignoreTtl = processInputFile(inputFile)
-    if outputFile is None:
-        msg('\n>>>>no output file specified...')
-        for line in processed:
-            if not ngr2LatLon:
-                if extend:
-                    if bsv:
-                        msg(tuple2bsv(line))
-                    else:
-                        msg(tuple2csv(line))
-                else:
-                    msg(line[0])
-            elif bsv:
-                msg(tuple2bsv(line))
+        precisions = crhMapFast.ngrPrecisions(args.precisionmode)
+    except ValueError as e:
+        statusErrMsg('fatal', 'args', str(e))
+        exit(1)
+    if args.ngr == '' and len(precisions) > 1:
+        opts.precision = precisions
+        errMsg('multiple ngr precisions set: {} digits'.format(', '.join([str(p) for p in precisions])), quiet)
+        if verbose:
+            errMsg('output national grid reference field for each precision', quiet)
+    elif args.ngr == '' and precisions == (6,):
+        opts.precision = 6
+        errMsg('low ngr precision set', quiet)
+        if verbose:
+            errMsg('output national grid reference precision is 100m', quiet)
+    elif args.ngr == '' and precisions == (10,):
+        opts.precision = 10
+        errMsg('high ngr precision set', quiet)
+        if verbose:
+            errMsg('output national grid reference precision is 1m', quiet)
+    elif args.ngr == '':
+        errMsg('medium ngr precision set (default)', quiet)
+        if verbose:
+            errMsg('output national grid reference precision is 10m', quiet)
+    else:
+        errMsg('ngr precision ignored', quiet)
+        if verbose:
+            errMsg('ngr precision applies to ngr output only', quiet)
+    if args.clipngr or args.clipbbox:
+        try:
+            opts.clip = crhClip.fromNgr(args.clipngr) if args.clipngr else crhClip.fromBox(args.clipbbox)
+        except ValueError as e:
+            statusErrMsg('fatal', 'args', 'unable to use clip area: {}'.format(e))
+            exit(1)
+        errMsg('clip mode set: {}'.format(opts.clip.spec), quiet)
+        if verbose:
+            errMsg('only records inside clip area output', quiet)
+    if args.compressmode:
+        opts.compress = '.' + args.compressmode
+        errMsg('compress mode set: {}'.format(opts.compress), quiet)
+        if not opts.auto:
+            statusErrMsg('warn', 'args', 'compress switch ignored (output file not auto-named)', quiet)
+    return opts
+
+def main(argv = None):
+    '''
+    command line program: convert lat/lon reading, ngr or file as set by arguments (default: sys.argv)
+    '''
+    setProgName(progName)
+    errTMsg('{} -- process latitude, longitude data to provide OS NGR data, or vice versa'.format(getProgName()), quiet)
+
+    ## process arguments
+    args = parseSingle(argv) or setParser().parse_args(argv)
+    errTMsg('{} -- convert latitude, longitude data to OS NGR data, or vice versa'.format(getProgName()),
+        args.quietmode)
+    opts = setOptions(args)
+    inputFile = outputFile = None
+    if args.infile != '':   # input file (i) argument provided
+        inputFile = setInputFile(args, opts)
+        outputFile = setOutputFile(args, opts, inputFile)
+    elif args.automode or args.absoutfile or args.outfile:
+        errMsg('output file arguments ignored', opts.quiet)
+        if opts.verbose:
+            errMsg('output sent to screen (stdout)', opts.quiet)
+
+    ## process data
+    errMsg('')
+
+    if args.latlon != '':   # lat/lon (l) argument provided
+        errMsg('single lat/lon reading provided...', opts.quiet)
+        latLon = args.latlon.split('|')
+        if len(latLon) == 1:    # not bsv record
+            latLon = args.latlon.split(',')
+            if len(latLon) == 1:    # not csv record either
+                statusErrMsg('fatal', 'args', 'lat/lon value must be either a csv or bsv pair: {}'.format(args.latlon))
+                exit(1)
+        latLon = tuple([float(latLon[0]), float(latLon[1])])
+        msg('Lat, Lon   >>>> {}'.format(latLon))
+        eastWest, outputNgr = convertLatLon(latLon, opts.precision)
+        msg('East, West >>>> {}'.format(eastWest), opts.quiet)
+        if opts.clip is not None and not insideClip(opts.clip, latLon, eastWest):
+            msg('NGR        >>>> Outside clip area!')
+        elif outputNgr is not None:
+            msg('NGR        >>>> {}'.format(', '.join(ngrFields(outputNgr, opts.precision))))
+        else:
+            msg('NGR        >>>> Invalid input!')
+    elif args.ngr != '':   # ngr (n) argument provided
+        errMsg('single ngr provided...', opts.quiet)
+        ngr = args.ngr
+        msg('NGR          >>>> {}'.format(ngr))
+        try:
+            eastWest = crhMap.ngr2osgb(ngr)
+            msg('East, West   >>>> {}'.format(eastWest), opts.quiet)
+        except RuntimeError as re:
+            msg('East, West   >>>> Invalid input!')
+            eastWest = None
+        if eastWest is not None:
+            outputLatLon = crhMap.osgb2wgs(ngr)
+            if opts.clip is not None and not insideClip(opts.clip, outputLatLon, eastWest):
+                msg('Lat, Lon     >>>> Outside clip area!')
             else:
-                msg(tuple2csv(line))
-    else:   # output to stdErr (possibly) & then to file
-        if verbose: # output to stdErr
-            errMsg('')
+                msg('Lat, Lon     >>>> {}'.format(outputLatLon))
+    else:   # input file argument provided
+        try:
+            processed, lineTtl, ignoreTtl, ngr2LatLon = processInputFile(inputFile, opts)
+        except RuntimeError as e:
+            statusErrMsg('fatal', 'processInputFile', str(e))
+            exit(1)
+        if outputFile is None:
+            msg('\n>>>>no output file specified...')
             for line in processed:
-                if not ngr2LatLon:
-                    if extend:
-                        if bsv:
-                            errMsg(tuple2bsv(line))
-                        else:
-                            errMsg(tuple2csv(line))
-                    else:
-                        msg(line[0])
-                elif bsv:
-                    errMsg(tuple2bsv(line))
-                else:
-                    errMsg(tuple2csv(line))
-        processOutputFile(processed)    # output to file
-
-## tidy up
-if args.infile != '':
-    errMsg(singural(lineTtl, ' file line', ' file lines', '\n', ' processed'), quiet)
-    if ignoreTtl:
-        errMsg(singural(ignoreTtl, ' file line', ' file lines', '', ' ignored'), quiet)
-errMsg('')
-errTMsg('{} ending normally ({:06.2f}sec)'.format(getProgName(), crhTimer.timer.stop()), quiet)
+                msg(formatRecord(line, ngr2LatLon, opts))
+        else:   # output to stdErr (possibly) & then to file
+            if opts.verbose: # output to stdErr
+                errMsg('')
+                for line in processed:
+                    errMsg(formatRecord(line, ngr2LatLon, opts))
+            try:
+                processOutputFile(processed, outputFile, opts)    # output to file
+            except IOError as e:
+                statusErrMsg('fatal', 'processOutputFile()', str(e))
+                exit(1)
+
+    ## tidy up
+    if args.infile != '':
+        from crhString import singural
+        errMsg(singural(lineTtl, ' file line', ' file lines', '\n', ' processed'), opts.quiet)
+        if ignoreTtl:
+            errMsg(singural(ignoreTtl, ' file line', ' file lines', '', ' ignored'), opts.quiet)
+    errMsg('')
+    errTMsg('{} ending normally ({:06.2f}sec)'.format(getProgName(), crhTimer.timer.stop()), opts.quiet)
+
+## main program
+if __name__ == '__main__':
+    main()
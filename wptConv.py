@@ -0,0 +1,275 @@
+# wptConv.py -- convert gpx & bsv way-point data to & from compact binary way-point files
+# v1.00 crh 19-oct-26 -- initial release
+
+# written for python v2.7
+
+#!/usr/local/bin/python
+
+## notes
+# the conversion is set by the input & output file extensions (see crhWpt for the binary format):
+#   .gpx -> .wpt   way-points retained as for gpxRdngs bsv records (t & l tolerances applied)
+#   .bsv -> .wpt   bsv records (eg: gpxRdngs -b output, any other lines are ignored)
+#   .wpt -> .bsv   bsv records, as output by gpxRdngs -b (-d adds the delta fields)
+# as in gpxRdngs, -d disables the l tolerance, so .wpt files for delta output are written with -d too
+#   .wpt -> .gpx   gpx xml markup, as output by gpxRdngs -x (-r route, -c compact)
+# an auto-named (-a) output file is .wpt for gpx/bsv input, .bsv (or .gpx with -x) for .wpt input
+# input & output files may be compressed (eg: route.gpx.gz, see crhCompress)
+# the ngr values are rebuilt from the easting & northing at the precision held in the .wpt file,
+# unless another precision is given
+# the program can also be imported, all state being held in the options object
+
+import argparse
+import os
+from sys import stdout, stderr, exit
+
+from crhDebug import *  # debug & messaging
+from crhFile import *   # file handling
+import crhTimer         # timer
+import crhTrack         # streaming gpx processing
+import crhCompress      # compressed files
+import crhWpt           # binary way-point files
+
+## essential variables (defaults, see options class)
+progName = 'wptConv'
+quiet = False   # less output (quiet & verbose are not mutually exclusive)
+verbose = False # more output
+auto = False    # output file name based on input file name
+xml = False     # auto-named output from .wpt input is gpx xml rather than bsv records
+route = False   # generate route (rather than track) gpx xml markup
+compact = False # generate compact (ie: not pretty) gpx xml markup
+delta = False   # include delta values in bsv records
+time = True     # process gpx time data
+tolerT = 12 # minimum acceptable time difference between consecutive gpx way-points
+tolerL = 5  # minimum acceptable length difference between consecutive bsv way-points
+tolerV = 10 # minimum height difference used in cumulative gain/loss (recorded in .wpt header)
+precision = None    # ngr precision (None: 8 digits, or as held in .wpt file)
+blockSize = crhWpt.blockPoints  # way-points per .wpt block
+
+## define classes
+class options(object):
+    '''
+    conversion options, initially the module defaults above
+    keyword arguments override the defaults (eg: options(tolerT = 0, precision = 10))
+    '''
+    def __init__(self, **kwargs):
+        for name in ('quiet', 'verbose', 'auto', 'xml', 'route', 'compact', 'delta', 'time',
+                'tolerT', 'tolerL', 'tolerV', 'precision', 'blockSize'):
+            setattr(self, name, globals()[name])
+        for name, value in kwargs.items():
+            if not hasattr(self, name):
+                raise TypeError('unknown wptConv option: {}'.format(name))
+            setattr(self, name, value)
+
+## define functions
+def setParser():
+    '''
+    set up argparser object & return it
+    '''
+    parse = argparse.ArgumentParser(description="convert gpx & bsv way-point data to & from binary way-point files")
+    parse.add_argument('-i', '--input', action="store", dest="infile",
+        help="input filename (eg: d:\\data\\in.gpx, in.bsv or in.wpt)", required=True)
+    outfile = parse.add_mutually_exclusive_group(required=True) # use one of -o, -O & -a
+    outfile.add_argument('-o', '--output', action="store", dest="outfile",
+        help="relative output filename (eg: out.wpt)")
+    outfile.add_argument('-O', '--Output', action="store", dest="absoutfile",
+        help="full output filename path (eg: d:\\out.wpt)")
+    outfile.add_argument('-a', '--auto', action="store_true", dest="automode",
+        help="use output file derived from input file name")
+    parse.add_argument('-x', '--xml', action="store_true", dest="xmlmode",
+        help="auto-named output from .wpt input is gpx xml (default: bsv records)")
+    parse.add_argument('-r', '--route', action="store_true", dest="routemode",
+        help="generate route gpx xml markup")
+    parse.add_argument('-c', '--compact', action="store_true", dest="compactmode",
+        help="generate compact gpx xml output")
+    parse.add_argument('-d', '--delta', action="store_true", dest="deltamode",
+        help="include delta values in bsv records")
+    parse.add_argument('-t', '--time', action="store_true", dest="timemode",
+        help="ignore gpx time data")
+    parse.add_argument('-p', '--precision', action="store", dest="precisionmode",
+        help="set national grid reference precision (default: as .wpt file)", choices=['l','m','h'])
+    parse.add_argument('-T', '--timetoler', action="store", dest="ttmode",
+        help="way-point time delta tolerance (0: disable)", default = tolerT, type = int)
+    parse.add_argument('-L', '--lengthtoler', action="store", dest="ltmode",
+        help="bsv length delta tolerance (0: disable)", default = tolerL, type = int)
+    parse.add_argument('-H', '--heighttoler', action="store", dest="htmode",
+        help="cumulative height gain/loss tolerance (0: disable)", default = tolerV, type = int)
+    parse.add_argument('-q', '--quiet', action="store_true", dest="quietmode",
+        help="suppress some program messages")
+    parse.add_argument('-v', '--verbose', action="store_true", dest="verbosemode",
+        help="generate additional program messages")
+    return parse
+
+def dataExt(fileName):
+    '''
+    return lower case data extension of (possibly compressed) file name
+    '''
+    return crhCompress.splitExt(fileName)[1].lower()
+
+def bsvPointGen(inputFile):
+    '''
+    yield crhTrack.wayPoint for each bsv record in (bsv or gpxRdngs output) file, other lines ignored
+    '''
+    for line in crhCompress.lineGen(inputFile):
+        fields = line.split('|')
+        if len(fields) < 7 or fields[0] == 'latitude':
+            continue
+        try:
+            lat, lon = float(fields[0]), float(fields[1])
+            ele = float(fields[2]) if fields[2] else None
+            east = int(fields[4]) if fields[4] else None
+            north = int(fields[5]) if fields[5] else None
+        except ValueError:
+            continue
+        timestamp = fields[3] or None
+        yield crhTrack.wayPoint(lat, lon, ele, timestamp, crhTrack.isoSecs(timestamp) if timestamp else None,
+            east, north, fields[6])
+
+def toWpt(inputFile, outputH, opts):
+    '''
+    write gpx (or bsv) input file way-points to open output file as binary way-point file
+    returns crhWpt.writer (way-point count & bytes written)
+    '''
+    wptW = crhWpt.writer(outputH, opts.tolerT, opts.tolerL, opts.tolerV, opts.precision or 8,
+        blockSize = opts.blockSize)
+    if dataExt(inputFile) == '.gpx':
+        trk = crhTrack.track(opts.time, tolerT = opts.tolerT, tolerL = opts.tolerL, tolerV = opts.tolerV,
+            precision = opts.precision or 8, quiet = opts.quiet)
+        with crhCompress.openInput(inputFile) as f:
+            for window in trk.windowGen(f, opts.blockSize):
+                wptW.name, wptW.desc = trk.reader.name, trk.reader.desc
+                for point, deltaL, deltaV in trk.bsvFilter(window):
+                    wptW.add(point)
+    else:
+        for point in bsvPointGen(inputFile):
+            wptW.add(point)
+    wptW.close()
+    return wptW
+
+def fromWpt(inputFile, outputH, gpx, opts):
+    '''
+    write binary way-point input file to open output file as bsv records (or gpx xml markup)
+    returns way-point count
+    '''
+    count = 0
+    with crhCompress.openInput(inputFile) as f:
+        wptR = crhWpt.reader(f)
+        trk = crhTrack.track(delta = opts.delta, tolerT = wptR.tolerT, tolerL = wptR.tolerL, tolerV = wptR.tolerV,
+            precision = opts.precision or wptR.precision)
+        trk.reader.name, trk.reader.desc = wptR.name, wptR.desc
+        trk.tolerL = 0  # l tolerance applied when written, bsvFilter() only adds the deltas
+        pretty = not opts.compact
+        if gpx:
+            outputH.write(trk.xmlHead(pretty, not opts.route))
+        else:
+            outputH.write(trk.bsvHead())
+        for window in crhTrack.windowGen(wptR.pointGen(opts.precision), opts.blockSize):
+            if gpx:
+                outputH.write(trk.xmlRows(window, pretty, not opts.route))
+            else:
+                outputH.write(trk.bsvRows(trk.bsvFilter(window)))
+            count += len(window)
+        if gpx:
+            outputH.write(trk.xmlTail(pretty, not opts.route))
+            if not pretty:
+                outputH.write('\n')  # compact markup ends the file with its only line
+    return count
+
+def convert(inputFile, outputFile, opts):
+    '''
+    convert input file to output file, as set by their extensions
+    returns (way-points converted, output bytes)
+    raises IOError if files cannot be opened, RuntimeError for invalid binary way-point data
+    '''
+    outExt = dataExt(outputFile)
+    outputH = crhCompress.openOutput(outputFile, 'wb')
+    if outputH is None:
+        raise IOError('error opening output file {}'.format(outputFile))
+    try:
+        if outExt == crhWpt.wptExt:
+            if dataExt(inputFile) == crhWpt.wptExt:
+                raise RuntimeError('input file already a binary way-point file: {}'.format(inputFile))
+            count = toWpt(inputFile, outputH, opts).count
+        elif dataExt(inputFile) == crhWpt.wptExt:
+            count = fromWpt(inputFile, outputH, outExt == '.gpx', opts)
+        else:
+            raise RuntimeError('one of input & output files must be a {} file'.format(crhWpt.wptExt))
+    finally:
+        outputH.close()
+    return count, os.path.getsize(outputFile)
+
+def setOptions(args):
+    '''
+    return options object set from parsed command line arguments, reporting them
+    '''
+    opts = options(quiet = args.quietmode, verbose = args.verbosemode, auto = args.automode, xml = args.xmlmode,
+        route = args.routemode, compact = args.compactmode, delta = args.deltamode, time = not args.timemode,
+        tolerT = args.ttmode, tolerL = args.ltmode, tolerV = args.htmode)
+    quiet = opts.quiet
+    if opts.verbose:
+        errMsg('verbose mode set', quiet)
+        errMsg('tolerances (gpx input): t {}sec, l {}m, v {}m'.format(opts.tolerT, opts.tolerL, opts.tolerV), quiet)
+    if not opts.time:
+        errMsg('ignore time mode set', quiet)
+    if opts.tolerL and opts.delta:
+        opts.tolerL = 0
+        statusErrMsg('warn', 'args', 'delta values mode active: BSV length delta mode disabled', quiet)
+        if opts.verbose: errMsg('bsv length delta mode incompatible with delta values mode', quiet)
+    if args.precisionmode:
+        opts.precision = {'l': 6, 'm': 8, 'h': 10}[args.precisionmode]
+        errMsg('ngr precision set: {} digits'.format(opts.precision), quiet)
+    return opts
+
+def setFiles(args, opts):
+    '''
+    set & check input & output file names, return them
+    '''
+    inputFile = osPath(args.infile)
+    if not accessFile(inputFile, 'fOK'):
+        statusErrMsg("fatal", "args", "file does not exist: {}".format(inputFile))
+        exit(1)
+    elif not accessFile(inputFile, 'rOK'):
+        statusErrMsg('fatal', 'args', 'file cannot be opened for read access: {}'.format(inputFile))
+        exit(1)
+    errMsg('input file: {}'.format(inputFile), opts.quiet)
+    (inDrive, inPath, inName, inExt) = splitFileCmpnt(inputFile)
+    if opts.auto:
+        if dataExt(inputFile) != crhWpt.wptExt:
+            outputFile = crhCompress.autoName(inputFile, crhWpt.wptExt)
+        else:
+            outputFile = crhCompress.autoName(inputFile, '.gpx' if opts.xml else '.bsv')
+        outputFile = osPath(outputFile)
+    elif args.absoutfile:
+        outputFile = osPath(args.absoutfile)
+    else:
+        (outDrive, outPath, outName, outExt) = splitFileCmpnt(osPath(args.outfile))
+        outputFile = osPath(os.path.join(inDrive + inPath, outName + outExt))
+    errMsg('output file: {}'.format(outputFile), opts.quiet)
+    if inputFile == outputFile:
+        statusErrMsg("fatal", "args", "input and output file names identical")
+        exit(1)
+    if opts.verbose and accessFile(outputFile, 'fOK'):
+        statusErrMsg("warn", "args", "overwriting file: {}".format(outputFile), opts.quiet)
+    return inputFile, outputFile
+
+def main(argv = None):
+    '''
+    command line program: convert file as set by arguments (default: sys.argv)
+    '''
+    setProgName(progName)
+    errTMsg('{} -- convert way-point data to & from binary way-point files'.format(getProgName()), quiet)
+    args = setParser().parse_args(argv)
+    opts = setOptions(args)
+    inputFile, outputFile = setFiles(args, opts)
+    try:
+        count, outBytes = convert(inputFile, outputFile, opts)
+    except (IOError, RuntimeError) as e:
+        statusErrMsg('fatal', 'main', str(e))
+        exit(1)
+    inBytes = os.path.getsize(inputFile)
+    errMsg('{} way-points converted, {} -> {} bytes ({:.1f}%)'.format(count, inBytes, outBytes,
+        100.0 * outBytes / inBytes if inBytes else 0.0), opts.quiet)
+    errTMsg('{} ending normally ({:06.2f}sec)'.format(getProgName(), crhTimer.timer.stop()), opts.quiet)
+
+## main program
+if __name__ == '__main__':
+    main()